@@ -0,0 +1 @@
+"""Benchmarks e testes de carga do mock server (ver benchmarks/run.py)"""
@@ -0,0 +1,53 @@
+"""
+Compara dois arquivos de resultado de benchmarks.run.
+
+Uso: python -m benchmarks.compare antes.json depois.json
+"""
+
+import argparse
+import json
+
+COLUMNS = (("throughput", "op/s", True), ("p50Ms", "p50 ms", False), ("p99Ms", "p99 ms", False))
+
+
+def _delta(before, after, higher_is_better):
+    if not before or after is None:
+        return ''
+    change = (after - before) / before * 100
+    better = change > 0 if higher_is_better else change < 0
+    return f"{change:+.1f}%{' ✓' if better and abs(change) >= 5 else ''}"
+
+
+def compare(before, after):
+    lines = []
+    for size, after_size in after["sizes"].items():
+        before_size = before["sizes"].get(size)
+        if not before_size:
+            continue
+        lines.append(f"== {size}: RSS pico {before_size['peakRssMb']} -> {after_size['peakRssMb']} MB, "
+                     f"carga {before_size['loadSeconds']} -> {after_size['loadSeconds']} s")
+        for transport, scenarios in after_size["transports"].items():
+            for name, result in scenarios.items():
+                previous = before_size["transports"].get(transport, {}).get(name)
+                if not previous:
+                    continue
+                cells = [f"{label} {previous[key]} -> {result[key]} ({_delta(previous[key], result[key], higher)})"
+                         for key, label, higher in COLUMNS]
+                lines.append(f"  {transport:<6} {name:<14} " + "  ".join(cells))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args(argv)
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+    print('\n'.join(compare(before, after)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Gerador determinístico de catálogos sintéticos no formato de create_vehicle.
+
+Mesma seed e mesmo tamanho produzem exatamente os mesmos veículos, então
+resultados de benchmark de versões diferentes são comparáveis.
+
+Uso: python -m benchmarks.generator 100k -o /tmp/vehicles.json [--seed 42]
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from mock_server.vehicle_schema import (COLORS, FUELS, STATUSES, STEERINGS, TRANSMISSIONS, VEHICLE_COLUMNS,
+                                        format_mileage)
+
+DEFAULT_SEED = 42
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# marca -> [(modelo, carroceria, faixa de preço em milhares)]
+CARS = {
+    "Fiat": [("Uno Way 1.0", "Hatch", (25, 45)), ("Argo Drive 1.3", "Hatch", (55, 85)),
+             ("Mobi Like 1.0", "Hatch", (35, 60)), ("Strada Freedom 1.3", "Pickup", (75, 110)),
+             ("Toro Volcano 2.0 Diesel", "Pickup", (120, 180)), ("Cronos Precision 1.8", "Sedan", (65, 95))],
+    "Volkswagen": [("Gol 1.0 MPI", "Hatch", (30, 60)), ("Polo Highline 200 TSI", "Hatch", (70, 110)),
+                   ("T-Cross Comfortline", "SUV", (95, 145)), ("Saveiro Cross", "Pickup", (60, 95)),
+                   ("Virtus GTS", "Sedan", (85, 140)), ("Nivus Highline", "Crossover", (100, 140))],
+    "Chevrolet": [("Onix LT 1.0 Turbo", "Hatch", (60, 95)), ("Onix Plus Premier", "Sedan", (75, 110)),
+                  ("Tracker Premier", "SUV", (100, 150)), ("S10 High Country", "Pickup", (160, 260)),
+                  ("Spin Activ 7", "Minivan", (70, 110)), ("Cruze LTZ", "Sedan", (70, 120))],
+    "Toyota": [("Corolla XEi 2.0", "Sedan", (90, 160)), ("Hilux SRX 2.8", "Pickup", (180, 300)),
+               ("Yaris XS 1.5", "Hatch", (65, 100)), ("SW4 SRX Diamond", "SUV", (250, 390)),
+               ("Corolla Cross XRE", "SUV", (120, 180)), ("Etios X 1.3", "Hatch", (35, 60))],
+    "Hyundai": [("HB20 Comfort 1.0", "Hatch", (45, 80)), ("HB20S Platinum", "Sedan", (70, 100)),
+                ("Creta Ultimate 2.0", "SUV", (110, 170)), ("Tucson GLS", "SUV", (90, 150))],
+    "Honda": [("Civic Touring 1.5 Turbo", "Sedan", (110, 180)), ("HR-V EXL", "SUV", (100, 160)),
+              ("City EXL", "Sedan", (75, 115)), ("Fit EX 1.5", "Hatch", (50, 85)), ("WR-V EXL", "SUV", (70, 105))],
+    "Renault": [("Kwid Zen 1.0", "Hatch", (35, 60)), ("Sandero Stepway", "Hatch", (45, 80)),
+                ("Duster Iconic 1.6", "SUV", (70, 110)), ("Logan Life", "Sedan", (40, 70))],
+    "Jeep": [("Renegade Longitude", "SUV", (85, 140)), ("Compass Limited", "SUV", (130, 210)),
+             ("Commander Overland", "SUV", (200, 290))],
+    "Ford": [("Ka SE 1.0", "Hatch", (30, 55)), ("Ranger XLT 3.2", "Pickup", (130, 230)),
+             ("EcoSport Titanium", "SUV", (55, 90)), ("Territory Titanium", "SUV", (120, 170))],
+    "Nissan": [("Kicks SV 1.6", "SUV", (80, 120)), ("Versa Advance", "Sedan", (70, 100)),
+               ("Frontier Attack", "Pickup", (150, 230))],
+    "Citroën": [("C3 Feel 1.6", "Hatch", (45, 80)), ("C4 Cactus Shine", "Crossover", (75, 115))],
+    "Peugeot": [("208 Griffe", "Hatch", (70, 110)), ("2008 GT", "SUV", (100, 150))],
+}
+
+MOTORCYCLES = {
+    "Honda": [("CG 160 Titan", (12, 20)), ("Biz 125", (10, 16)), ("CB 500F", (30, 45)), ("XRE 300", (22, 32))],
+    "Yamaha": [("Fazer 250", (18, 27)), ("Factor 150", (12, 18)), ("MT-03", (28, 38)), ("NMax 160", (17, 25))],
+    "Suzuki": [("V-Strom 650", (45, 65))],
+    "BMW": [("G 310 GS", (30, 42)), ("R 1250 GS", (90, 140))],
+}
+
+CITIES = ["São Paulo", "Campinas", "Curitiba", "Belo Horizonte", "Porto Alegre", "Goiânia",
+          "Ribeirão Preto", "Florianópolis", "Salvador", "Recife"]
+
+HIGHLIGHTS = [
+    "único dono", "todas as revisões na concessionária", "manual e chave reserva",
+    "pneus novos", "IPVA {year} pago", "laudo cautelar aprovado", "garantia de fábrica até {until}",
+    "sem detalhes de lataria", "bancos sem desgaste", "nunca foi de leilão", "multimídia com espelhamento",
+    "correia dentada trocada recentemente", "baixo consumo na estrada",
+]
+
+FEATURES = [column.field for column in VEHICLE_COLUMNS if column.kind == 'feature']
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+MERCOSUL_SPACE = 26 ** 4 * 10 ** 3  # LLLNLNN
+OLD_SPACE = 26 ** 3 * 10 ** 4  # LLL-NNNN
+PLATE_STRIDE = 2_654_435_761  # primo, coprimo com os dois espaços: espalha as placas sem colisões
+
+
+def _letters(n):
+    n, l3 = divmod(n, 26)
+    n, l2 = divmod(n, 26)
+    return LETTERS[n % 26] + LETTERS[l2] + LETTERS[l3]
+
+
+def plate_for(index):
+    """Placa única e determinística (um terço no formato antigo, o resto Mercosul)"""
+    if index % 3 == 0:
+        n = (index // 3 * PLATE_STRIDE + 7) % OLD_SPACE
+        n, digits = divmod(n, 10_000)
+        return f"{_letters(n)}-{digits:04d}"
+    n = (index * PLATE_STRIDE + 12_345) % MERCOSUL_SPACE
+    n, last = divmod(n, 100)
+    n, letter = divmod(n, 26)
+    n, first = divmod(n, 10)
+    return f"{_letters(n)}{first}{LETTERS[letter]}{last:02d}"
+
+
+def _description(rng, brand, model, year, mileage, city):
+    highlights = rng.sample(HIGHLIGHTS, rng.randint(3, 7))
+    items = '\n'.join(f"- {h.format(year=year + 1, until=year + 3)}" for h in highlights)
+    paragraphs = [
+        f"## {brand} {model} {year}",
+        f"Veículo em **excelente estado**, rodando em {city} com {format_mileage(mileage)} km.",
+        items,
+        "Aceitamos seu usado na troca e financiamos em até 60x. "
+        "Documentação pronta para transferência, vistoria cautelar disponível para consulta.",
+    ]
+    if rng.random() < 0.5:
+        paragraphs.append(
+            "### Histórico de manutenção\n"
+            + '\n'.join(f"{i + 1}. Revisão de {10 * (i + 1)}.000 km em concessionária autorizada"
+                        for i in range(rng.randint(2, 6))))
+    return '\n\n'.join(paragraphs)
+
+
+def generate_vehicle(index, seed=DEFAULT_SEED):
+    """Veículo de id index + 1; depende apenas de (index, seed)"""
+    rng = random.Random(seed * 1_000_003 + index)
+    vehicle_id = index + 1
+    is_motorcycle = rng.random() < 0.12
+    if is_motorcycle:
+        brand = rng.choice(list(MOTORCYCLES))
+        model, (low, high) = rng.choice(MOTORCYCLES[brand])
+        body_type, doors = "", 0
+    else:
+        brand = rng.choice(list(CARS))
+        model, body_type, (low, high) = rng.choice(CARS[brand])
+        doors = 2 if body_type in ("Coupé", "Pickup") and rng.random() < 0.3 else 4
+
+    year = rng.randint(2008, 2025)
+    age = 2025 - year
+    mileage = max(0, int(rng.gauss(14_000 * age + 3_000, 6_000)))
+    price = round(rng.uniform(low, high) * 1000 * (0.93 ** age), -2)
+    created = datetime(2024, 1, 1) + timedelta(minutes=index * 7 + rng.randint(0, 6))
+
+    photos = [f"/uploads/photo_{vehicle_id}_{i}_{rng.getrandbits(32):08x}.jpg" for i in range(rng.randint(0, 12))]
+    videos = [f"/uploads/video_{vehicle_id}_{i}_{rng.getrandbits(32):08x}.mp4" for i in range(rng.choice((0, 0, 0, 1, 2)))]
+    inspection = f"/uploads/inspection_{vehicle_id}_{rng.getrandbits(32):08x}.pdf" if rng.random() < 0.3 else None
+
+    return {
+        "id": vehicle_id,
+        "vehicleId": f"#{vehicle_id:05d}",
+        "category": "Moto" if is_motorcycle else "Carro",
+        "brand": brand,
+        "model": model,
+        "licensePlate": plate_for(index),
+        "modelYear": year + rng.choice((0, 1)),
+        "year": year,
+        "price": price,
+        "mileage": mileage,
+        "color": rng.choice(COLORS[:9]),
+        "bodyType": body_type,
+        "doors": doors,
+        "transmission": rng.choice(TRANSMISSIONS[:4]),
+        "steering": "Mecânica" if is_motorcycle else rng.choice(STEERINGS[1:]),
+        "fuel": rng.choice(FUELS[:4]) if not is_motorcycle else "Gasolina",
+        "optionalFeatures": [] if is_motorcycle else sorted(rng.sample(FEATURES, rng.randint(2, 14))),
+        "armored": rng.random() < 0.03,
+        "auction": rng.random() < 0.05,
+        "ipvaPaid": rng.random() < 0.8,
+        "licensingUpToDate": rng.random() < 0.85,
+        "status": rng.choices(STATUSES, weights=(70, 15, 8, 4, 3))[0],
+        "description": _description(rng, brand, model, year, mileage, rng.choice(CITIES)),
+        "media": {"photos": photos, "videos": videos, "inspection": inspection},
+        "createdAt": created.isoformat(),
+    }
+
+
+def generate_vehicles(count, seed=DEFAULT_SEED):
+    for index in range(count):
+        yield generate_vehicle(index, seed)
+
+
+def write_catalog(path, count, seed=DEFAULT_SEED):
+    """Grava o catálogo em streaming (não monta a lista inteira em memória)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for index, vehicle in enumerate(generate_vehicles(count, seed)):
+            if index:
+                f.write(',\n')
+            f.write(json.dumps(vehicle, ensure_ascii=False))
+        f.write('\n]\n')
+
+
+def parse_size(value):
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value.replace('_', ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um vehicles.json sintético")
+    parser.add_argument('size', help="1k, 10k, 100k, 1m ou um número")
+    parser.add_argument('-o', '--output', default='vehicles.json')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+    count = parse_size(args.size)
+    write_catalog(args.output, count, args.seed)
+    print(f"✅ {count} veículos gravados em {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
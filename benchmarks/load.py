@@ -0,0 +1,248 @@
+"""
+Teste de carga local: uploads grandes concorrentes misturados com leituras
+baratas (detalhe privado e do catálogo público), com e sem o controle de
+admissão (mock_server.admission).
+
+O mock server roda em um subprocesso (--asyncio ou --workers) sobre um
+catálogo sintético em um diretório temporário; os clientes são threads
+deste processo, cada uma com a própria conexão. Uploaders que recebem 503
+esperam o Retry-After antes de tentar de novo. Por rodada:
+    leituras     p50/p99/máximo e erros, privadas e públicas separadas
+    uploads      concluídos, recusados (503/413) e vazão em MB/s
+    admissão     estado final de GET /api/admin/admission
+
+Uso:
+    python -m benchmarks.load --size 10k --uploaders 16 --readers 4 --duration 10
+    python -m benchmarks.load --admission on --mode workers --upload-mb 32
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .generator import DEFAULT_SEED, generate_vehicle, parse_size, plate_for, write_catalog
+from .run import REPO_ROOT, encode_multipart, percentile
+
+STARTUP_TIMEOUT = 120
+MAX_BACKOFF = 5.0
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _connect(port):
+    return http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+
+
+def _request(port, method, path, body=None, headers=None):
+    connection = _connect(port)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+class Server:
+    """mock-server.py em um subprocesso, com mock_data próprio"""
+
+    def __init__(self, count, seed, mode, admission, env=None):
+        self.workdir = tempfile.mkdtemp(prefix='load-')
+        data_dir = os.path.join(self.workdir, 'mock_data')
+        os.makedirs(os.path.join(data_dir, 'uploads'))
+        write_catalog(os.path.join(data_dir, 'vehicles.json'), count, seed)
+        with open(os.path.join(data_dir, 'counter.json'), 'w', encoding='utf-8') as f:
+            json.dump({"vehicle_counter": count}, f)
+        self.port = _free_port()
+        command = [sys.executable, os.path.join(REPO_ROOT, 'mock-server.py'), '--host', '127.0.0.1',
+                   '--port', str(self.port), '--log-level', 'WARNING']
+        command += ['--asyncio'] if mode == 'asyncio' else ['--workers', '2']
+        environment = dict(os.environ, MOCK_ADMISSION='1' if admission else '0', **(env or {}))
+        self.process = subprocess.Popen(command, cwd=self.workdir, env=environment,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                if _request(self.port, 'GET', '/api/vehicles/1')[0] == 200:
+                    break
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError("mock server não subiu")
+            time.sleep(0.2)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.upload_bytes = 0
+
+    def record(self, kind, status, seconds):
+        with self.lock:
+            self.latencies.setdefault(kind, []).append(seconds)
+            key = f"{kind}:{status}"
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def summary(self, kind):
+        latencies = sorted(self.latencies.get(kind, []))
+        if not latencies:
+            return {"ops": 0}
+        statuses = {k.split(':', 1)[1]: v for k, v in self.statuses.items() if k.startswith(kind + ':')}
+        return {
+            "ops": len(latencies),
+            "statuses": statuses,
+            "p50Ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p99Ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "maxMs": round(latencies[-1] * 1000, 1),
+        }
+
+
+def _uploader(port, stats, stop, index, count, seed, photo):
+    rng = random.Random(seed + index)
+    i = 0
+    while not stop.is_set():
+        vehicle = generate_vehicle(count + 1_000 + index * 100_000 + i, seed)
+        fields = {k: str(v).lower() if isinstance(v, bool) else v for k, v in vehicle.items()
+                  if k not in ('id', 'vehicleId', 'createdAt', 'media')}
+        fields['licensePlate'] = plate_for(count + 1_000 + index * 100_000 + i)
+        body, content_type = encode_multipart(fields, [('photos', f'load{index}_{i}.jpg', 'image/jpeg', photo)])
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, headers, _ = _request(port, 'POST', '/api/vehicles', body, {'Content-Type': content_type})
+        except OSError:
+            # recusa com conexão fechada antes do fim do envio do corpo
+            status, headers = 'reset', {}
+        stats.record('upload', status, time.perf_counter() - start)
+        if status == 201 or status == 200:
+            with stats.lock:
+                stats.upload_bytes += len(body)
+        elif status in (503, 'reset'):
+            retry_after = float(headers.get('Retry-After') or 1)
+            stop.wait(min(retry_after, MAX_BACKOFF) * (0.5 + rng.random()))
+
+
+def _reader(port, stats, stop, index, count, token):
+    rng = random.Random(index)
+    connection = _connect(port)
+    while not stop.is_set():
+        vehicle_id = rng.randint(1, count)
+        if rng.random() < 0.5:
+            kind, path = 'read', f"/api/vehicles/{vehicle_id}"
+        else:
+            kind, path = 'public', f"/api/public/catalog/{token}/vehicles/{vehicle_id}"
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+        except OSError:
+            status = 'error'
+            connection.close()
+            connection = _connect(port)
+        stats.record(kind, status, time.perf_counter() - start)
+    connection.close()
+
+
+def run_round(args, admission):
+    count = parse_size(args.size)
+    env = {}
+    if args.limits:
+        env['MOCK_ADMISSION_LIMITS'] = args.limits
+    server = Server(count, args.seed, args.mode, admission, env)
+    try:
+        token = json.loads(_request(server.port, 'POST', '/api/vehicles/share-catalog')[2])['token']
+        photo = random.Random(args.seed).randbytes(int(args.upload_mb * 2 ** 20))
+        stats = Stats()
+        stop = threading.Event()
+        threads = [threading.Thread(target=_uploader, args=(server.port, stats, stop, i, count, args.seed, photo))
+                   for i in range(args.uploaders)]
+        threads += [threading.Thread(target=_reader, args=(server.port, stats, stop, i, count, token))
+                    for i in range(args.readers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        state = json.loads(_request(server.port, 'GET', '/api/admin/admission')[2])
+    finally:
+        server.stop()
+    return {
+        "admission": admission,
+        "seconds": round(elapsed, 2),
+        "read": stats.summary('read'),
+        "public": stats.summary('public'),
+        "upload": dict(stats.summary('upload'), mbPerSecond=round(stats.upload_bytes / 2 ** 20 / elapsed, 1)),
+        "admissionState": state,
+    }
+
+
+def _print_round(result):
+    label = "admissão ligada" if result['admission'] else "admissão desligada"
+    print(f"\n{label} ({result['seconds']} s)", file=sys.stderr)
+    for kind in ('read', 'public', 'upload'):
+        r = result[kind]
+        if not r.get('ops'):
+            continue
+        extra = f"  {r['mbPerSecond']} MB/s" if kind == 'upload' else ''
+        print(f"  {kind:<7} {r['ops']:>6} ops  p50 {r['p50Ms']:>8} ms  p99 {r['p99Ms']:>8} ms  "
+              f"máx {r['maxMs']:>8} ms  {r['statuses']}{extra}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga local: uploads concorrentes x leituras")
+    parser.add_argument('--size', default='10k', help="veículos no catálogo (1k, 10k, 100k...)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--mode', choices=('asyncio', 'workers'), default='asyncio')
+    parser.add_argument('--admission', default='off,on', help="rodadas: off, on ou off,on")
+    parser.add_argument('--limits', help="MOCK_ADMISSION_LIMITS das rodadas com admissão")
+    parser.add_argument('--uploaders', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--upload-mb', type=float, default=8.0, help="tamanho da foto de cada upload")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--output', help="grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for value in args.admission.split(','):
+        result = run_round(args, value.strip() == 'on')
+        _print_round(result)
+        results.append(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "rounds": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Memória do catálogo: dicts (como o json.load devolve) x VehicleRecord
+(mock_server.records) x VehicleRecord com os campos frios em um ColdStore
+(mock_server.coldstore; MOCK_COLD_FIELDS escolhe quais, "description" se vazio).
+
+Cada representação de cada tamanho roda em um subprocesso próprio sobre o
+mesmo vehicles.json sintético (benchmarks.generator) e mede:
+    bytes/veículo    alocações retidas após a carga (tracemalloc, exato)
+    RSS              memória residente após a carga e pico do processo
+    carga            json.load ou records.load_vehicles (conversão em streaming;
+                     com cold, inclui comprimir os valores e treinar o dicionário)
+    filtro           status == "Disponível" sobre o catálogo inteiro
+    serialização     json.dumps do catálogo inteiro (como Partition.save;
+                     com cold, só as referências aos campos frios)
+
+Uso:
+    python -m benchmarks.memory --sizes 1k,100k
+    python -m benchmarks.memory --sizes 1m --output memoria.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .generator import DEFAULT_SEED, parse_size, write_catalog
+
+REPRESENTATIONS = ('dict', 'records', 'cold')
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _load(path, representation):
+    from mock_server.coldstore import ColdStore, configured_fields
+    from mock_server.records import load_vehicles
+
+    with open(path, 'r', encoding='utf-8') as f:
+        if representation == 'cold':
+            # Store novo a cada carga: a medida inclui a compressão
+            return load_vehicles(f, cold=ColdStore(tempfile.mkdtemp(dir=os.path.dirname(path)),
+                                                     fields=configured_fields() or ('description',)))
+        return load_vehicles(f) if representation == 'records' else json.load(f)
+
+
+def _measure(path, representation):
+    from mock_server.records import json_default, storage_default, vocabularies
+
+    gc.collect()
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    vehicles = _load(path, representation)
+    load_seconds = time.perf_counter() - start
+    gc.collect()
+    rss_after = _rss_mb()
+
+    start = time.perf_counter()
+    if representation != 'dict':
+        code = vocabularies['status'].code("Disponível")
+        available = sum(1 for v in vehicles if v.raw('status') == code)
+    else:
+        available = sum(1 for v in vehicles if v.get('status') == "Disponível")
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    default = storage_default if representation == 'cold' else json_default
+    size = len(json.dumps(vehicles, ensure_ascii=False, default=default))
+    dump_seconds = time.perf_counter() - start
+
+    count = len(vehicles)
+    del vehicles
+    gc.collect()
+
+    # Segunda carga sob tracemalloc só para contar bytes (o rastreamento deixa a carga lenta)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    vehicles = _load(path, representation)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    return {
+        "count": count,
+        "bytesPerVehicle": round(retained / count) if count else 0,
+        "retainedMb": round(retained / 2 ** 20, 1),
+        "rssDeltaMb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+        "peakRssMb": round(_peak_rss_mb(), 1),
+        "loadSeconds": round(load_seconds, 3),
+        "scanSeconds": round(scan_seconds, 4),
+        "dumpSeconds": round(dump_seconds, 3),
+        "dumpBytes": size,
+        "available": available,
+    }
+
+
+def _run_child(path, representation):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.memory', '--child', representation, '--catalog', path],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout)
+
+
+def _print_table(results):
+    header = f"{'tamanho':>9} {'repr.':>8} {'B/veículo':>10} {'retido MB':>10} {'ΔRSS MB':>8} " \
+             f"{'pico MB':>8} {'carga s':>8} {'filtro s':>9} {'dump s':>7}"
+    print(header, file=sys.stderr)
+    for size, by_repr in results.items():
+        for representation, r in by_repr.items():
+            print(f"{size:>9} {representation:>8} {r['bytesPerVehicle']:>10} {r['retainedMb']:>10} "
+                  f"{r['rssDeltaMb']:>8} {r['peakRssMb']:>8} {r['loadSeconds']:>8} "
+                  f"{r['scanSeconds']:>9} {r['dumpSeconds']:>7}", file=sys.stderr)
+        if 'dict' in by_repr:
+            for representation in [r for r in by_repr if r != 'dict']:
+                ratio = by_repr[representation]['retainedMb'] / (by_repr['dict']['retainedMb'] or 1)
+                print(f"{'':>9} {'':>8} {representation} = {ratio:.0%} da memória retida pelos dicts",
+                      file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória do catálogo: dicts x VehicleRecord x campos frios")
+    parser.add_argument('--sizes', default='1k,10k', help="tamanhos separados por vírgula: 1k,10k,100k,1m")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', help="grava os resultados em JSON")
+    parser.add_argument('--child', choices=REPRESENTATIONS, help=argparse.SUPPRESS)
+    parser.add_argument('--catalog', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(_measure(args.catalog, args.child), sys.stdout)
+        return
+
+    results = {}
+    for size in args.sizes.split(','):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'vehicles.json')
+            write_catalog(path, parse_size(size), args.seed)
+            results[size] = {r: _run_child(path, r) for r in REPRESENTATIONS}
+    _print_table(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"seed": args.seed, "sizes": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,426 @@
+"""
+Benchmarks do mock server sobre catálogos sintéticos (benchmarks.generator).
+
+Cada tamanho roda em um subprocesso próprio (o pico de RSS é por processo),
+com um diretório de dados temporário. O app Flask é exercitado pelo test
+client e por HTTP em loopback (servidor werkzeug em uma thread), cobrindo
+listagem, filtros, detalhe, criação, edição, patch, exclusão, catálogo
+público e uploads.
+
+Uso:
+    python -m benchmarks.run --sizes 1k,100k --duration 2
+    python -m benchmarks.run --sizes 1m --transports http --scenarios list,detail
+    python -m benchmarks.compare antes.json depois.json
+
+O resultado (JSON) vai para benchmarks/results/<data>.json ou --output.
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlencode
+
+from .generator import DEFAULT_SEED, generate_vehicle, parse_size, plate_for, write_catalog
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+TRANSPORTS = ('client', 'http')
+UPLOAD_SIZE = 256 * 1024
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # nearest-rank
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def encode_multipart(fields, files):
+    """Corpo multipart/form-data (mesmos bytes para test client e HTTP)"""
+    boundary = f"----bench{uuid.uuid4().hex}"
+    parts = []
+    for name, value in fields.items():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{item}\r\n'.encode())
+    for name, filename, content_type, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class ClientTransport:
+    """Flask test client (sem rede: mede só o app)"""
+
+    name = 'client'
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, content_type=None):
+        headers = {'Content-Type': content_type} if content_type else {}
+        response = self.client.open(path, method=method, data=body, headers=headers)
+        data = response.get_data()
+        response.close()
+        return response.status_code, data
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """Servidor werkzeug em loopback com uma conexão keep-alive"""
+
+    name = 'http'
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_port, timeout=600)
+
+    def request(self, method, path, body=None, content_type=None):
+        headers = {'Content-Type': content_type} if content_type else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.getheader('Connection', '').lower() == 'close':
+            self.connection.close()
+        return response.status, data
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+
+
+class BenchContext:
+    """Estado compartilhado entre cenários (ids criados, token público, uploads)"""
+
+    def __init__(self, app_module, count, seed):
+        self.app_module = app_module
+        self.count = count
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.created_ids = []
+        self.upload_paths = []
+        self.next_plate = count + 1_000
+        self.token = None
+        self.photo = random.Random(seed).randbytes(UPLOAD_SIZE)
+
+    def random_id(self):
+        return self.rng.randint(1, self.count)
+
+    def new_vehicle_payload(self):
+        index = self.next_plate
+        self.next_plate += 1
+        vehicle = generate_vehicle(index, self.seed)
+        for key in ('id', 'vehicleId', 'createdAt', 'media'):
+            vehicle.pop(key)
+        vehicle['licensePlate'] = plate_for(index)
+        return vehicle
+
+
+def _json(payload):
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json'
+
+
+# Cenários: função (ctx, i) -> (método, caminho, corpo, content-type, callback opcional com a resposta)
+def scenario_list(ctx, i):
+    pages = max(1, min(50, ctx.count // 20))
+    return 'GET', f"/api/vehicles?page={i % pages + 1}&limit=20", None, None, None
+
+
+def scenario_filter(ctx, i):
+    filters = [{"status": "Disponível"}, {"category": "Moto"}, {"status": "Vendido", "category": "Carro"}]
+    query = dict(filters[i % len(filters)], page=1, limit=20)
+    return 'GET', f"/api/vehicles?{urlencode(query)}", None, None, None
+
+
+def scenario_features(ctx, i):
+    queries = [["Ar condicionado", "Airbags"], ["Câmera de ré", "Banco de couro", "Teto solar"],
+               ["ABS", "GPS", "Bluetooth", "Sensor de estacionamento"]]
+    query = [("features", f) for f in queries[i % len(queries)]]
+    if i % 2:
+        query.append(("status", "Disponível"))
+    return 'GET', f"/api/vehicles?{urlencode(query + [('page', 1), ('limit', 20)])}", None, None, None
+
+
+def scenario_analytics(ctx, i):
+    # bins alternados: metade das chamadas não acerta o cache da versão
+    return 'GET', f"/api/analytics?bins={10 + i % 50}", None, None, None
+
+
+def scenario_similar(ctx, i):
+    return 'GET', f"/api/vehicles/{ctx.random_id()}/similar?limit=10", None, None, None
+
+
+def scenario_detail(ctx, i):
+    return 'GET', f"/api/vehicles/{ctx.random_id()}", None, None, None
+
+
+def scenario_public_list(ctx, i):
+    pages = max(1, min(50, ctx.count // 8))
+    return 'GET', f"/api/public/catalog/{ctx.token}/vehicles?page={i % pages + 1}", None, None, None
+
+
+def scenario_public_detail(ctx, i):
+    return 'GET', f"/api/public/catalog/{ctx.token}/vehicles/{ctx.random_id()}", None, None, None
+
+
+def _remember_created(ctx):
+    def callback(status, data):
+        if status == 201:
+            vehicle = json.loads(data)
+            ctx.created_ids.append(vehicle['id'])
+            ctx.upload_paths.extend(vehicle.get('media', {}).get('photos', []))
+    return callback
+
+
+def scenario_create(ctx, i):
+    body, content_type = _json(ctx.new_vehicle_payload())
+    return 'POST', "/api/vehicles", body, content_type, _remember_created(ctx)
+
+
+def scenario_update(ctx, i):
+    vehicle = ctx.app_module.garages.get(ctx.app_module.DEFAULT_GARAGE_ID).catalog.snapshot.get(ctx.random_id())
+    if vehicle is None:
+        return scenario_detail(ctx, i)
+    payload = {k: v for k, v in vehicle.items() if k not in ('id', 'vehicleId', 'createdAt', 'media')}
+    payload['description'] = vehicle.get('description', '') + f"\n\nAtualizado no benchmark ({i})."
+    payload['existingPhotosOrder'] = list(reversed(vehicle.get('media', {}).get('photos', [])))
+    body, content_type = _json(payload)
+    return 'PUT', f"/api/vehicles/{vehicle['id']}", body, content_type, None
+
+
+def scenario_patch(ctx, i):
+    statuses = ["Disponível", "Reservado", "Vendido"]
+    body, content_type = _json({"status": statuses[i % len(statuses)], "highlighted": i % 2 == 0})
+    return 'PATCH', f"/api/vehicles/{ctx.random_id()}", body, content_type, None
+
+
+def scenario_upload(ctx, i):
+    fields = {k: str(v).lower() if isinstance(v, bool) else v for k, v in ctx.new_vehicle_payload().items()}
+    body, content_type = encode_multipart(fields, [('photos', f'foto{i}.jpg', 'image/jpeg', ctx.photo)])
+    return 'POST', "/api/vehicles", body, content_type, _remember_created(ctx)
+
+
+def scenario_upload_get(ctx, i):
+    if not ctx.upload_paths:
+        return scenario_detail(ctx, i)
+    return 'GET', ctx.upload_paths[i % len(ctx.upload_paths)], None, None, None
+
+
+def scenario_delete(ctx, i):
+    if not ctx.created_ids:
+        return 'DELETE', f"/api/vehicles/{ctx.count + 10_000_000}", None, None, None
+    return 'DELETE', f"/api/vehicles/{ctx.created_ids.pop()}", None, None, None
+
+
+SCENARIOS = {
+    "list": scenario_list,
+    "filter": scenario_filter,
+    "features": scenario_features,
+    "analytics": scenario_analytics,
+    "similar": scenario_similar,
+    "detail": scenario_detail,
+    "public_list": scenario_public_list,
+    "public_detail": scenario_public_detail,
+    "create": scenario_create,
+    "update": scenario_update,
+    "patch": scenario_patch,
+    "upload": scenario_upload,
+    "upload_get": scenario_upload_get,
+    "delete": scenario_delete,
+}
+
+
+def run_scenario(transport, ctx, scenario, duration, min_iterations, max_iterations):
+    latencies = []
+    errors = 0
+    received = 0
+    started = time.perf_counter()
+    i = 0
+    while i < max_iterations and (i < min_iterations or time.perf_counter() - started < duration):
+        method, path, body, content_type, callback = scenario(ctx, i)
+        start = time.perf_counter()
+        status, data = transport.request(method, path, body, content_type)
+        latencies.append(time.perf_counter() - start)
+        received += len(data)
+        if status >= 400:
+            errors += 1
+        if callback:
+            callback(status, data)
+        i += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50Ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99Ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "maxMs": round(latencies[-1] * 1000, 3),
+        "meanMs": round(sum(latencies) / len(latencies) * 1000, 3),
+        "bytesReceived": received,
+    }
+
+
+def load_app(workdir):
+    """Importa mock-server.py usando workdir/mock_data como DATA_DIR"""
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    spec = importlib.util.spec_from_file_location('mock_server_app', os.path.join(REPO_ROOT, 'mock-server.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_child(args):
+    """Roda um tamanho de catálogo neste processo e grava o resultado em args.result_file"""
+    count = parse_size(args.size)
+    workdir = tempfile.mkdtemp(prefix=f'bench-{args.size}-')
+    data_dir = os.path.join(workdir, 'mock_data')
+    os.makedirs(os.path.join(data_dir, 'uploads'))
+
+    started = time.perf_counter()
+    write_catalog(os.path.join(data_dir, 'vehicles.json'), count, args.seed)
+    with open(os.path.join(data_dir, 'counter.json'), 'w', encoding='utf-8') as f:
+        json.dump({"vehicle_counter": count}, f)
+    generate_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app_module = load_app(workdir)
+    load_seconds = time.perf_counter() - started
+    rss_after_load = peak_rss_mb()
+
+    ctx = BenchContext(app_module, count, args.seed)
+    client = app_module.app.test_client()
+    ctx.token = client.post('/api/vehicles/share-catalog').get_json()['token']
+
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    transports = {'client': ClientTransport, 'http': HttpTransport}
+    results = {}
+    for transport_name in args.transports.split(','):
+        transport = transports[transport_name](app_module.app)
+        try:
+            results[transport_name] = {}
+            for name in scenarios:
+                results[transport_name][name] = run_scenario(
+                    transport, ctx, SCENARIOS[name], args.duration, args.min_iterations, args.max_iterations)
+                print(f"  {args.size:>5} {transport_name:<6} {name:<14} "
+                      f"{results[transport_name][name]['throughput']:>9} op/s  "
+                      f"p50 {results[transport_name][name]['p50Ms']:>9} ms  "
+                      f"p99 {results[transport_name][name]['p99Ms']:>9} ms", file=sys.stderr)
+        finally:
+            transport.close()
+
+    result = {
+        "count": count,
+        "generateSeconds": round(generate_seconds, 3),
+        "loadSeconds": round(load_seconds, 3),
+        "vehiclesFileBytes": os.path.getsize(os.path.join(data_dir, 'vehicles.json')),
+        "rssAfterLoadMb": rss_after_load,
+        "peakRssMb": peak_rss_mb(),
+        "transports": results,
+    }
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    if not args.keep_data:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_info():
+    def git(*cmd):
+        try:
+            return subprocess.run(['git', *cmd], cwd=REPO_ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+    return {"commit": git('rev-parse', 'HEAD'), "dirty": bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do mock server")
+    parser.add_argument('--sizes', default='1k', help="tamanhos separados por vírgula: 1k,10k,100k,1m")
+    parser.add_argument('--transports', default=','.join(TRANSPORTS))
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=2.0, help="segundos por cenário")
+    parser.add_argument('--min-iterations', type=int, default=3)
+    parser.add_argument('--max-iterations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', help="arquivo JSON de resultados")
+    parser.add_argument('--keep-data', action='store_true', help="não apagar o diretório de dados temporário")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--size', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios.split(',')) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    if args.child:
+        run_child(args)
+        return
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    report = {
+        "meta": {
+            "createdAt": datetime.now().isoformat(timespec='seconds'),
+            "git": _git_info(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "duration": args.duration,
+        },
+        "sizes": {},
+    }
+    env = dict(os.environ, MOCK_LOG_LEVEL=os.environ.get('MOCK_LOG_LEVEL', 'WARNING'))
+    for size in args.sizes.split(','):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+            result_file = tmp.name
+        command = [sys.executable, '-m', 'benchmarks.run', '--child', '--size', size, '--result-file', result_file,
+                   '--transports', args.transports, '--scenarios', args.scenarios,
+                   '--duration', str(args.duration), '--min-iterations', str(args.min_iterations),
+                   '--max-iterations', str(args.max_iterations), '--seed', str(args.seed)]
+        if args.keep_data:
+            command.append('--keep-data')
+        print(f"▶ {size}", file=sys.stderr)
+        subprocess.run(command, cwd=REPO_ROOT, env=env, check=True)
+        with open(result_file, encoding='utf-8') as f:
+            report["sizes"][size] = json.load(f)
+        os.remove(result_file)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Resultados em {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ import {
   Button, IconButton, Chip, CardMedia,
   Dialog, DialogContent, DialogTitle, DialogActions,
   Drawer, useTheme, useMediaQuery, Snackbar, Alert,
-  Pagination
+  Pagination, Checkbox, Paper
 } from '@mui/material';
 import { 
   Add as AddIcon, 
@@ -81,6 +81,9 @@ const VehicleList: React.FC = () => {
   const [filtersDrawerOpen, setFiltersDrawerOpen] = useState(false);
   const [prevScrollY, setPrevScrollY] = useState<number | null>(null);
   const [company, setCompany] = useState<any>({ whatsapp: '', phone: '' });
+  // Seleção para ações em massa (uma chamada a /vehicles/batch por ação)
+  const [selectedIds, setSelectedIds] = useState<number[]>([]);
+  const [batchLoading, setBatchLoading] = useState(false);
   
   // Estados de paginação
   const [currentPage, setCurrentPage] = useState(1);
@@ -112,6 +115,7 @@ const VehicleList: React.FC = () => {
   const isMobile = useMediaQuery(theme.breakpoints.down('md'));
 
   useEffect(() => {
+    setSelectedIds([]);
     fetchVehicles();
   }, [currentPage, filters]);
 
@@ -244,6 +248,50 @@ const VehicleList: React.FC = () => {
     }
   };
 
+  const toggleSelected = (vehicleId: number) => {
+    setSelectedIds(prev => 
+      prev.includes(vehicleId) ? prev.filter(id => id !== vehicleId) : [...prev, vehicleId]
+    );
+  };
+
+  const handleBatch = async (operations: any[], message: string) => {
+    try {
+      setBatchLoading(true);
+      // Todas as operações são validadas juntas: se uma falhar, nenhuma é aplicada
+      await api.post('/vehicles/batch', { operations });
+      setSelectedIds([]);
+      setSuccessMessage(message);
+      fetchVehicles();
+    } catch (error: any) {
+      console.error('Erro ao aplicar ação em massa:', error);
+      const failed = (error.response?.data?.results || []).find((r: any) => r.error);
+      setError(failed ? `Nenhuma alteração aplicada: ${failed.error}` : 'Erro ao aplicar ação em massa. Tente novamente.');
+    } finally {
+      setBatchLoading(false);
+    }
+  };
+
+  const handleBatchStatus = (status: string) => 
+    handleBatch(
+      [{ op: 'status', ids: selectedIds, status }],
+      `${selectedIds.length} veículo(s) marcado(s) como ${status}!`
+    );
+
+  const handleBatchHighlight = (highlighted: boolean) => 
+    handleBatch(
+      [{ op: 'patch', ids: selectedIds, fields: { highlighted } }],
+      highlighted ? `${selectedIds.length} veículo(s) destacado(s)!` : `Destaque removido de ${selectedIds.length} veículo(s)!`
+    );
+
+  const handleBatchDelete = () => {
+    if (window.confirm(`Tem certeza que deseja excluir ${selectedIds.length} veículo(s)?`)) {
+      handleBatch(
+        [{ op: 'delete', ids: selectedIds }],
+        `${selectedIds.length} veículo(s) excluído(s) com sucesso!`
+      );
+    }
+  };
+
   const formatCurrency = (value: number | string | undefined | null) => {
     const safe = Number(value ?? 0);
     return new Intl.NumberFormat('pt-BR', {
@@ -511,6 +559,49 @@ const VehicleList: React.FC = () => {
               />
             </Box>
 
+            {selectedIds.length > 0 && (
+              <Paper 
+                variant="outlined" 
+                sx={{ 
+                  mb: 2, 
+                  p: 1.5, 
+                  display: 'flex', 
+                  flexWrap: 'wrap',
+                  alignItems: 'center', 
+                  gap: 1,
+                  backgroundColor: '#e3f2fd'
+                }}
+              >
+                <Checkbox
+                  checked={filteredVehicles.every(v => selectedIds.includes(v.id))}
+                  indeterminate={!filteredVehicles.every(v => selectedIds.includes(v.id))}
+                  onChange={(e) => setSelectedIds(e.target.checked ? filteredVehicles.map(v => v.id) : [])}
+                  size="small"
+                />
+                <Typography variant="body2" sx={{ mr: 'auto' }}>
+                  {selectedIds.length} selecionado(s)
+                </Typography>
+                <Button size="small" variant="outlined" disabled={batchLoading} onClick={() => handleBatchStatus('Vendido')}>
+                  Marcar como Vendido
+                </Button>
+                <Button size="small" variant="outlined" disabled={batchLoading} onClick={() => handleBatchStatus('Disponível')}>
+                  Marcar como Disponível
+                </Button>
+                <Button size="small" variant="outlined" disabled={batchLoading} startIcon={<StarIcon />} onClick={() => handleBatchHighlight(true)}>
+                  Destacar
+                </Button>
+                <Button size="small" variant="outlined" disabled={batchLoading} startIcon={<StarBorderIcon />} onClick={() => handleBatchHighlight(false)}>
+                  Remover Destaque
+                </Button>
+                <Button size="small" variant="outlined" color="error" disabled={batchLoading} startIcon={<DeleteIcon />} onClick={handleBatchDelete}>
+                  Excluir
+                </Button>
+                <Button size="small" disabled={batchLoading} onClick={() => setSelectedIds([])}>
+                  Limpar Seleção
+                </Button>
+              </Paper>
+            )}
+
             {filteredVehicles.length === 0 ? (
               <Box sx={{ textAlign: 'center', py: 4 }}>
                 <Typography variant="h6" color="text.secondary">
@@ -915,6 +1006,13 @@ const VehicleList: React.FC = () => {
                         alignItems: 'center'
                       }}>
                         <Box sx={{ display: 'flex', gap: 0.5 }}>
+                          <Checkbox
+                            checked={selectedIds.includes(vehicle.id)}
+                            onClick={(e) => e.stopPropagation()}
+                            onChange={() => toggleSelected(vehicle.id)}
+                            size="small"
+                            sx={{ p: { xs: 0.5, sm: 1 } }}
+                          />
                           <IconButton
                             onClick={(e) => {
                               e.stopPropagation();
@@ -2,82 +2,93 @@
 import json
 import os
 import base64
+import logging
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import uuid
 
+from mock_server.catalog import copy_vehicle
+from mock_server.garages import DEFAULT_GARAGE_ID, GarageCatalogs, parse_garage_id
+from mock_server.log import Payload, configure_logging, dropped_records
+from mock_server.records import VehicleRecord, vocabularies
+from mock_server import admission, metrics, profiling
+
 app = Flask(__name__)
 CORS(app)
 
+# Logging assíncrono (MOCK_LOG_LEVEL / MOCK_LOG_FORMAT); payloads sempre via Payload(...)
+configure_logging()
+logger = logging.getLogger('mock_server.api')
+
+class CatalogJSONProvider(metrics.TimedJSONProvider):
+    """jsonify serializa os veículos do catálogo (VehicleRecord) no formato original"""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, VehicleRecord):
+            return value.to_dict()
+        return metrics.TimedJSONProvider.default(value)
+
+# Controle de admissão das escritas e uploads (MOCK_ADMISSION_*): recusa com 503 + Retry-After
+# em vez de enfileirar sem limite; instalado por dentro das métricas para que as recusas apareçam nelas
+admission_controller = admission.install(app, admission.AdmissionConfig.from_env())
+
+# Instrumentação sempre ligada (GET /metrics): latência por rota, bytes, JSON
+app.json_provider_class = CatalogJSONProvider
+app.json = app.json_provider_class(app)
+app.wsgi_app = metrics.MetricsMiddleware(app.wsgi_app)
+
+@app.before_request
+def record_route():
+    metrics.observe_route(request.environ, request.url_rule)
+
 # Diretório para armazenar dados e uploads
 DATA_DIR = 'mock_data'
 UPLOADS_DIR = os.path.join(DATA_DIR, 'uploads')
-VEHICLES_FILE = os.path.join(DATA_DIR, 'vehicles.json')
 USERS_FILE = os.path.join(DATA_DIR, 'users.json')
-COUNTER_FILE = os.path.join(DATA_DIR, 'counter.json')
 
 # Criar diretórios se não existirem
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
-def get_next_vehicle_id():
-    """Gera o próximo ID sequencial para veículos"""
-    if os.path.exists(COUNTER_FILE):
-        with open(COUNTER_FILE, 'r', encoding='utf-8') as f:
-            counter_data = json.load(f)
-    else:
-        counter_data = {"vehicle_counter": 0}
-    
-    counter_data["vehicle_counter"] += 1
-    
-    with open(COUNTER_FILE, 'w', encoding='utf-8') as f:
-        json.dump(counter_data, f, ensure_ascii=False, indent=2)
-    
-    return f"#{counter_data['vehicle_counter']:05d}"
+# Veículo de exemplo da garagem padrão (gravado quando ela ainda não tem vehicles.json)
+SEED_VEHICLES = [
+    {
+        "id": 1,
+        "vehicleId": "#00001",
+        "category": "Carro",
+        "brand": "Toyota",
+        "model": "Corolla",
+        "licensePlate": "ABC-1234", # Adicionar placa no veículo exemplo
+        "modelYear": 2023,
+        "year": 2023,
+        "price": 85000,
+        "mileage": 15000,
+        "color": "Branco",
+        "bodyType": "Sedan",
+        "doors": 4,
+        "transmission": "Automático",
+        "steering": "Hidráulica",
+        "fuel": "Flex",
+        "optionalFeatures": ["Ar condicionado", "Direção elétrica", "Vidros elétricos"],
+        "armored": False,
+        "auction": False,
+        "ipvaPaid": True,
+        "licensingUpToDate": True,
+        "status": "Disponível",
+        "description": "Veículo em excelente estado de conservação",
+        "media": {
+            "photos": [],
+            "videos": [],
+            "inspection": None
+        },
+        "createdAt": "2024-01-15T10:30:00Z"
+    }
+]
 
 # Dados iniciais
 def load_data():
-    # Carregar veículos
-    if os.path.exists(VEHICLES_FILE):
-        with open(VEHICLES_FILE, 'r', encoding='utf-8') as f:
-            vehicles = json.load(f)
-    else:
-        vehicles = [
-            {
-                "id": 1,
-                "vehicleId": "#00001",
-                "category": "Carro",
-                "brand": "Toyota",
-                "model": "Corolla",
-                "licensePlate": "ABC-1234", # Adicionar placa no veículo exemplo
-                "modelYear": 2023,
-                "year": 2023,
-                "price": 85000,
-                "mileage": 15000,
-                "color": "Branco",
-                "bodyType": "Sedan",
-                "doors": 4,
-                "transmission": "Automático",
-                "steering": "Hidráulica",
-                "fuel": "Flex",
-                "optionalFeatures": ["Ar condicionado", "Direção elétrica", "Vidros elétricos"],
-                "armored": False,
-                "auction": False,
-                "ipvaPaid": True,
-                "licensingUpToDate": True,
-                "status": "Disponível",
-                "description": "Veículo em excelente estado de conservação",
-                "media": {
-                    "photos": [],
-                    "videos": [],
-                    "inspection": None
-                },
-                "createdAt": "2024-01-15T10:30:00Z"
-            }
-        ]
-        save_vehicles(vehicles)
-    
     # Carregar usuários
     if os.path.exists(USERS_FILE):
         with open(USERS_FILE, 'r', encoding='utf-8') as f:
@@ -89,11 +100,7 @@ def load_data():
         ]
         save_users(users)
     
-    return vehicles, users
-
-def save_vehicles(vehicles):
-    with open(VEHICLES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(vehicles, f, ensure_ascii=False, indent=2)
+    return users
 
 def save_users(users):
     with open(USERS_FILE, 'w', encoding='utf-8') as f:
@@ -106,52 +113,139 @@ def save_file(file_data, filename):
         file_content = base64.b64decode(file_data.split(',')[1])
         file_path = os.path.join(UPLOADS_DIR, filename)
         
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
+        with metrics.MEDIA_WRITE_SECONDS.time(('base64',)):
+            with open(file_path, 'wb') as f:
+                f.write(file_content)
+        metrics.MEDIA_WRITE_BYTES.inc(len(file_content), ('base64',))
         
         return f"/uploads/{filename}"
     except Exception as e:
-        print(f"Erro ao salvar arquivo: {e}")
+        logger.exception("Erro ao salvar arquivo: %s", e)
         return None
 
+def save_upload(file_storage, file_path, kind):
+    """Grava um arquivo recebido via FormData, medindo tempo e bytes"""
+    with metrics.MEDIA_WRITE_SECONDS.time((kind,)):
+        file_storage.save(file_path)
+    metrics.MEDIA_WRITE_BYTES.inc(os.path.getsize(file_path), (kind,))
+
+def load_import_schema():
+    """Schema da planilha de importação com as listas personalizadas da empresa (company.json → importOptions)"""
+    from mock_server.vehicle_schema import build_schema
+    
+    company_file = os.path.join(DATA_DIR, 'company.json')
+    option_overrides = None
+    if os.path.exists(company_file):
+        try:
+            with open(company_file, 'r', encoding='utf-8') as f:
+                option_overrides = json.load(f).get('importOptions')
+        except Exception as e:
+            logger.warning("Erro ao carregar listas de importação da empresa: %s", e)
+    
+    return build_schema(option_overrides if isinstance(option_overrides, dict) else None)
+
 # Carregar dados iniciais
-vehicles_data, users_data = load_data()
+users_data = load_data()
+
+# Catálogo particionado por garagem: cada partição (snapshots imutáveis, leituras sem lock,
+# escritas via catalog.write()) é lida do disco na primeira requisição da garagem
+garages = GarageCatalogs(DATA_DIR, SEED_VEHICLES)
+
+def loaded_vehicles():
+    return sum(len(partition.catalog.snapshot) for partition in garages.loaded())
+
+metrics.registry.gauge('mock_catalog_vehicles', 'Veículos no snapshot atual, por garagem carregada', ('garage',),
+                       function=lambda: {(str(p.garage_id),): len(p.catalog.snapshot) for p in garages.loaded()})
+metrics.registry.gauge('mock_catalog_version', 'Versão do snapshot atual, por garagem carregada', ('garage',),
+                       function=lambda: {(str(p.garage_id),): p.catalog.snapshot.version for p in garages.loaded()})
+metrics.registry.gauge('mock_catalog_partitions', 'Partições de garagem carregadas', function=lambda: len(garages.loaded()))
+metrics.registry.gauge('mock_log_records_dropped', 'Registros de log descartados por fila cheia', function=dropped_records)
+
+# Profiling sob demanda (MOCK_PROFILE_*); sem configuração o middleware nem é instalado
+profiler_config = profiling.install(app, profiling.ProfilerConfig.from_env(os.path.join(DATA_DIR, 'profiles')),
+                                    loaded_vehicles)
+
+def session_token(user):
+    """Token de sessão (JWT) com a garagem do usuário; é ele que direciona as requisições autenticadas"""
+    import jwt
+    
+    token_data = {"type": "session", "userId": user['id'], "garageId": user['garageId']}
+    return jwt.encode(token_data, "mock_secret_key", algorithm='HS256')
+
+def request_garage_id():
+    """Garagem da requisição autenticada: token de sessão, header X-Garage-Id ou a garagem padrão"""
+    import jwt
+    
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        try:
+            decoded = jwt.decode(authorization[7:], "mock_secret_key", algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            # tokens antigos/de demonstração ("demo-token") ficam na garagem padrão
+            decoded = {}
+        if decoded.get('type') == 'session' and parse_garage_id(decoded.get('garageId')):
+            return parse_garage_id(decoded['garageId'])
+    return parse_garage_id(request.headers.get('X-Garage-Id')) or DEFAULT_GARAGE_ID
+
+def current_partition():
+    """Partição da garagem da requisição (carregada aqui se for o primeiro acesso)"""
+    return garages.get(request_garage_id())
+
+@app.before_request
+def validate_garage_header():
+    garage_header = request.headers.get('X-Garage-Id')
+    if garage_header is not None and parse_garage_id(garage_header) is None:
+        return jsonify({"error": "X-Garage-Id inválido"}), 400
 
 @app.route('/api/login', methods=['POST'])
 def login():
+    user = {"id": 1, "name": "Demo User", "email": "demo@garage.com", "role": "admin", "garageId": DEFAULT_GARAGE_ID}
     return jsonify({
-        "token": "mock-jwt-token",
-        "user": {"id": 1, "name": "Demo User", "email": "demo@garage.com", "role": "admin"}
+        "token": session_token(user),
+        "user": user
     })
 
 @app.route('/api/register', methods=['POST'])
 def register():
+    user = {"id": 2, "name": "New User", "email": "new@garage.com", "role": "user", "garageId": DEFAULT_GARAGE_ID}
     return jsonify({
-        "token": "mock-jwt-token", 
-        "user": {"id": 2, "name": "New User", "email": "new@garage.com", "role": "user"}
+        "token": session_token(user), 
+        "user": user
     })
 
 @app.route('/api/vehicles', methods=['GET'])
 def get_vehicles():
     status_filter = request.args.get('status')
     category_filter = request.args.get('category')
+    # Opcionais obrigatórios: ?features=ABS,Airbags ou ?features=ABS&features=Airbags
+    feature_filter = [f.strip() for value in request.args.getlist('features') for f in value.split(',') if f.strip()]
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
     
-    filtered_vehicles = vehicles_data
-    
-    if status_filter:
-        filtered_vehicles = [v for v in filtered_vehicles if v.get('status') == status_filter]
+    # Snapshot consistente da garagem: escritas concorrentes publicam uma nova versão sem afetar esta
+    snapshot = current_partition().catalog.snapshot
+    filtered_vehicles = snapshot.vehicles
     
-    if category_filter:
-        filtered_vehicles = [v for v in filtered_vehicles if v.get('category') == category_filter]
+    # Filtros comparam os valores codificados dos campos categóricos (Vocabulary.stored), sem decodificar os veículos;
+    # opcionais são um AND dos bitmaps do snapshot
+    with metrics.SCAN_SECONDS.time(('/api/vehicles',)):
+        if feature_filter:
+            filtered_vehicles = snapshot.with_features(feature_filter)
+        
+        if status_filter:
+            stored = vocabularies['status'].stored(status_filter)
+            filtered_vehicles = [v for v in filtered_vehicles if v.raw('status') == stored]
+        
+        if category_filter:
+            stored = vocabularies['category'].stored(category_filter)
+            filtered_vehicles = [v for v in filtered_vehicles if v.raw('category') == stored]
     
     # Calcular paginação
     total_vehicles = len(filtered_vehicles)
     total_pages = (total_vehicles + limit - 1) // limit  # Ceiling division
     start_index = (page - 1) * limit
     end_index = start_index + limit
-    paginated_vehicles = filtered_vehicles[start_index:end_index]
+    paginated_vehicles = list(filtered_vehicles[start_index:end_index])
     
     return jsonify({
         "vehicles": paginated_vehicles,
@@ -159,18 +253,122 @@ def get_vehicles():
         "currentPage": page,
         "totalVehicles": total_vehicles,
         "hasNextPage": page < total_pages,
-        "hasPrevPage": page > 1
+        "hasPrevPage": page > 1,
+        "version": snapshot.version
     })
 
+def changes_response(catalog):
+    """Delta desde ?since=<versão>: veículos alterados (estado atual) e ids excluídos"""
+    from mock_server import changes
+    
+    since = changes.parse_version(request.args.get('since'))
+    if since is None:
+        return jsonify({"error": "since inválido: use a versão devolvida pela última sincronização"}), 400
+    
+    snapshot = catalog.snapshot
+    delta = changes.changes_since(snapshot, since)
+    if delta is None:
+        # Fora do histórico (ring) ou de outra instância do catálogo: o cliente recarrega tudo
+        return jsonify({"error": "Versão fora do histórico de alterações; recarregue o catálogo",
+                        **changes.reset_payload(snapshot)}), 410
+    return jsonify(delta)
+
+def changes_stream_response(catalog):
+    """Mesmo feed via Server-Sent Events; reconexões retomam do Last-Event-ID"""
+    from mock_server import changes
+    
+    since_value = request.headers.get('Last-Event-ID') or request.args.get('since')
+    since = changes.parse_version(since_value) if since_value else catalog.snapshot.version
+    if since is None:
+        return jsonify({"error": "since inválido"}), 400
+    
+    # Cada stream prende uma thread enquanto o cliente está conectado: limite por processo
+    if not changes.acquire_slot():
+        response = jsonify({"error": "Muitos streams abertos; use GET /api/vehicles/changes?since=<versão>"})
+        response.headers['Retry-After'] = str(changes.RETRY_MILLISECONDS // 1000)
+        return response, 503
+    
+    response = Response(stream_with_context(changes.stream(catalog, since)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(changes.release_slot)
+    return response
+
+@app.route('/api/vehicles/changes', methods=['GET'])
+def get_vehicle_changes():
+    """Sincronização incremental: GET /api/vehicles/changes?since=<versão>"""
+    return changes_response(current_partition().catalog)
+
+@app.route('/api/vehicles/changes/stream', methods=['GET'])
+def stream_vehicle_changes():
+    """Alterações em tempo real (text/event-stream)"""
+    return changes_stream_response(current_partition().catalog)
+
+@app.route('/api/vehicles/features', methods=['GET'])
+def get_vehicle_features():
+    """Dicionário canônico de opcionais, com quantos veículos têm cada um"""
+    from mock_server.features import dictionary
+    
+    counts = current_partition().catalog.snapshot.features.counts()
+    return jsonify({
+        "features": [{"label": label, "count": counts.get(label, 0)} for label in dictionary.labels]
+    })
+
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    """Agregados para dashboards: preços, idade do estoque, vendidos por mês, histograma"""
+    try:
+        from mock_server import analytics
+    except ImportError:
+        return jsonify({"error": "Analytics requer numpy (pip install numpy)"}), 501
+    
+    try:
+        bins = int(request.args.get('bins', analytics.DEFAULT_BINS))
+    except ValueError:
+        return jsonify({"error": "bins inválido"}), 400
+    
+    with metrics.SCAN_SECONDS.time(('/api/analytics',)):
+        result = analytics.analytics(current_partition().catalog.snapshot, bins)
+    return jsonify(result)
+
 @app.route('/api/vehicles/<int:vehicle_id>', methods=['GET'])
 def get_vehicle(vehicle_id):
-    vehicle = next((v for v in vehicles_data if v['id'] == vehicle_id), None)
+    vehicle = current_partition().catalog.snapshot.get(vehicle_id)
     if vehicle:
         return jsonify(vehicle)
     return jsonify({"error": "Veículo não encontrado"}), 404
 
+def similar_vehicles_response(snapshot, vehicle_id):
+    """Resposta de /similar (painel e catálogo público): ?limit=6&status=Disponível"""
+    try:
+        from mock_server import similar
+    except ImportError:
+        return jsonify({"error": "Veículos semelhantes requerem numpy (pip install numpy)"}), 501
+    
+    try:
+        limit = int(request.args.get('limit', similar.DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit inválido"}), 400
+    
+    results = similar.similar(snapshot, vehicle_id, limit, request.args.get('status') or None)
+    if results is None:
+        return jsonify({"error": "Veículo não encontrado"}), 404
+    return jsonify({
+        "vehicleId": vehicle_id,
+        "vehicles": [vehicle for vehicle, _ in results],
+        "distances": [distance for _, distance in results]
+    })
+
+@app.route('/api/vehicles/<int:vehicle_id>/similar', methods=['GET'])
+def get_similar_vehicles(vehicle_id):
+    """Veículos mais parecidos (preço, ano, km, categoria, carroceria, combustível e opcionais)"""
+    return similar_vehicles_response(current_partition().catalog.snapshot, vehicle_id)
+
 @app.route('/api/vehicles', methods=['POST'])
 def create_vehicle():
+    partition = current_partition()
+    catalog = partition.catalog
+    new_id = None
     try:
         # Verificar se é FormData ou JSON
         if request.content_type and 'multipart/form-data' in request.content_type:
@@ -202,33 +400,28 @@ def create_vehicle():
             
         else:
             # Processar JSON (compatibilidade com versões antigas)
-            print(f"Content-Type: {request.content_type}")
-            print(f"Request data: {request.data}")
-            print(f"Request form: {request.form}")
+            logger.debug("Criação via JSON (Content-Type: %s, %s bytes)", request.content_type, request.content_length)
             
             try:
                 data = request.get_json()
                 if data is None:
-                    print("❌ request.get_json() retornou None")
+                    logger.warning("request.get_json() retornou None")
                     return jsonify({"error": "Dados JSON inválidos ou ausentes"}), 400
-                print(f"✅ JSON recebido: {data}")
+                logger.debug("JSON recebido: %s", Payload(data))
             except Exception as json_error:
-                print(f"❌ Erro ao processar JSON: {json_error}")
+                logger.warning("Erro ao processar JSON: %s", json_error)
                 return jsonify({"error": f"Erro ao processar JSON: {str(json_error)}"}), 400
         
-        # Gerar novo ID único (evitar duplicatas)
-        existing_ids = [v['id'] for v in vehicles_data]
-        new_id = 1
-        while new_id in existing_ids:
-            new_id += 1
-        
         # Verificar se a placa já existe (placa deve ser única)
         license_plate = data.get('licensePlate', '').strip()
         if license_plate:
-            existing_plates = [v.get('licensePlate', '') for v in vehicles_data]
+            existing_plates = [v.get('licensePlate', '') for v in catalog.snapshot.vehicles]
             if license_plate in existing_plates:
                 return jsonify({"error": f"Já existe um veículo com a placa {license_plate}"}), 400
         
+        # Reservar novo ID único (os uploads usam o ID antes do veículo ser publicado)
+        new_id = catalog.reserve_id()
+        
         # Processar uploads de arquivos
         media = {"photos": [], "videos": [], "inspection": None}
         
@@ -243,7 +436,7 @@ def create_vehicle():
                     file_path = os.path.join(UPLOADS_DIR, filename)
                     
                     # Salvar arquivo
-                    photo_file.save(file_path)
+                    save_upload(photo_file, file_path, 'photo')
                     media['photos'].append(f"/uploads/{filename}")
             
             # Processar vídeos do FormData
@@ -254,7 +447,7 @@ def create_vehicle():
                     filename = f"video_{new_id}_{i}_{uuid.uuid4().hex[:8]}.{file_ext}"
                     file_path = os.path.join(UPLOADS_DIR, filename)
                     
-                    video_file.save(file_path)
+                    save_upload(video_file, file_path, 'video')
                     media['videos'].append(f"/uploads/{filename}")
             
             # Processar inspeção do FormData
@@ -264,7 +457,7 @@ def create_vehicle():
                 filename = f"inspection_{new_id}_{uuid.uuid4().hex[:8]}.{file_ext}"
                 file_path = os.path.join(UPLOADS_DIR, filename)
                 
-                inspection_file.save(file_path)
+                save_upload(inspection_file, file_path, 'inspection')
                 media['inspection'] = f"/uploads/{filename}"
         
         # Processar fotos do JSON (compatibilidade)
@@ -300,7 +493,7 @@ def create_vehicle():
             try:
                 price_value = float(price_clean)
             except ValueError:
-                print(f"⚠️ Erro ao converter preço '{price_value}' para float, usando 0")
+                logger.warning("Erro ao converter preço %r para float, usando 0", price_value)
                 price_value = 0
         
         # Processar e converter valores de quilometragem
@@ -311,13 +504,14 @@ def create_vehicle():
             try:
                 mileage_value = int(mileage_clean)
             except ValueError:
-                print(f"⚠️ Erro ao converter quilometragem '{mileage_value}' para int, usando 0")
+                logger.warning("Erro ao converter quilometragem %r para int, usando 0", mileage_value)
                 mileage_value = 0
         
         # Criar novo veículo
         new_vehicle = {
             "id": new_id,
-            "vehicleId": get_next_vehicle_id(),
+            "vehicleId": partition.reserve_codes(1)[0],
+            "garageId": partition.garage_id,
             "category": data.get('category', 'Carro'),
             "brand": data.get('brand', ''),
             "model": data.get('model', ''),
@@ -343,15 +537,178 @@ def create_vehicle():
             "createdAt": datetime.now().isoformat()
         }
         
-        vehicles_data.append(new_vehicle)
-        save_vehicles(vehicles_data)
-        
+        with catalog.write() as txn:
+            # Revalidar a placa contra a versão mais recente do catálogo
+            duplicate = bool(license_plate) and any(v.get('licensePlate', '') == license_plate for v in txn.vehicles)
+            if not duplicate:
+                txn.put(new_vehicle)
+        if duplicate:
+            # Fora da transação: release_ids também adquire o write_lock (não reentrante)
+            catalog.release_ids([new_id])
+            return jsonify({"error": f"Já existe um veículo com a placa {license_plate}"}), 400
+
         return jsonify(new_vehicle), 201
         
     except Exception as e:
-        print(f"Erro ao criar veículo: {e}")
+        if new_id is not None:
+            catalog.release_ids([new_id])
+        logger.exception("Erro ao criar veículo: %s", e)
         return jsonify({"error": "Erro ao criar veículo"}), 500
 
+@app.route('/api/vehicles/export', methods=['GET'])
+def export_vehicles():
+    """Exporta o catálogo em streaming (format=ndjson|csv|xlsx, media=1 para ZIP com as mídias)"""
+    from mock_server import exporter
+    
+    fmt = request.args.get('format', 'xlsx').lower()
+    if fmt not in exporter.FORMATS:
+        return jsonify({"error": f"Formato inválido. Use: {', '.join(exporter.FORMATS)}"}), 400
+    
+    status_filter = request.args.get('status')
+    category_filter = request.args.get('category')
+    
+    # Snapshot imutável da garagem: o export não é afetado por escritas concorrentes
+    vehicles = current_partition().catalog.snapshot.vehicles
+    if status_filter:
+        vehicles = [v for v in vehicles if v.get('status') == status_filter]
+    if category_filter:
+        vehicles = [v for v in vehicles if v.get('category') == category_filter]
+    
+    mimetype, extension = exporter.FORMATS[fmt]
+    basename = f"veiculos-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    
+    if request.args.get('media') == '1':
+        body = exporter.iter_zip(vehicles, fmt, UPLOADS_DIR, f"{basename}.{extension}")
+        mimetype, filename = 'application/zip', f"{basename}.zip"
+    else:
+        body = exporter.iter_export(vehicles, fmt)
+        filename = f"{basename}.{extension}"
+    
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/vehicles/import-template', methods=['GET'])
+def get_import_template():
+    """Modelo Excel de importação, gerado do schema e cacheado pelo hash dele (ETag)"""
+    from mock_server import template
+    from mock_server.vehicle_schema import schema_hash
+    
+    schema = load_import_schema()
+    if schema_hash(schema) in request.if_none_match:
+        return Response(status=304)
+    
+    etag, content = template.get_template(schema)
+    response = Response(content, mimetype=template.MIMETYPE)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Content-Disposition'] = f'attachment; filename="{template.FILENAME}"'
+    return response
+
+@app.route('/api/vehicles/import', methods=['POST'])
+def import_vehicles():
+    """Importação em massa: planilha do modelo Excel (campo 'file') + ZIP de mídias opcional (campo 'media')"""
+    from mock_server import importer
+    
+    workbook_file = request.files.get('file')
+    if not workbook_file or not workbook_file.filename:
+        return jsonify({"error": "Envie a planilha de importação no campo 'file'"}), 400
+    
+    try:
+        batch_size = max(1, int(request.args.get('batchSize', importer.DEFAULT_BATCH_SIZE)))
+    except ValueError:
+        return jsonify({"error": "batchSize inválido"}), 400
+    
+    media_file = request.files.get('media')
+    archive = None
+    uploads = [importer.detach_upload(workbook_file.stream)]
+    try:
+        reader = importer.WorkbookReader(uploads[0], load_import_schema())
+        if media_file and media_file.filename:
+            uploads.append(importer.detach_upload(media_file.stream))
+            archive = importer.MediaArchive(uploads[1])
+    except importer.ImportFileError as e:
+        for upload in uploads:
+            upload.close()
+        return jsonify({"error": str(e)}), 400
+    
+    partition = current_partition()
+    catalog = partition.catalog
+    existing_plates = [v.get('licensePlate', '') for v in catalog.snapshot.vehicles]
+    vehicle_ids = []
+    
+    def commit_batch(rows):
+        # Um lote inteiro: IDs reservados de uma vez, mídias extraídas em streaming e uma
+        # versão publicada por lote (a memória não cresce com o tamanho da planilha)
+        vehicle_codes = partition.reserve_codes(len(rows))
+        new_ids = catalog.reserve_ids(len(rows))
+        staged = []
+        try:
+            for (row_number, fields), vehicle_code, new_id in zip(rows, vehicle_codes, new_ids):
+                import_id = fields.get('importId', '')
+                if archive:
+                    media = archive.extract(import_id, new_id, UPLOADS_DIR)
+                else:
+                    media = {"photos": [], "videos": [], "inspection": None}
+                staged.append((row_number, import_id, importer.build_vehicle(fields, new_id, vehicle_code, media)))
+            
+            # Placas revalidadas contra a versão mais recente: criações e outras importações
+            # concluídas depois da validação da linha viram erro dela
+            published, conflicts = [], []
+            with catalog.write() as txn:
+                plates = {v.get('licensePlate', '').strip().upper() for v in txn.vehicles}
+                plates.discard('')
+                for entry in staged:
+                    vehicle = entry[2]
+                    if vehicle['licensePlate'].strip().upper() in plates:
+                        conflicts.append(entry)
+                    else:
+                        txn.put(vehicle)
+                        published.append(vehicle['id'])
+            vehicle_ids.extend(published)
+        except BaseException:
+            conflicts = staged
+            raise
+        finally:
+            # Fora da transação (release_ids também adquire o write_lock): IDs que não viraram
+            # veículo publicado voltam e as mídias já extraídas deles são apagadas
+            catalog.release_ids(new_ids)
+            for _, _, vehicle in conflicts:
+                importer.remove_files(importer.media_files(vehicle['media']), UPLOADS_DIR)
+        return [{"row": row_number, "id": import_id,
+                 "errors": [f"Placa: já existe um veículo com a placa {vehicle['licensePlate']}"]}
+                for row_number, import_id, vehicle in conflicts]
+    
+    def run():
+        try:
+            for event in importer.import_vehicles(reader, existing_plates, commit_batch, batch_size):
+                if event['event'] == 'done':
+                    event['vehicleIds'] = vehicle_ids
+                    if archive:
+                        event['unmatchedMedia'] = archive.unmatched_ids()
+                yield event
+        finally:
+            reader.close()
+            if archive:
+                archive.close()
+            for upload in uploads:
+                upload.close()
+    
+    # Progresso em tempo real (NDJSON) quando solicitado
+    wants_stream = request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', '')
+    if wants_stream:
+        lines = (json.dumps(event, ensure_ascii=False) + '\n' for event in run())
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    
+    try:
+        result = None
+        for event in run():
+            result = event
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("Erro ao importar veículos: %s", e)
+        return jsonify({"error": "Erro ao importar veículos"}), 500
+
 @app.route('/api/vehicles/<int:vehicle_id>', methods=['PUT'])
 def update_vehicle(vehicle_id):
     try:
@@ -380,94 +737,92 @@ def update_vehicle(vehicle_id):
                         # Salvar arquivo
                         filename = f"photo_{vehicle_id}_{len(data['photos'])}_{uuid.uuid4().hex[:8]}.{file.filename.split('.')[-1]}"
                         file_path = os.path.join(UPLOADS_DIR, filename)
-                        file.save(file_path)
+                        save_upload(file, file_path, 'photo')
                         data['photos'].append(f"/uploads/{filename}")
         else:
             # Processar JSON
             data = request.get_json()
         
-        vehicle_index = next((i for i, v in enumerate(vehicles_data) if v['id'] == vehicle_id), None)
+        with current_partition().catalog.write() as txn:
+            current = txn.get(vehicle_id)
         
-        if vehicle_index is None:
-            return jsonify({"error": "Veículo não encontrado"}), 404
+            if current is None:
+                return jsonify({"error": "Veículo não encontrado"}), 404
         
-        # Verificar se a placa já existe em outro veículo (placa deve ser única)
-        license_plate = data.get('licensePlate', '').strip()
-        if license_plate:
-            existing_plates = [(i, v.get('licensePlate', '')) for i, v in enumerate(vehicles_data)]
-            for i, plate in existing_plates:
-                if plate == license_plate and i != vehicle_index:
-                    return jsonify({"error": f"Já existe outro veículo com a placa {license_plate}"}), 400
+            # Verificar se a placa já existe em outro veículo (placa deve ser única)
+            license_plate = data.get('licensePlate', '').strip()
+            if license_plate:
+                existing_plates = [(v['id'], v.get('licensePlate', '')) for v in txn.vehicles]
+                for other_id, plate in existing_plates:
+                    if plate == license_plate and other_id != vehicle_id:
+                        return jsonify({"error": f"Já existe outro veículo com a placa {license_plate}"}), 400
 
-        # Atualizar dados do veículo
-        vehicle = vehicles_data[vehicle_index]
+            # Atualizar uma cópia do veículo (a versão publicada não é alterada)
+            vehicle = copy_vehicle(current)
         
-        # Manter mídia existente
-        existing_media = vehicle.get('media', {"photos": [], "videos": [], "inspection": None})
+            # Manter mídia existente
+            existing_media = vehicle.get('media', {"photos": [], "videos": [], "inspection": None})
         
-        # Processar reordenação de fotos existentes
-        if 'existingPhotosOrder' in data and data['existingPhotosOrder']:
-            try:
-                existing_photos_order = data['existingPhotosOrder'] if isinstance(data['existingPhotosOrder'], list) else json.loads(data['existingPhotosOrder'])
-                # Reordenar fotos existentes conforme a nova ordem
-                if existing_photos_order and existing_media.get('photos'):
-                    reordered_photos = []
-                    for photo_url in existing_photos_order:
-                        if photo_url in existing_media['photos']:
-                            reordered_photos.append(photo_url)
-                    existing_media['photos'] = reordered_photos
-                    print(f"Fotos reordenadas: {existing_media['photos']}")
-            except Exception as e:
-                print(f"Erro ao processar existingPhotosOrder: {e}")
+            # Processar reordenação de fotos existentes
+            if 'existingPhotosOrder' in data and data['existingPhotosOrder']:
+                try:
+                    existing_photos_order = data['existingPhotosOrder'] if isinstance(data['existingPhotosOrder'], list) else json.loads(data['existingPhotosOrder'])
+                    # Reordenar fotos existentes conforme a nova ordem
+                    if existing_photos_order and existing_media.get('photos'):
+                        reordered_photos = []
+                        for photo_url in existing_photos_order:
+                            if photo_url in existing_media['photos']:
+                                reordered_photos.append(photo_url)
+                        existing_media['photos'] = reordered_photos
+                        logger.debug("Fotos reordenadas: %s", Payload(existing_media['photos']))
+                except Exception as e:
+                    logger.warning("Erro ao processar existingPhotosOrder: %s", e)
         
-        # Processar reordenação de vídeos existentes
-        if 'existingVideosOrder' in data and data['existingVideosOrder']:
-            try:
-                existing_videos_order = data['existingVideosOrder'] if isinstance(data['existingVideosOrder'], list) else json.loads(data['existingVideosOrder'])
-                # Reordenar vídeos existentes conforme a nova ordem
-                if existing_videos_order and existing_media.get('videos'):
-                    reordered_videos = []
-                    for video_url in existing_videos_order:
-                        if video_url in existing_media['videos']:
-                            reordered_videos.append(video_url)
-                    existing_media['videos'] = reordered_videos
-                    print(f"Vídeos reordenados: {existing_media['videos']}")
-            except Exception as e:
-                print(f"Erro ao processar existingVideosOrder: {e}")
-        
-        # Adicionar novas fotos (se houver)
-        if 'photos' in data and data['photos']:
-            if isinstance(data['photos'], list):
-                # Fotos já processadas (URLs)
-                existing_media['photos'].extend(data['photos'])
-            else:
-                # Processar fotos base64
-                new_photos = []
-                photos_data = data['photos'] if isinstance(data['photos'], list) else [data['photos']]
-                for i, photo_data in enumerate(photos_data):
-                    if photo_data and photo_data.startswith('data:'):
-                        filename = f"photo_{vehicle_id}_{len(existing_media['photos']) + i}_{uuid.uuid4().hex[:8]}.jpg"
-                        file_url = save_file(photo_data, filename)
-                        if file_url:
-                            new_photos.append(file_url)
-                existing_media['photos'].extend(new_photos)
-        
-        # Atualizar outros campos (exceto mídia)
-        for key, value in data.items():
-            if key not in ['photos', 'videos', 'inspection', 'existingPhotosOrder', 'existingVideosOrder']:
-                vehicle[key] = value
+            # Processar reordenação de vídeos existentes
+            if 'existingVideosOrder' in data and data['existingVideosOrder']:
+                try:
+                    existing_videos_order = data['existingVideosOrder'] if isinstance(data['existingVideosOrder'], list) else json.loads(data['existingVideosOrder'])
+                    # Reordenar vídeos existentes conforme a nova ordem
+                    if existing_videos_order and existing_media.get('videos'):
+                        reordered_videos = []
+                        for video_url in existing_videos_order:
+                            if video_url in existing_media['videos']:
+                                reordered_videos.append(video_url)
+                        existing_media['videos'] = reordered_videos
+                        logger.debug("Vídeos reordenados: %s", Payload(existing_media['videos']))
+                except Exception as e:
+                    logger.warning("Erro ao processar existingVideosOrder: %s", e)
+        
+            # Adicionar novas fotos (se houver)
+            if 'photos' in data and data['photos']:
+                if isinstance(data['photos'], list):
+                    # Fotos já processadas (URLs)
+                    existing_media['photos'].extend(data['photos'])
+                else:
+                    # Processar fotos base64
+                    new_photos = []
+                    photos_data = data['photos'] if isinstance(data['photos'], list) else [data['photos']]
+                    for i, photo_data in enumerate(photos_data):
+                        if photo_data and photo_data.startswith('data:'):
+                            filename = f"photo_{vehicle_id}_{len(existing_media['photos']) + i}_{uuid.uuid4().hex[:8]}.jpg"
+                            file_url = save_file(photo_data, filename)
+                            if file_url:
+                                new_photos.append(file_url)
+                    existing_media['photos'].extend(new_photos)
+        
+            # Atualizar outros campos (exceto mídia)
+            for key, value in data.items():
+                if key not in ['photos', 'videos', 'inspection', 'existingPhotosOrder', 'existingVideosOrder']:
+                    vehicle[key] = value
         
-        vehicle['media'] = existing_media
-        vehicles_data[vehicle_index] = vehicle
-        save_vehicles(vehicles_data)
+            vehicle['media'] = existing_media
+            txn.put(vehicle)
         
-        print(f"Veículo {vehicle_id} atualizado com sucesso")
+        logger.info("Veículo %s atualizado com sucesso", vehicle_id)
         return jsonify(vehicle)
         
     except Exception as e:
-        print(f"Erro ao atualizar veículo: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erro ao atualizar veículo: %s", e)
         return jsonify({"error": "Erro interno do servidor"}), 500
 
 @app.route('/api/vehicles/<int:vehicle_id>', methods=['PATCH'])
@@ -476,49 +831,64 @@ def patch_vehicle(vehicle_id):
     try:
         data = request.get_json()
         
-        vehicle_index = next((i for i, v in enumerate(vehicles_data) if v['id'] == vehicle_id), None)
-        
-        if vehicle_index is None:
-            return jsonify({"error": "Veículo não encontrado"}), 404
+        with current_partition().catalog.write() as txn:
+            current = txn.get(vehicle_id)
+            
+            if current is None:
+                return jsonify({"error": "Veículo não encontrado"}), 404
+            
+            # Atualizar apenas os campos fornecidos (em uma cópia)
+            vehicle = copy_vehicle(current)
+            for key, value in data.items():
+                vehicle[key] = value
+            
+            txn.put(vehicle)
         
-        # Atualizar apenas os campos fornecidos
-        vehicle = vehicles_data[vehicle_index]
-        for key, value in data.items():
-            vehicle[key] = value
+        logger.info("Veículo %s atualizado parcialmente: %s", vehicle_id, Payload(data))
+        return jsonify(vehicle)
         
-        vehicles_data[vehicle_index] = vehicle
-        save_vehicles(vehicles_data)
+    except Exception as e:
+        logger.exception("Erro ao atualizar veículo parcialmente: %s", e)
+        return jsonify({"error": "Erro interno do servidor"}), 500
+
+@app.route('/api/vehicles/batch', methods=['POST'])
+def batch_vehicles():
+    """Aplica várias operações (patch, status, delete) de uma vez, com uma única gravação"""
+    from mock_server import batch
+    
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    
+    try:
+        with current_partition().catalog.write() as txn:
+            results, valid = batch.validate_operations(operations, txn.vehicles)
+            if not valid:
+                return jsonify({"error": "Nenhuma operação aplicada: lote inválido", "results": results}), 400
+            
+            results = batch.apply_operations(operations, txn)
         
-        print(f"Veículo {vehicle_id} atualizado parcialmente: {data}")
-        return jsonify(vehicle)
+        return jsonify({"applied": len(results), "results": results})
         
+    except batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Erro ao atualizar veículo parcialmente: {e}")
+        logger.exception("Erro ao aplicar lote de operações: %s", e)
         return jsonify({"error": "Erro interno do servidor"}), 500
 
 @app.route('/api/vehicles/<int:vehicle_id>', methods=['DELETE'])
 def delete_vehicle(vehicle_id):
     try:
-        # Encontrar o veículo
-        vehicle_index = None
-        for i, v in enumerate(vehicles_data):
-            if v['id'] == vehicle_id:
-                vehicle_index = i
-                break
-        
-        if vehicle_index is None:
-            return jsonify({"error": "Veículo não encontrado"}), 404
-        
-        # Remover o veículo da lista
-        deleted_vehicle = vehicles_data.pop(vehicle_index)
-        
-        # Salvar dados atualizados
-        save_vehicles(vehicles_data)
+        with current_partition().catalog.write() as txn:
+            # Remover o veículo (a nova versão é salva e publicada ao fim do bloco)
+            deleted_vehicle = txn.delete(vehicle_id)
+            
+            if deleted_vehicle is None:
+                return jsonify({"error": "Veículo não encontrado"}), 404
         
         return jsonify({"message": "Veículo excluído com sucesso", "vehicle": deleted_vehicle})
         
     except Exception as e:
-        print(f"Erro ao excluir veículo: {e}")
+        logger.exception("Erro ao excluir veículo: %s", e)
         return jsonify({"error": "Erro interno do servidor"}), 500
 
 @app.route('/uploads/<filename>')
@@ -527,6 +897,39 @@ def uploaded_file(filename):
     response.headers['Access-Control-Allow-Origin'] = '*'
     return response
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas no formato texto do Prometheus"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_request_profiles():
+    """Perfis de requisições gravados (mais recentes primeiro)"""
+    try:
+        limit = max(1, int(request.args.get('limit', 50)))
+    except ValueError:
+        return jsonify({"error": "limit inválido"}), 400
+    return jsonify({
+        "enabled": profiler_config.enabled,
+        "header": profiler_config.header,
+        "sampleRate": profiler_config.sample_rate,
+        "profiles": profiling.list_profiles(profiler_config.directory, limit)
+    })
+
+@app.route('/api/admin/admission', methods=['GET'])
+def get_admission():
+    """Limites do controle de admissão por rota, com vagas em uso, filas e recusas deste processo"""
+    if admission_controller is None:
+        return jsonify({"enabled": False})
+    return jsonify(admission_controller.describe())
+
+@app.route('/api/admin/profiles/<filename>', methods=['GET'])
+def download_request_profile(filename):
+    """Baixa um arquivo .pstats ou .collapsed"""
+    if not filename.endswith(('.pstats', '.collapsed')):
+        return jsonify({"error": "Arquivo de perfil inválido"}), 400
+    return send_from_directory(os.path.abspath(profiler_config.directory), filename, as_attachment=True)
+
 @app.route('/api/users', methods=['GET'])
 def get_users():
     return jsonify(users_data)
@@ -626,7 +1029,7 @@ def get_profile():
                     "profileImage": profile_data.get('profileImage', '')
                 })
             except Exception as e:
-                print(f"Erro ao carregar dados do perfil: {e}")
+                logger.warning("Erro ao carregar dados do perfil: %s", e)
         
         # Retornar dados padrão se não houver arquivo salvo
         return jsonify({
@@ -648,8 +1051,8 @@ def share_catalog():
     import jwt
     import time
     
-    # Simular dados do usuário logado (em um sistema real viria do token de autenticação)
-    garage_id = 1
+    # Garagem do usuário logado (token de sessão)
+    garage_id = request_garage_id()
     
     # Gerar token único
     token_data = {
@@ -671,6 +1074,13 @@ def share_catalog():
         "expiresIn": "30 dias"
     })
 
+def public_partition(decoded):
+    """Partição da garagem de um token público (None se o token não é de catálogo público)"""
+    if decoded.get('type') != 'public_catalog':
+        return None
+    garage_id = parse_garage_id(decoded.get('garageId', DEFAULT_GARAGE_ID))
+    return None if garage_id is None else garages.get(garage_id)
+
 @app.route('/api/public/catalog/<token>', methods=['GET'])
 def validate_public_catalog(token):
     """Valida o token público e retorna informações do catálogo"""
@@ -701,29 +1111,60 @@ def get_public_vehicles(token):
         secret = "mock_secret_key"
         decoded = jwt.decode(token, secret, algorithms=['HS256'])
         
-        if decoded.get('type') != 'public_catalog':
+        partition = public_partition(decoded)
+        if partition is None:
             return jsonify({"error": "Token inválido"}), 401
             
-        # Retornar todos os veículos (em um sistema real filtraria por garageId)
+        # Só os veículos da garagem do token (a partição dela)
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 8))
         
         start_idx = (page - 1) * limit
         end_idx = start_idx + limit
         
-        paginated_vehicles = vehicles_data[start_idx:end_idx]
-        total_pages = (len(vehicles_data) + limit - 1) // limit
+        snapshot = partition.catalog.snapshot
+        paginated_vehicles = list(snapshot.vehicles[start_idx:end_idx])
+        total_pages = (len(snapshot) + limit - 1) // limit
         
         return jsonify({
             "vehicles": paginated_vehicles,
             "totalPages": total_pages,
-            "currentPage": page
+            "currentPage": page,
+            "version": snapshot.version
         })
     except jwt.ExpiredSignatureError:
         return jsonify({"error": "Token expirado"}), 401
     except jwt.InvalidTokenError:
         return jsonify({"error": "Token inválido"}), 401
 
+def public_catalog_or_error(token):
+    """(catálogo da garagem do token, None) ou (None, resposta de erro)"""
+    import jwt
+    
+    try:
+        decoded = jwt.decode(token, "mock_secret_key", algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({"error": "Token expirado"}), 401)
+    except jwt.InvalidTokenError:
+        return None, (jsonify({"error": "Token inválido"}), 401)
+    
+    partition = public_partition(decoded)
+    if partition is None:
+        return None, (jsonify({"error": "Token inválido"}), 401)
+    return partition.catalog, None
+
+@app.route('/api/public/catalog/<token>/vehicles/changes', methods=['GET'])
+def get_public_vehicle_changes(token):
+    """Sincronização incremental do catálogo público"""
+    catalog, error = public_catalog_or_error(token)
+    return error or changes_response(catalog)
+
+@app.route('/api/public/catalog/<token>/vehicles/changes/stream', methods=['GET'])
+def stream_public_vehicle_changes(token):
+    """Alterações do catálogo público em tempo real (text/event-stream)"""
+    catalog, error = public_catalog_or_error(token)
+    return error or changes_stream_response(catalog)
+
 @app.route('/api/public/catalog/<token>/vehicles/<int:vehicle_id>', methods=['GET'])
 def get_public_vehicle(token, vehicle_id):
     """Obtém detalhes de um veículo específico no catálogo público"""
@@ -733,11 +1174,12 @@ def get_public_vehicle(token, vehicle_id):
         secret = "mock_secret_key"
         decoded = jwt.decode(token, secret, algorithms=['HS256'])
         
-        if decoded.get('type') != 'public_catalog':
+        partition = public_partition(decoded)
+        if partition is None:
             return jsonify({"error": "Token inválido"}), 401
             
-        # Buscar veículo por ID
-        vehicle = next((v for v in vehicles_data if v['id'] == vehicle_id), None)
+        # Buscar veículo por ID na garagem do token
+        vehicle = partition.catalog.snapshot.get(vehicle_id)
         if not vehicle:
             return jsonify({"error": "Veículo não encontrado"}), 404
             
@@ -747,6 +1189,25 @@ def get_public_vehicle(token, vehicle_id):
     except jwt.InvalidTokenError:
         return jsonify({"error": "Token inválido"}), 401
 
+@app.route('/api/public/catalog/<token>/vehicles/<int:vehicle_id>/similar', methods=['GET'])
+def get_public_similar_vehicles(token, vehicle_id):
+    """Veículos semelhantes no catálogo público"""
+    import jwt
+    
+    try:
+        secret = "mock_secret_key"
+        decoded = jwt.decode(token, secret, algorithms=['HS256'])
+        
+        partition = public_partition(decoded)
+        if partition is None:
+            return jsonify({"error": "Token inválido"}), 401
+        
+        return similar_vehicles_response(partition.catalog.snapshot, vehicle_id)
+    except jwt.ExpiredSignatureError:
+        return jsonify({"error": "Token expirado"}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({"error": "Token inválido"}), 401
+
 @app.route('/api/company', methods=['GET'])
 def get_company():
     # Tentar carregar dados salvos do arquivo
@@ -758,7 +1219,7 @@ def get_company():
                 company_data = json.load(f)
             return jsonify(company_data)
         except Exception as e:
-            print(f"Erro ao carregar dados da empresa: {e}")
+            logger.warning("Erro ao carregar dados da empresa: %s", e)
     
     # Retornar dados padrão se não houver arquivo salvo
     return jsonify({
@@ -800,8 +1261,17 @@ def update_company():
             "updated_at": datetime.now().isoformat()
         }
         
-        # Salvar em arquivo para persistir os dados
+        # Listas personalizadas do modelo de importação (preservadas se não enviadas)
         company_file = os.path.join(DATA_DIR, 'company.json')
+        if isinstance(data.get('importOptions'), dict):
+            company_data['importOptions'] = data['importOptions']
+        elif os.path.exists(company_file):
+            with open(company_file, 'r', encoding='utf-8') as f:
+                previous_options = json.load(f).get('importOptions')
+            if previous_options:
+                company_data['importOptions'] = previous_options
+        
+        # Salvar em arquivo para persistir os dados
         with open(company_file, 'w', encoding='utf-8') as f:
             json.dump(company_data, f, ensure_ascii=False, indent=2)
         
@@ -820,14 +1290,51 @@ if __name__ == '__main__':
     print("   POST /api/register") 
     print("   GET  /api/vehicles")
     print("   GET  /api/vehicles/<id>")
+    print("   GET  /api/vehicles/changes?since=<versão>")
+    print("   GET  /api/vehicles/changes/stream")
     print("   POST /api/vehicles")
+    print("   GET  /api/vehicles/export")
+    print("   GET  /api/vehicles/import-template")
+    print("   POST /api/vehicles/import")
     print("   PUT  /api/vehicles/<id>")
     print("   DELETE /api/vehicles/<id>")
+    print("   POST /api/vehicles/batch")
     print("   GET  /api/users")
     print("   PUT  /api/profile")
     print("   GET  /api/profile")
     print("   GET  /api/company")
     print("   PUT  /api/company")
     print("   GET  /uploads/<filename>")
-    print("🌐 Servidor rodando em http://localhost:3001")
-    app.run(host='0.0.0.0', port=3001, debug=True)
\ No newline at end of file
+    print("   GET  /metrics")
+    print("   GET  /api/admin/profiles")
+
+    import argparse
+    parser = argparse.ArgumentParser(description="Mock server do catálogo de veículos")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--workers', type=int, default=0,
+                        help="processos (pre-fork) para modo de produção; 0 = servidor de desenvolvimento")
+    parser.add_argument('--asyncio', action='store_true',
+                        help="servidor asyncio (uploads e clientes lentos sem prender threads)")
+    parser.add_argument('--threads', type=int, default=32,
+                        help="threads para os handlers no modo --asyncio")
+    parser.add_argument('--log-level', help="DEBUG, INFO, WARNING ou ERROR (padrão: MOCK_LOG_LEVEL ou INFO)")
+    args = parser.parse_args()
+    if args.log_level:
+        configure_logging(args.log_level)
+    if args.asyncio and args.workers > 0:
+        parser.error("--asyncio e --workers não podem ser usados juntos")
+
+    if args.asyncio:
+        from mock_server import aio
+        aio.serve(app, args.host, args.port, UPLOADS_DIR, args.threads)
+    elif args.workers > 0:
+        from mock_server import cluster
+        # Um journal por garagem; a partição padrão já vai carregada para os workers
+        garages.get(DEFAULT_GARAGE_ID)
+        garages.enable_journals()
+        sync_interval = float(os.environ.get('MOCK_SYNC_INTERVAL', cluster.DEFAULT_SYNC_INTERVAL))
+        cluster.serve(app, garages, args.host, args.port, args.workers, sync_interval)
+    else:
+        print(f"🌐 Servidor rodando em http://localhost:{args.port}")
+        app.run(host=args.host, port=args.port, debug=True)
\ No newline at end of file
@@ -0,0 +1 @@
+"""Módulos de apoio do mock-server.py (importação, exportação e afins)"""
@@ -0,0 +1,498 @@
+"""
+Controle de admissão (load shedding) das rotas de escrita e upload.
+
+Alguns uploads grandes simultâneos em POST /api/vehicles ou PUT
+/api/vehicles/<id> saturam disco e memória e atrasam leituras baratas. Cada
+rota limitada tem o próprio limiter: até `concurrency` requisições em
+andamento e até `queue` esperando por no máximo `timeout` segundos. Fora
+disso a requisição é recusada na hora, sem ler o corpo, com 503 e
+Retry-After (estimado pelo tempo médio de atendimento da rota).
+
+Classes de prioridade (a classe define os limites padrão da rota):
+    public   /api/public/...: nunca passa pelo controle (nem fila, nem orçamento)
+    read     demais GET/HEAD/OPTIONS: sem limite
+    write    demais escritas: 8 em andamento, 16 na fila, 5 s de espera
+    upload   criação/edição de veículo com arquivos e importação: 4/8/10 s
+             (importação 1/2/30 s); o corpo conta no orçamento de bytes
+
+Os uploads admitidos dividem um orçamento de bytes em trânsito (soma dos
+Content-Length): um upload que não cabe espera na fila da rota, e um corpo
+maior que o orçamento inteiro recebe 413.
+
+Configuração (ambiente), por processo (cada worker do --workers tem a sua):
+    MOCK_ADMISSION=0             desliga
+    MOCK_ADMISSION_LIMITS        limites por classe, ex.: "write=8:16:5,upload=4:8:10"
+                                 (concorrência:fila:espera em s; "-" = sem limite)
+    MOCK_ADMISSION_ROUTES        por rota, ex.: "POST /api/vehicles/import=1:2:30,
+                                 GET /api/vehicles/export=upload" (limites, classe
+                                 ou classe:limites)
+    MOCK_ADMISSION_BODY_BYTES    orçamento de bytes dos uploads (padrão 512 MiB)
+
+No modo --asyncio a admissão acontece no event loop, antes de ler o corpo:
+a espera não ocupa thread e corpos recusados nem chegam ao disco. Nos
+demais modos, no middleware WSGI, antes de o Flask ler o corpo.
+
+Observável em /metrics (mock_admission_*) e em GET /api/admin/admission.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RoutingException
+
+from . import metrics
+
+CLASSES = ('public', 'read', 'write', 'upload')
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+DEFAULT_BODY_BYTES = 512 * 2 ** 20
+UNKNOWN_BODY_BYTES = 64 * 2 ** 20   # corpo chunked, sem Content-Length
+DRAIN_BYTES = 64 * 2 ** 20          # corpo de uma recusa descartado antes de fechar (até este tamanho...)
+DRAIN_SECONDS = 10.0                # ...e este tempo), para o cliente receber o 503
+DRAIN_CHUNK = 64 * 1024
+MAX_RETRY_AFTER = 60
+POLL_SECONDS = 0.02
+SERVICE_SMOOTHING = 0.2
+TICKET_KEY = 'mock_server.admission'
+
+logger = logging.getLogger(__name__)
+
+
+class Limits:
+    __slots__ = ('concurrency', 'queue', 'timeout')
+
+    def __init__(self, concurrency, queue, timeout):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+
+    @classmethod
+    def parse(cls, spec):
+        """"concorrência:fila:espera" -> Limits; "-" -> None (sem limite)"""
+        if spec.strip() in ('-', 'off'):
+            return None
+        parts = spec.split(':')
+        if len(parts) != 3:
+            raise ValueError(f"Limite inválido: {spec!r} (use concorrência:fila:espera)")
+        concurrency, queue, timeout = int(parts[0]), int(parts[1]), float(parts[2])
+        if concurrency < 1 or queue < 0 or timeout < 0:
+            raise ValueError(f"Limite inválido: {spec!r}")
+        return cls(concurrency, queue, timeout)
+
+    def to_json(self):
+        return {"concurrency": self.concurrency, "queue": self.queue, "timeout": self.timeout}
+
+
+DEFAULT_LIMITS = {
+    'public': None,
+    'read': None,
+    'write': Limits(8, 16, 5.0),
+    'upload': Limits(4, 8, 10.0),
+}
+
+# (método, rota) -> {"class": ..., "limits": ...}; chaves ausentes vêm da classe
+DEFAULT_ROUTES = {
+    ('POST', '/api/vehicles'): {"class": 'upload'},
+    ('PUT', '/api/vehicles/<int:vehicle_id>'): {"class": 'upload'},
+    ('POST', '/api/vehicles/import'): {"class": 'upload', "limits": Limits(1, 2, 30.0)},
+}
+
+
+def _default_class(method, rule):
+    if rule.startswith('/api/public/'):
+        return 'public'
+    return 'read' if method in READ_METHODS else 'write'
+
+
+class AdmissionConfig:
+    def __init__(self, enabled=True, limits=None, routes=None, body_bytes=DEFAULT_BODY_BYTES):
+        self.enabled = enabled
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.routes = dict(DEFAULT_ROUTES, **(routes or {}))
+        self.body_bytes = body_bytes
+
+    @classmethod
+    def from_env(cls):
+        limits = {}
+        for item in filter(None, (i.strip() for i in os.environ.get('MOCK_ADMISSION_LIMITS', '').split(','))):
+            name, _, spec = item.partition('=')
+            if name.strip() not in CLASSES:
+                raise ValueError(f"Classe desconhecida em MOCK_ADMISSION_LIMITS: {name!r}")
+            limits[name.strip()] = Limits.parse(spec)
+        routes = {}
+        for item in filter(None, (i.strip() for i in os.environ.get('MOCK_ADMISSION_ROUTES', '').split(','))):
+            target, _, spec = item.partition('=')
+            method, _, rule = target.strip().partition(' ')
+            name, _, rest = spec.partition(':')
+            entry = {}
+            if name in CLASSES:
+                entry['class'] = name
+                spec = rest
+            if spec:
+                entry['limits'] = Limits.parse(spec)
+            routes[(method.upper(), rule.strip())] = entry
+        return cls(
+            enabled=os.environ.get('MOCK_ADMISSION', '1').lower() not in ('0', 'false', 'off'),
+            limits=limits,
+            routes=routes,
+            body_bytes=int(os.environ.get('MOCK_ADMISSION_BODY_BYTES') or DEFAULT_BODY_BYTES),
+        )
+
+    def policy(self, method, rule):
+        """(classe, Limits ou None) de uma rota"""
+        entry = self.routes.get((method, rule), {})
+        name = entry.get('class') or _default_class(method, rule)
+        if name == 'public':
+            return name, None
+        return name, entry['limits'] if 'limits' in entry else self.limits.get(name)
+
+    def limited_methods(self):
+        """Métodos que podem ter alguma rota limitada (os demais nem passam pelo roteamento)"""
+        methods = {'POST', 'PUT', 'PATCH', 'DELETE'}
+        if self.limits.get('read') is not None:
+            methods |= READ_METHODS
+        methods.update(method for (method, _), entry in self.routes.items() if entry)
+        return frozenset(methods)
+
+
+class Limiter:
+    """Estado de uma rota limitada (protegido pelo lock do controller)"""
+
+    def __init__(self, method, rule, klass, limits):
+        self.method = method
+        self.rule = rule
+        self.klass = klass
+        self.limits = limits
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.service = None   # média móvel do tempo de atendimento (s)
+
+    def retry_after(self):
+        service = self.service if self.service is not None else 1.0
+        estimate = service * (self.waiting + 1) / self.limits.concurrency
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+    def to_json(self):
+        return {
+            "method": self.method, "route": self.rule, "class": self.klass, **self.limits.to_json(),
+            "active": self.active, "queued": self.waiting, "admitted": self.admitted, "rejected": self.rejected,
+            "serviceSeconds": round(self.service, 4) if self.service is not None else None,
+        }
+
+
+class Ticket:
+    """Requisição admitida; release() devolve a vaga e os bytes (idempotente)"""
+
+    __slots__ = ('controller', 'limiter', 'size', 'start', 'released')
+
+    def __init__(self, controller, limiter, size):
+        self.controller = controller
+        self.limiter = limiter
+        self.size = size
+        self.start = time.monotonic()
+        self.released = False
+
+    def release(self):
+        self.controller._release(self)
+
+
+class Rejection:
+    """Resposta de uma requisição recusada (também um app WSGI)"""
+
+    def __init__(self, status, reason, message, retry_after=None):
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        payload = {"error": message}
+        if retry_after is not None:
+            payload["retryAfter"] = retry_after
+        self.body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    @property
+    def status_line(self):
+        return f"{self.status} {HTTPStatus(self.status).phrase}"
+
+    @property
+    def headers(self):
+        headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(self.body))),
+                   ('Access-Control-Allow-Origin', '*')]
+        if self.retry_after is not None:
+            headers.append(('Retry-After', str(self.retry_after)))
+        return headers
+
+    def __call__(self, environ, start_response):
+        start_response(self.status_line, self.headers)
+        return _RejectedResponse(self.body, environ)
+
+
+class _RejectedResponse:
+    """
+    Corpo da recusa. Ao fechar, o corpo da requisição (que não foi lido) é
+    descartado: fechar a conexão com dados pendentes vira RST e o cliente,
+    ainda enviando, perderia o 503 e o Retry-After. Descartar não faz parse
+    nem grava nada; corpos grandes demais são abandonados.
+    """
+
+    def __init__(self, body, environ):
+        self.body = body
+        self.environ = environ
+
+    def __iter__(self):
+        yield self.body
+
+    def close(self):
+        remaining = body_size(self.environ.get('CONTENT_LENGTH'), '')
+        if not 0 < remaining <= DRAIN_BYTES:
+            return
+        stream = self.environ['wsgi.input']
+        deadline = time.monotonic() + DRAIN_SECONDS
+        try:
+            while remaining > 0 and time.monotonic() < deadline:
+                data = stream.read(min(remaining, DRAIN_CHUNK))
+                if not data:
+                    break
+                remaining -= len(data)
+        except (OSError, ValueError):
+            pass
+
+
+def body_size(content_length, transfer_encoding):
+    """Bytes que o corpo deve ocupar no orçamento"""
+    try:
+        size = int(content_length or 0)
+    except ValueError:
+        size = 0
+    if not size and 'chunked' in (transfer_encoding or '').lower():
+        return UNKNOWN_BODY_BYTES
+    return max(size, 0)
+
+
+class AdmissionController:
+    def __init__(self, config, url_map):
+        self.config = config
+        self.url_map = url_map
+        self.methods = config.limited_methods()
+        self.body_bytes = 0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._limiters = {}
+
+    def limiter(self, method, rule):
+        """Limiter da rota (None se ela não é limitada)"""
+        key = (method, rule)
+        try:
+            return self._limiters[key]
+        except KeyError:
+            pass
+        klass, limits = self.config.policy(method, rule)
+        limiter = Limiter(method, rule, klass, limits) if limits is not None else None
+        with self._lock:
+            return self._limiters.setdefault(key, limiter)
+
+    def classify(self, method, path=None, environ=None):
+        """(rota, limiter) da requisição; limiter None se ela não passa pelo controle"""
+        if method not in self.methods:
+            return None, None
+        try:
+            if environ is not None:
+                rule, _ = self.url_map.bind_to_environ(environ).match(return_rule=True)
+            else:
+                rule, _ = self.url_map.bind('localhost').match(unquote(path), method, return_rule=True)
+        except (HTTPException, RoutingException):
+            return None, None
+        return rule.rule, self.limiter(method, rule.rule)
+
+    # Admissão (as funções com _ no início pedem o lock adquirido)
+
+    def _try_enter(self, limiter, size):
+        if limiter.active >= limiter.limits.concurrency:
+            return False
+        # Sempre cabe se não há nenhum upload em trânsito (o tamanho máximo já foi conferido)
+        if size and self.body_bytes and self.body_bytes + size > self.config.body_bytes:
+            return False
+        limiter.active += 1
+        self.body_bytes += size
+        return True
+
+    def _grant(self, limiter, size, waited):
+        limiter.admitted += 1
+        metrics.ADMISSION_WAIT_SECONDS.observe(waited, (limiter.klass,))
+        return Ticket(self, limiter, size)
+
+    def _reject(self, limiter, reason):
+        limiter.rejected += 1
+        metrics.ADMISSION_REJECTED.inc(labels=(limiter.rule, limiter.klass, reason))
+        if reason == 'too_large':
+            return Rejection(413, reason, "Corpo da requisição maior que o limite de uploads do servidor")
+        return Rejection(503, reason, "Servidor ocupado, tente novamente em instantes", limiter.retry_after())
+
+    def _enter(self, limiter, size):
+        """Ticket, Rejection ou None (entrou na fila: waiting incrementado)"""
+        if size > self.config.body_bytes:
+            return self._reject(limiter, 'too_large')
+        if not limiter.waiting and self._try_enter(limiter, size):
+            return self._grant(limiter, size, 0.0)
+        if limiter.waiting >= limiter.limits.queue:
+            return self._reject(limiter, 'queue_full')
+        limiter.waiting += 1
+        return None
+
+    def admit(self, limiter, size):
+        """Admite a requisição, esperando na fila da rota se preciso (bloqueia a thread)"""
+        start = time.monotonic()
+        deadline = start + limiter.limits.timeout
+        with self._released:
+            outcome = self._enter(limiter, size)
+            if outcome is not None:
+                return outcome
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return self._reject(limiter, 'timeout')
+                    self._released.wait(remaining)
+                    if self._try_enter(limiter, size):
+                        return self._grant(limiter, size, time.monotonic() - start)
+            finally:
+                limiter.waiting -= 1
+
+    async def admit_async(self, limiter, size):
+        """Como admit, mas espera no event loop (modo --asyncio)"""
+        start = time.monotonic()
+        deadline = start + limiter.limits.timeout
+        with self._lock:
+            outcome = self._enter(limiter, size)
+        if outcome is not None:
+            return outcome
+        try:
+            while True:
+                await asyncio.sleep(POLL_SECONDS)
+                with self._lock:
+                    if self._try_enter(limiter, size):
+                        return self._grant(limiter, size, time.monotonic() - start)
+                    if time.monotonic() >= deadline:
+                        return self._reject(limiter, 'timeout')
+        finally:
+            with self._lock:
+                limiter.waiting -= 1
+
+    def _release(self, ticket):
+        with self._released:
+            if ticket.released:
+                return
+            ticket.released = True
+            limiter = ticket.limiter
+            limiter.active -= 1
+            self.body_bytes -= ticket.size
+            elapsed = time.monotonic() - ticket.start
+            if limiter.service is None:
+                limiter.service = elapsed
+            else:
+                limiter.service += SERVICE_SMOOTHING * (elapsed - limiter.service)
+            self._released.notify_all()
+
+    # Observabilidade
+
+    def _by_route(self, attribute):
+        return {(f"{limiter.method} {limiter.rule}",): getattr(limiter, attribute)
+                for limiter in list(self._limiters.values()) if limiter is not None}
+
+    def describe(self):
+        """Limites de todas as rotas limitadas, com o estado das que já foram usadas"""
+        routes = []
+        for rule in self.url_map.iter_rules():
+            for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+                limiter = self._limiters.get((method, rule.rule))
+                if limiter is None:
+                    klass, limits = self.config.policy(method, rule.rule)
+                    if limits is None:
+                        continue
+                    limiter = Limiter(method, rule.rule, klass, limits)
+                routes.append(limiter.to_json())
+        return {
+            "enabled": True,
+            "classes": {name: limits.to_json() if limits else None for name, limits in self.config.limits.items()},
+            "bodyBytes": {"budget": self.config.body_bytes, "inFlight": self.body_bytes},
+            "routes": sorted(routes, key=lambda r: (r["route"], r["method"])),
+        }
+
+
+class AdmissionMiddleware:
+    """Admite (ou recusa) cada requisição antes do Flask; a vaga é devolvida ao fim da resposta"""
+
+    def __init__(self, app, controller):
+        self.app = app
+        self.controller = controller
+
+    def __call__(self, environ, start_response):
+        if TICKET_KEY in environ:
+            # já admitida pelo servidor asyncio (None: rota sem limite)
+            ticket = environ[TICKET_KEY]
+        else:
+            ticket = None
+            rule, limiter = self.controller.classify(environ.get('REQUEST_METHOD'), environ=environ)
+            if limiter is not None:
+                outcome = self.controller.admit(
+                    limiter, body_size(environ.get('CONTENT_LENGTH'), environ.get('HTTP_TRANSFER_ENCODING')))
+                if outcome.__class__ is Rejection:
+                    environ[metrics.ROUTE_KEY] = rule
+                    return outcome(environ, start_response)
+                ticket = outcome
+        if ticket is None:
+            return self.app(environ, start_response)
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            ticket.release()
+            raise
+        return _AdmittedResponse(result, ticket)
+
+
+class _AdmittedResponse:
+    __slots__ = ('result', 'ticket')
+
+    def __init__(self, result, ticket):
+        self.result = result
+        self.ticket = ticket
+
+    def __iter__(self):
+        try:
+            yield from self.result
+        finally:
+            # nem todo cliente WSGI chama close() (ex.: test client do Flask)
+            self.ticket.release()
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            self.ticket.release()
+
+
+def install(app, config):
+    """Envolve app.wsgi_app com o controle de admissão (se habilitado); o controller fica em app.extensions"""
+    if not config.enabled:
+        return None
+    controller = AdmissionController(config, app.url_map)
+    app.wsgi_app = AdmissionMiddleware(app.wsgi_app, controller)
+    app.extensions['admission'] = controller
+    metrics.registry.gauge('mock_admission_active', 'Requisições admitidas em andamento por rota limitada',
+                           ('route',), function=lambda: controller._by_route('active'))
+    metrics.registry.gauge('mock_admission_queued', 'Requisições esperando admissão por rota limitada',
+                           ('route',), function=lambda: controller._by_route('waiting'))
+    metrics.registry.gauge('mock_admission_body_bytes', 'Bytes de upload admitidos e ainda em trânsito',
+                           function=lambda: controller.body_bytes)
+    logger.info("Controle de admissão: %s", ", ".join(
+        f"{name}={limits.concurrency}:{limits.queue}:{limits.timeout:g}" if limits else f"{name}=-"
+        for name, limits in config.limits.items()))
+    return controller
@@ -0,0 +1,546 @@
+"""
+Modo asyncio (--asyncio): um único processo com um event loop atende
+milhares de conexões lentas ou ociosas sem prender uma thread por conexão.
+
+- o corpo das requisições é lido de forma não bloqueante e gravado em disco
+  (arquivo temporário, escrito no executor) antes de chegar ao Flask;
+- GET/HEAD /uploads/<arquivo> é servido direto pelo loop, em blocos lidos no
+  executor e enviados no ritmo do cliente (drain), com suporte a Range;
+- as demais rotas são as do próprio app Flask (mesmos contratos JSON),
+  executadas em um pool de threads: a thread só fica ocupada enquanto o
+  handler roda (incluindo a serialização do JSON), não durante a
+  transferência do upload ou da resposta;
+- com o controle de admissão instalado no app (mock_server.admission), a
+  requisição é admitida (ou recusada) no loop antes de o corpo ser lido:
+  a espera na fila não ocupa thread e corpos recusados não vão para disco.
+
+Só usa a biblioteca padrão (HTTP/1.1 com keep-alive e chunked).
+"""
+
+import asyncio
+import io
+import logging
+import mimetypes
+import os
+import signal
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import unquote, unquote_to_bytes
+
+from werkzeug.security import safe_join
+
+from .admission import DRAIN_BYTES, DRAIN_SECONDS, TICKET_KEY, Rejection, body_size
+from .changes import close_streams
+
+CHUNK_SIZE = 64 * 1024
+MAX_HEADER_SIZE = 64 * 1024
+MEMORY_BODY_SIZE = 256 * 1024  # corpos maiores vão para disco
+KEEPALIVE_TIMEOUT = 75
+READ_TIMEOUT = 120  # tempo máximo sem receber nenhum byte do corpo
+RESPONSE_QUEUE_SIZE = 8  # blocos de resposta em trânsito entre a thread e o loop
+DEFAULT_THREADS = 32
+# Respostas enviadas bloco a bloco, sem esperar CHUNK_SIZE (SSE, progresso da importação)
+STREAMING_TYPES = ('text/event-stream', 'application/x-ndjson')
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('mock_server.access')
+
+
+class BadRequest(Exception):
+    """Requisição HTTP malformada"""
+
+
+class ClientDisconnected(Exception):
+    """O cliente fechou a conexão antes do fim da resposta"""
+
+
+def _reason(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
+
+
+def _parse_head(data):
+    lines = data.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise BadRequest(f"Linha de requisição inválida: {lines[0]!r}")
+    if not version.startswith('HTTP/1.'):
+        raise BadRequest(f"Versão não suportada: {version}")
+    headers = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(':')
+        if not sep:
+            raise BadRequest(f"Cabeçalho inválido: {line!r}")
+        headers.append((name.strip().lower(), value.strip()))
+    return method.upper(), target, version, headers
+
+
+class _Body:
+    """Corpo da requisição: em memória se pequeno, senão em arquivo temporário"""
+
+    def __init__(self, expected_size):
+        self.size = 0
+        self._loop = asyncio.get_running_loop()
+        if expected_size is not None and expected_size <= MEMORY_BODY_SIZE:
+            self.file = io.BytesIO()
+            self._on_disk = False
+        else:
+            self.file = tempfile.TemporaryFile()
+            self._on_disk = True
+
+    async def write(self, data):
+        self.size += len(data)
+        if self._on_disk:
+            await self._loop.run_in_executor(None, self.file.write, data)
+        else:
+            self.file.write(data)
+
+    def finish(self):
+        self.file.seek(0)
+        return self.file
+
+
+async def _read_exactly(reader, size):
+    try:
+        return await asyncio.wait_for(reader.readexactly(size), READ_TIMEOUT)
+    except asyncio.IncompleteReadError:
+        raise ClientDisconnected()
+
+
+async def _read_body(reader, writer, headers):
+    header_map = dict(headers)
+    if header_map.get('expect', '').lower() == '100-continue':
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+    if 'chunked' in header_map.get('transfer-encoding', '').lower():
+        body = _Body(None)
+        while True:
+            line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+            if not line:
+                raise ClientDisconnected()
+            try:
+                size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise BadRequest("Chunk inválido")
+            if size == 0:
+                # trailers até a linha vazia
+                while (await asyncio.wait_for(reader.readline(), READ_TIMEOUT)).strip():
+                    pass
+                break
+            while size:
+                data = await _read_exactly(reader, min(size, CHUNK_SIZE))
+                await body.write(data)
+                size -= len(data)
+            await _read_exactly(reader, 2)
+        return body
+
+    try:
+        remaining = int(header_map.get('content-length') or 0)
+    except ValueError:
+        raise BadRequest("Content-Length inválido")
+    body = _Body(remaining)
+    while remaining > 0:
+        data = await _read_exactly(reader, min(remaining, CHUNK_SIZE))
+        await body.write(data)
+        remaining -= len(data)
+    return body
+
+
+def _build_environ(method, target, version, headers, body, peer, server):
+    path, _, query = target.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+        'QUERY_STRING': query,
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': version,
+        'REMOTE_ADDR': peer[0] if peer else '',
+        'REMOTE_PORT': str(peer[1]) if peer else '',
+        'CONTENT_LENGTH': str(body.size),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': body.finish(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers:
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name in ('content-length', 'transfer-encoding'):
+            continue  # o corpo já foi lido por inteiro
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_app(app, environ, loop, queue, cancelled):
+    """
+    Executa o app WSGI em uma thread do pool. A iteração da resposta fica na
+    mesma thread (stream_with_context depende disso) e os blocos são
+    entregues ao loop por uma fila limitada. Respostas curtas saem com
+    Content-Length (acumuladas até CHUNK_SIZE); as de STREAMING_TYPES saem
+    com o cabeçalho na hora e cada bloco assim que é gerado.
+    """
+    head = {}
+
+    def emit(event):
+        if cancelled.is_set():
+            raise ClientDisconnected()
+        asyncio.run_coroutine_threadsafe(queue.put(event), loop).result()
+
+    def start_response(status, response_headers, exc_info=None):
+        if exc_info and head.get('sent'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        head['status'] = status
+        head['headers'] = response_headers
+        return lambda data: emit(('data', data))
+
+    try:
+        result = app(environ, start_response)
+        try:
+            content_type = next((v for k, v in head['headers'] if k.lower() == 'content-type'), '')
+            if content_type.split(';', 1)[0].strip().lower() in STREAMING_TYPES:
+                head['sent'] = True
+                emit(('head', head['status'], head['headers'], b'', False))
+            buffered, size = [], 0
+            for data in result:
+                if not data:
+                    continue
+                if head.get('sent'):
+                    emit(('data', data))
+                    continue
+                buffered.append(data)
+                size += len(data)
+                if size >= CHUNK_SIZE:
+                    head['sent'] = True
+                    emit(('head', head['status'], head['headers'], b''.join(buffered), False))
+            if head.get('sent'):
+                emit(('end',))
+            else:
+                emit(('head', head['status'], head['headers'], b''.join(buffered), True))
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+    except ClientDisconnected:
+        pass
+    except Exception as e:
+        if not cancelled.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(('error', e)), loop).result()
+    finally:
+        environ['wsgi.input'].close()
+
+
+class Server:
+    def __init__(self, app, uploads_dir, threads=DEFAULT_THREADS):
+        self.app = app
+        self.uploads_dir = os.path.abspath(uploads_dir)
+        self.app_pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+        self.connections = 0
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        peer = writer.get_extra_info('peername')
+        server = writer.get_extra_info('sockname')
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    data = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_simple(writer, 431, 'HTTP/1.1', close=True)
+                    break
+                try:
+                    method, target, version, headers = _parse_head(data)
+                except BadRequest:
+                    await self._send_simple(writer, 400, 'HTTP/1.1', close=True)
+                    break
+
+                connection = dict(headers).get('connection', '').lower()
+                keep_alive = version == 'HTTP/1.1' and connection != 'close'
+                status, keep_alive = await self._handle_request(reader, writer, method, target, version,
+                                                                headers, peer, server, keep_alive)
+                access_logger.info('%s "%s %s %s" %s', peer[0] if peer else '-', method, target, version, status)
+        except (ClientDisconnected, ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _handle_request(self, reader, writer, method, target, version, headers, peer, server, keep_alive):
+        """Atende uma requisição; retorna (status enviado ou None, se a conexão continua aberta)"""
+        path = target.partition('?')[0]
+        if method in ('GET', 'HEAD') and path.startswith('/uploads/'):
+            served = await self._serve_upload(writer, method, path, version, headers, keep_alive)
+            if served is not None:
+                return served
+
+        admission = getattr(self.app, 'extensions', {}).get('admission')
+        ticket = None
+        if admission is not None:
+            _, limiter = admission.classify(method, path)
+            if limiter is not None:
+                header_map = dict(headers)
+                outcome = await admission.admit_async(limiter, body_size(
+                    header_map.get('content-length'), header_map.get('transfer-encoding')))
+                if outcome.__class__ is Rejection:
+                    await self._send_rejection(reader, writer, version, outcome, header_map)
+                    return outcome.status, False
+                ticket = outcome
+
+        try:
+            body = await _read_body(reader, writer, headers)
+        except BaseException as e:
+            if ticket is not None:
+                ticket.release()
+            if isinstance(e, BadRequest):
+                await self._send_simple(writer, 400, version, close=True)
+                return 400, False
+            raise
+        environ = _build_environ(method, target, version, headers, body, peer, server)
+        if admission is not None:
+            # a vaga é devolvida pelo middleware de admissão ao fim da resposta
+            environ[TICKET_KEY] = ticket
+        return await self._run_wsgi(writer, environ, method, version, keep_alive)
+
+    async def _send_rejection(self, reader, writer, version, rejection, header_map):
+        """Recusa sem ler o corpo (nem mandar 100 Continue); a conexão é fechada em seguida"""
+        self._write_head(writer, version, rejection.status_line, rejection.headers, False)
+        writer.write(rejection.body)
+        await writer.drain()
+        # Fechar com dados pendentes vira RST e o cliente perderia a resposta: o corpo é
+        # descartado no loop (sem disco) até DRAIN_BYTES/DRAIN_SECONDS; com 100-continue ele nem vem
+        remaining = body_size(header_map.get('content-length'), None)
+        if not 0 < remaining <= DRAIN_BYTES or header_map.get('expect', '').lower() == '100-continue':
+            return
+        try:
+            async with asyncio.timeout(DRAIN_SECONDS):
+                while remaining > 0:
+                    data = await reader.read(min(remaining, CHUNK_SIZE))
+                    if not data:
+                        break
+                    remaining -= len(data)
+        except (ConnectionError, TimeoutError):
+            pass
+
+    async def _run_wsgi(self, writer, environ, method, version, keep_alive):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(RESPONSE_QUEUE_SIZE)
+        cancelled = threading.Event()
+        loop.run_in_executor(self.app_pool, _run_app, self.app, environ, loop, queue, cancelled)
+
+        try:
+            event = await queue.get()
+            if event[0] == 'error':
+                logger.error("Erro no handler: %r", event[1])
+                await self._send_simple(writer, 500, version, close=not keep_alive)
+                return 500, keep_alive
+
+            _, status_line, response_headers, first, complete = event
+            status = int(status_line.split(' ', 1)[0])
+            names = {name.lower() for name, _ in response_headers}
+            response_headers = list(response_headers)
+            chunked = False
+            if 'content-length' not in names and status not in (204, 304):
+                if complete:
+                    response_headers.append(('Content-Length', str(len(first))))
+                elif version == 'HTTP/1.1':
+                    chunked = True
+                    response_headers.append(('Transfer-Encoding', 'chunked'))
+                else:
+                    keep_alive = False
+            self._write_head(writer, version, status_line, response_headers, keep_alive)
+
+            send_body = method != 'HEAD'
+            if send_body:
+                self._write_chunk(writer, first, chunked)
+            await writer.drain()
+            while not complete:
+                event = await queue.get()
+                if event[0] == 'end':
+                    break
+                if event[0] == 'error':
+                    # cabeçalho já enviado: só resta encerrar a conexão
+                    logger.error("Erro durante o streaming: %r", event[1])
+                    return status, False
+                if send_body:
+                    self._write_chunk(writer, event[1], chunked)
+                    await writer.drain()
+            if send_body and chunked:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+            return status, keep_alive
+        except (ConnectionError, asyncio.CancelledError):
+            raise ClientDisconnected()
+        finally:
+            cancelled.set()
+            # libera a thread caso esteja bloqueada na fila cheia
+            while not queue.empty():
+                queue.get_nowait()
+
+    async def _serve_upload(self, writer, method, path, version, headers, keep_alive):
+        """
+        Serve um arquivo de /uploads sem ocupar threads do pool. Retorna
+        (status, keep_alive) como _handle_request, ou None para delegar ao
+        Flask (arquivo inexistente, nome inválido): None nunca significa que
+        uma resposta foi enviada.
+        """
+        filename = unquote(path[len('/uploads/'):])
+        full_path = safe_join(self.uploads_dir, filename) if '/' not in filename else None
+        if not full_path:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            stat = await loop.run_in_executor(None, os.stat, full_path)
+        except OSError:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+
+        header_map = dict(headers)
+        size = stat.st_size
+        etag = f'"{int(stat.st_mtime)}-{size}"'
+        response_headers = [
+            ('Content-Type', mimetypes.guess_type(filename)[0] or 'application/octet-stream'),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('ETag', etag),
+            ('Cache-Control', 'no-cache'),
+            ('Accept-Ranges', 'bytes'),
+            ('Access-Control-Allow-Origin', '*'),
+        ]
+
+        if header_map.get('if-none-match') == etag or self._not_modified_since(header_map, stat):
+            self._write_head(writer, version, '304 NOT MODIFIED', response_headers, keep_alive)
+            await writer.drain()
+            return 304, keep_alive
+
+        start, end = 0, size - 1
+        status_line = '200 OK'
+        byte_range = header_map.get('range')
+        if byte_range and header_map.get('if-range', etag) == etag:
+            parsed = self._parse_range(byte_range, size)
+            if parsed is None:
+                response_headers.append(('Content-Range', f'bytes */{size}'))
+                response_headers.append(('Content-Length', '0'))
+                self._write_head(writer, version, '416 REQUESTED RANGE NOT SATISFIABLE', response_headers, keep_alive)
+                await writer.drain()
+                return 416, keep_alive
+            start, end = parsed
+            status_line = '206 PARTIAL CONTENT'
+            response_headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+
+        response_headers.append(('Content-Length', str(end - start + 1)))
+        self._write_head(writer, version, status_line, response_headers, keep_alive)
+        if method == 'GET':
+            fd = await loop.run_in_executor(None, os.open, full_path, os.O_RDONLY)
+            try:
+                offset = start
+                while offset <= end:
+                    data = await loop.run_in_executor(None, os.pread, fd, min(CHUNK_SIZE, end - offset + 1), offset)
+                    if not data:
+                        break
+                    writer.write(data)
+                    offset += len(data)
+                    await writer.drain()
+            finally:
+                os.close(fd)
+        await writer.drain()
+        return int(status_line.split(' ', 1)[0]), keep_alive
+
+    @staticmethod
+    def _not_modified_since(header_map, stat):
+        value = header_map.get('if-modified-since')
+        if not value or 'if-none-match' in header_map:
+            return False
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def _parse_range(value, size):
+        """Um único intervalo 'bytes=a-b' (ou sufixo 'bytes=-n'); None se inválido"""
+        unit, _, spec = value.partition('=')
+        if unit.strip() != 'bytes' or ',' in spec:
+            return None
+        first, _, last = spec.strip().partition('-')
+        try:
+            if not first:
+                length = int(last)
+                if length <= 0:
+                    return None
+                return max(size - length, 0), size - 1
+            start = int(first)
+            end = int(last) if last else size - 1
+        except ValueError:
+            return None
+        if start >= size or end < start:
+            return None
+        return start, min(end, size - 1)
+
+    @staticmethod
+    def _write_head(writer, version, status_line, headers, keep_alive):
+        lines = [f'{version} {status_line}']
+        lines.extend(f'{name}: {value}' for name, value in headers)
+        lines.append(f'Date: {formatdate(usegmt=True)}')
+        lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+    @staticmethod
+    def _write_chunk(writer, data, chunked):
+        if not data:
+            return
+        if chunked:
+            writer.write(f'{len(data):X}\r\n'.encode('latin-1') + data + b'\r\n')
+        else:
+            writer.write(data)
+
+    async def _send_simple(self, writer, status, version, close):
+        body = f'{status} {_reason(status)}'.encode('latin-1')
+        headers = [('Content-Type', 'text/plain'), ('Content-Length', str(len(body)))]
+        self._write_head(writer, version, f'{status} {_reason(status).upper()}', headers, not close)
+        writer.write(body)
+        await writer.drain()
+
+
+async def _serve(app, host, port, uploads_dir, threads):
+    server = Server(app, uploads_dir, threads)
+    listener = await asyncio.start_server(server.handle_connection, host, port,
+                                          limit=MAX_HEADER_SIZE, backlog=4096)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C encerra via KeyboardInterrupt
+    logger.info("Servidor asyncio em http://%s:%s (%s threads para os handlers)", host, port, threads)
+    async with listener:
+        await stop.wait()
+    # Streams SSE só terminam quando avisados; o loop continua rodando enquanto
+    # as respostas em andamento terminam (elas entregam os blocos por ele)
+    close_streams()
+    await loop.run_in_executor(None, server.app_pool.shutdown, True)
+
+
+def serve(app, host, port, uploads_dir, threads=DEFAULT_THREADS):
+    """Roda o app no servidor asyncio até SIGTERM/SIGINT"""
+    try:
+        asyncio.run(_serve(app, host, port, uploads_dir, threads))
+    except KeyboardInterrupt:
+        pass
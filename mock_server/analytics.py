@@ -0,0 +1,180 @@
+"""
+Agregados do catálogo para dashboards (GET /api/analytics), calculados com
+operações vetorizadas sobre o column store (mock_server.columns).
+
+Os resultados são cacheados no próprio snapshot (uma versão do catálogo),
+por parâmetros e dia: um dashboard recarregado sem escritas no meio não
+recalcula nada, e a primeira consulta depois de uma escrita usa o column
+store já atualizado pela transação.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .columns import ColumnStore
+from .records import vocabularies
+
+DEFAULT_BINS = 20
+MAX_BINS = 200
+AGE_BUCKETS = (0, 30, 60, 90, 180, 365)
+SOLD_STATUS = "Vendido"
+DAY = 86400
+
+_build_lock = threading.Lock()
+
+
+def columns_for(snapshot):
+    """Column store do snapshot, montado na primeira vez (depois mantido pelas transações)"""
+    if snapshot.columns is None:
+        with _build_lock:
+            if snapshot.columns is None:
+                snapshot.columns = ColumnStore.build(snapshot.vehicles)
+    return snapshot.columns
+
+
+def _round(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def _stats(values):
+    if not len(values):
+        return {"count": 0, "mean": None, "median": None, "min": None, "max": None}
+    return {
+        "count": int(len(values)),
+        "mean": _round(values.mean()),
+        "median": _round(np.median(values)),
+        "min": _round(values.min()),
+        "max": _round(values.max()),
+    }
+
+
+def _grouped(keys, values, label):
+    """count/mean/median/min/max de values por chave inteira (chaves < 0 e NaN ignorados)"""
+    valid = (keys >= 0) & ~np.isnan(values)
+    keys, values = keys[valid], values[valid]
+    if not len(keys):
+        return []
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    means = np.add.reduceat(values, starts) / counts
+    medians = (values[starts + (counts - 1) // 2] + values[starts + counts // 2]) / 2
+    maxima = values[starts + counts - 1]
+    groups = [
+        {"key": label(key), "count": int(count), "mean": _round(mean), "median": _round(median),
+         "min": _round(low), "max": _round(high)}
+        for key, count, mean, median, low, high in zip(
+            keys[starts].tolist(), counts.tolist(), means, medians, values[starts], maxima)
+    ]
+    groups.sort(key=lambda group: -group['count'])
+    return groups
+
+
+def _has_status(status_codes, status):
+    code = vocabularies['status'].code(status)
+    return np.zeros(len(status_codes), dtype=bool) if code is None else status_codes == code
+
+
+def _vocabulary_label(field):
+    values = vocabularies[field].values
+    return lambda code: values[code]
+
+
+def _price(columns, live_codes):
+    prices = columns.column('price')
+    return {
+        "overall": _stats(prices[~np.isnan(prices)]),
+        "byBrand": _grouped(live_codes['brand'], prices, _vocabulary_label('brand')),
+        "byCategory": _grouped(live_codes['category'], prices, _vocabulary_label('category')),
+        "byModelYear": sorted(
+            _grouped(np.nan_to_num(columns.column('modelYear'), nan=-1).astype(np.int64), prices, int),
+            key=lambda group: group['key']),
+    }
+
+
+def _price_per_km(columns, live_codes):
+    prices, mileage = columns.column('price'), columns.column('mileage')
+    used = (mileage > 0) & ~np.isnan(prices)
+    ratio = np.full(len(prices), np.nan)
+    ratio[used] = prices[used] / mileage[used]
+    return {
+        "overall": _stats(ratio[used]),
+        "byCategory": _grouped(live_codes['category'], ratio, _vocabulary_label('category')),
+        "byBrand": _grouped(live_codes['brand'], ratio, _vocabulary_label('brand')),
+    }
+
+
+def _inventory_age(columns, live_codes, now):
+    """Idade em dias (desde createdAt) dos veículos ainda não vendidos"""
+    created = columns.column('createdAt')
+    in_stock = ~np.isnan(created) & ~_has_status(live_codes['status'], SOLD_STATUS)
+    ages = np.maximum(now - created[in_stock], 0) / DAY
+    counts = np.histogram(ages, bins=list(AGE_BUCKETS) + [max(float(ages.max(initial=0)), AGE_BUCKETS[-1]) + 1])[0]
+    labels = [f"{low}-{high}" for low, high in zip(AGE_BUCKETS, AGE_BUCKETS[1:])] + [f"{AGE_BUCKETS[-1]}+"]
+    overall = _stats(ages)
+    if len(ages):
+        overall["p90"] = _round(np.percentile(ages, 90))
+    return {
+        "overall": overall,
+        "buckets": [{"days": label, "count": int(count)} for label, count in zip(labels, counts)],
+        "byCategory": _grouped(live_codes['category'][in_stock], ages, _vocabulary_label('category')),
+    }
+
+
+def _sell_through(columns, live_codes):
+    """Por mês de entrada (createdAt): quantos foram anunciados e quantos já constam como vendidos"""
+    created = columns.column('createdAt')
+    dated = ~np.isnan(created)
+    months = created[dated].astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    if not len(months):
+        return []
+    sold = _has_status(live_codes['status'][dated], SOLD_STATUS)
+    unique, inverse = np.unique(months, return_inverse=True)
+    listed = np.bincount(inverse)
+    sold_counts = np.bincount(inverse, weights=sold).astype(np.int64)
+    return [
+        {"month": str(np.datetime64(int(month), 'M')), "listed": int(total), "sold": int(count),
+         "ratio": round(count / total, 4)}
+        for month, total, count in zip(unique.tolist(), listed.tolist(), sold_counts.tolist())
+    ]
+
+
+def _histogram(columns, bins):
+    prices = columns.column('price')
+    prices = prices[~np.isnan(prices)]
+    if not len(prices):
+        return {"edges": [], "counts": []}
+    counts, edges = np.histogram(prices, bins=bins)
+    return {"edges": [_round(edge) for edge in edges], "counts": counts.tolist()}
+
+
+def compute(columns, bins=DEFAULT_BINS, now=None):
+    now = time.time() if now is None else now
+    live_codes = {field: columns.column(field) for field in ('brand', 'category', 'status')}
+    statuses = _vocabulary_label('status')
+    status_codes, status_counts = np.unique(live_codes['status'][live_codes['status'] >= 0], return_counts=True)
+    return {
+        "vehicles": len(columns),
+        "byStatus": {statuses(code): int(count) for code, count in zip(status_codes.tolist(), status_counts.tolist())},
+        "price": _price(columns, live_codes),
+        "pricePerKm": _price_per_km(columns, live_codes),
+        "inventoryAge": _inventory_age(columns, live_codes, now),
+        "sellThrough": _sell_through(columns, live_codes),
+        "priceHistogram": _histogram(columns, bins),
+    }
+
+
+def analytics(snapshot, bins=DEFAULT_BINS):
+    """Agregados do snapshot, cacheados na versão (e por dia, por causa das idades)"""
+    bins = min(max(int(bins), 1), MAX_BINS)
+    key = ('analytics', bins, datetime.now(timezone.utc).date().isoformat())
+    result = snapshot.cache.get(key)
+    if result is None:
+        result = compute(columns_for(snapshot), bins)
+        result.update(version=snapshot.version, generatedAt=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+        snapshot.cache[key] = result
+    return result
@@ -0,0 +1,132 @@
+"""
+Mutações em lote (POST /api/vehicles/batch).
+
+Operações aceitas:
+    {"op": "patch",  "id": 12, "fields": {"highlighted": true}}
+    {"op": "status", "ids": [12, 13, 14], "status": "Vendido"}
+    {"op": "delete", "id": 15}
+
+"id" ou "ids" em qualquer operação. Todas são validadas antes de qualquer
+alteração; se uma falhar, nada é aplicado.
+"""
+
+from .vehicle_schema import STATUSES
+
+OPERATIONS = ("patch", "status", "delete")
+READ_ONLY_FIELDS = {"id", "vehicleId", "createdAt"}
+MAX_OPERATIONS = 1000
+
+
+class BatchError(Exception):
+    """Lote malformado (não é uma lista de operações)"""
+
+
+def _operation_ids(operation):
+    if 'ids' in operation:
+        ids = operation['ids']
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("'ids' deve ser uma lista não vazia")
+    elif 'id' in operation:
+        ids = [operation['id']]
+    else:
+        raise ValueError("Informe 'id' ou 'ids'")
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ValueError("IDs devem ser inteiros")
+    return ids
+
+
+def validate_operations(operations, vehicles):
+    """
+    Valida o lote contra o estado atual.
+
+    Retorna (resultados por operação, ok). Cada resultado tem "index", "op",
+    "ids" e "error" (None quando válida).
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError("'operations' deve ser uma lista não vazia")
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f"Máximo de {MAX_OPERATIONS} operações por lote")
+
+    by_id = {v['id']: v for v in vehicles}
+    plates = {}
+    for v in vehicles:
+        plate = str(v.get('licensePlate') or '').strip()
+        if plate:
+            plates[plate] = v['id']
+    deleted = set()
+    results = []
+
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": None, "ids": [], "error": None}
+        results.append(result)
+        try:
+            if not isinstance(operation, dict):
+                raise ValueError("Operação deve ser um objeto")
+            op = operation.get('op')
+            result['op'] = op
+            if op not in OPERATIONS:
+                raise ValueError(f"'op' deve ser um de: {', '.join(OPERATIONS)}")
+            ids = _operation_ids(operation)
+            result['ids'] = ids
+
+            missing = [i for i in ids if i not in by_id or i in deleted]
+            if missing:
+                raise ValueError(f"Veículo(s) não encontrado(s): {', '.join(map(str, missing))}")
+
+            if op == 'delete':
+                deleted.update(ids)
+            elif op == 'status':
+                if operation.get('status') not in STATUSES:
+                    raise ValueError(f"Status inválido. Use: {', '.join(STATUSES)}")
+            else:
+                fields = operation.get('fields')
+                if not isinstance(fields, dict) or not fields:
+                    raise ValueError("'fields' deve ser um objeto não vazio")
+                blocked = READ_ONLY_FIELDS.intersection(fields)
+                if blocked:
+                    raise ValueError(f"Campos não editáveis: {', '.join(sorted(blocked))}")
+                plate = str(fields.get('licensePlate') or '').strip()
+                if plate:
+                    if len(ids) > 1:
+                        raise ValueError("Placa só pode ser alterada em um veículo por operação")
+                    owner = plates.get(plate)
+                    if owner is not None and owner != ids[0]:
+                        raise ValueError(f"Já existe outro veículo com a placa {plate}")
+                    plates[plate] = ids[0]
+        except ValueError as e:
+            result['error'] = str(e)
+
+    return results, all(r['error'] is None for r in results)
+
+
+def apply_operations(operations, txn):
+    """
+    Aplica um lote já validado em uma transação do catálogo (mock_server.catalog).
+    Veículos alterados são copiados; as exclusões são feitas em uma única passada.
+    Retorna a lista de resultados por operação.
+    """
+    deleted = set()
+    results = []
+
+    for index, operation in enumerate(operations):
+        op = operation['op']
+        ids = _operation_ids(operation)
+        result = {"index": index, "op": op, "ids": ids, "status": "ok"}
+
+        if op == 'delete':
+            deleted.update(ids)
+        else:
+            changes = operation['fields'] if op == 'patch' else {"status": operation['status']}
+            updated = []
+            for vehicle_id in ids:
+                vehicle = dict(txn.get(vehicle_id))
+                vehicle.update(changes)
+                txn.put(vehicle)
+                updated.append(vehicle)
+            result['vehicles'] = updated
+        results.append(result)
+
+    if deleted:
+        txn.delete_many(deleted)
+
+    return results
@@ -0,0 +1,371 @@
+"""
+Estado do catálogo com snapshots imutáveis (copy-on-write).
+
+Leitores pegam `catalog.snapshot` (uma leitura de referência, sem lock) e
+trabalham sobre uma versão consistente. Escritores abrem `catalog.write()`,
+montam a nova versão sob um único lock de escrita e ela é publicada de uma
+vez, depois de persistida. Veículos publicados são VehicleRecord imutáveis
+(mock_server.records): quem edita um veículo pega uma cópia em dict com
+copy_vehicle() e grava com txn.put(), que a converte de volta.
+
+Cada garagem tem o próprio Catalog (mock_server.garages): com garage_id,
+toda gravação carimba o garageId da garagem dona no veículo, e com cold
+(mock_server.coldstore) os campos frios vão para o arquivo da garagem.
+
+Cada versão publicada é numerada e registra os ids que alterou
+(mock_server.changes): é o que alimenta o feed /api/vehicles/changes.
+
+Com um journal (mock_server.cluster), o catálogo também é compartilhado
+entre processos: a escrita adquire o lock do journal, aplica o que outros
+processos gravaram e registra as próprias alterações (com a versão) ao
+publicar.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from .changes import ChangeLog
+from .features import FeatureIndex, dictionary, iter_bits
+from .records import pack
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    Versão imutável do catálogo: tupla de veículos + índice id -> posição +
+    bitmaps de opcionais (mock_server.features) + column store NumPy
+    (mock_server.columns, só depois que alguém o pede) + ids alterados nas
+    últimas versões (changes). cache guarda resultados derivados desta
+    versão (ex.: analytics).
+    """
+
+    __slots__ = ('vehicles', 'index', 'version', 'features', 'columns', 'changes', 'cache')
+
+    def __init__(self, vehicles, index, version, features, columns=None, changes=None):
+        self.vehicles = vehicles
+        self.index = index
+        self.version = version
+        self.features = features
+        self.columns = columns
+        self.changes = ChangeLog(floor=version) if changes is None else changes
+        self.cache = {}
+
+    def get(self, vehicle_id):
+        position = self.index.get(vehicle_id)
+        return None if position is None else self.vehicles[position]
+
+    def with_features(self, labels):
+        """Veículos que têm todos os opcionais pedidos, na ordem do catálogo"""
+        mask = dictionary.query_mask(labels)
+        if mask is None:
+            return []
+        if not mask:
+            return list(self.vehicles)
+        ids = self.features.match(mask)
+        positions = sorted(self.index[vehicle_id] for vehicle_id in iter_bits(ids))
+        return [self.vehicles[position] for position in positions]
+
+    def __len__(self):
+        return len(self.vehicles)
+
+
+def _build_index(vehicles):
+    return {v['id']: i for i, v in enumerate(vehicles)}
+
+
+def copy_vehicle(vehicle):
+    """Cópia editável (dict) de um veículo publicado, media e listas inclusas"""
+    return vehicle.to_dict()
+
+
+class CatalogTransaction:
+    """Nova versão em construção; a lista só é copiada na primeira alteração"""
+
+    def __init__(self, base, garage_id=None, cold=None):
+        self.base = base
+        self.garage_id = garage_id
+        self.cold = cold
+        self._vehicles = None
+        self._index = None
+        self.changed = False
+        self.upserts = {}
+        self.deletes = set()
+
+    def _materialize(self):
+        if self._vehicles is None:
+            self._vehicles = list(self.base.vehicles)
+            self._index = dict(self.base.index)
+        self.changed = True
+
+    @property
+    def vehicles(self):
+        return self.base.vehicles if self._vehicles is None else self._vehicles
+
+    def get(self, vehicle_id):
+        index = self.base.index if self._index is None else self._index
+        position = index.get(vehicle_id)
+        return None if position is None else self.vehicles[position]
+
+    def put(self, vehicle, stored=False):
+        """Insere ou substitui (pelo id) um veículo; stored: dict no formato do journal"""
+        if self.garage_id is not None and vehicle.get('garageId') != self.garage_id:
+            if not isinstance(vehicle, dict):
+                vehicle = vehicle.to_dict()
+            vehicle['garageId'] = self.garage_id
+        vehicle = pack(vehicle, self.cold, stored, self.get(vehicle['id']) if self.cold is not None else None)
+        self._materialize()
+        self.upserts[vehicle['id']] = vehicle
+        self.deletes.discard(vehicle['id'])
+        position = self._index.get(vehicle['id'])
+        if position is None:
+            self._index[vehicle['id']] = len(self._vehicles)
+            self._vehicles.append(vehicle)
+        else:
+            self._vehicles[position] = vehicle
+
+    def delete_many(self, vehicle_ids):
+        """Remove vários veículos em uma única passada; retorna os removidos"""
+        vehicle_ids = set(vehicle_ids)
+        removed = [v for v in self.vehicles if v['id'] in vehicle_ids]
+        if removed:
+            for vehicle in removed:
+                self.upserts.pop(vehicle['id'], None)
+                self.deletes.add(vehicle['id'])
+            self._materialize()
+            self._vehicles = [v for v in self._vehicles if v['id'] not in vehicle_ids]
+            self._index = _build_index(self._vehicles)
+        return removed
+
+    def delete(self, vehicle_id):
+        removed = self.delete_many([vehicle_id])
+        return removed[0] if removed else None
+
+    def _feature_changes(self):
+        changes = {}
+        for vehicle_id, vehicle in self.upserts.items():
+            old = self.base.get(vehicle_id)
+            changes[vehicle_id] = (dictionary.vehicle_mask(old) if old is not None else 0,
+                                   dictionary.vehicle_mask(vehicle))
+        for vehicle_id in self.deletes:
+            old = self.base.get(vehicle_id)
+            if old is not None:
+                changes[vehicle_id] = (dictionary.vehicle_mask(old), 0)
+        return changes
+
+    def changed_ids(self):
+        return list(self.upserts) + sorted(self.deletes)
+
+    def snapshot(self, version, changes=None):
+        """Snapshot publicado como `version`; changes = [(versão, ids)] quando vem de vários commits do journal"""
+        features = self.base.features.updated(self._feature_changes())
+        columns = self.base.columns
+        if columns is not None:
+            columns = columns.updated(self.upserts, self.deletes)
+        changes = self.base.changes.appended(changes or [(version, self.changed_ids())])
+        snapshot = CatalogSnapshot(tuple(self._vehicles), self._index, version, features, columns, changes)
+        similar = self.base.cache.get('similar')
+        if similar is not None:
+            # matriz de /similar (mock_server.similar), se alguém já a pediu: só as linhas alteradas
+            snapshot.cache['similar'] = similar.updated(self.base.columns, columns, self.upserts, self.deletes)
+        return snapshot
+
+
+def _commit_ids(record):
+    return [v['id'] for v in record.get('put', [])] + record.get('delete', [])
+
+
+class Catalog:
+    """Catálogo compartilhado entre threads: leituras sem lock, um escritor por vez"""
+
+    def __init__(self, vehicles, persist, journal=None, garage_id=None, version=0, cold=None, reload=None):
+        self._persist = persist
+        # () -> (veículos, versão) do disco, para quando o journal compactado
+        # já não tem commits que este processo não leu
+        self._reload_source = reload
+        self.garage_id = garage_id
+        self.cold = cold
+        self._journal = journal
+        vehicles = tuple(pack(v, cold) for v in vehicles)
+        self._snapshot = CatalogSnapshot(vehicles, _build_index(vehicles), version, FeatureIndex.build(vehicles))
+        self.write_lock = threading.Lock()
+        self._published = threading.Condition()
+        self._wakeups = 0
+        self._reserved_ids = set()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _publish(self, snapshot):
+        with self._published:
+            self._snapshot = snapshot
+            self._published.notify_all()
+
+    def wait_for_version(self, version, timeout):
+        """Espera uma versão publicada posterior a `version`; False se o tempo acabar"""
+        with self._published:
+            wakeups = self._wakeups
+            self._published.wait_for(lambda: self._snapshot.version != version or self._wakeups != wakeups,
+                                     timeout)
+            return self._snapshot.version != version
+
+    def wake_waiters(self):
+        """Interrompe as esperas em wait_for_version (que devolvem False se a versão não mudou)"""
+        with self._published:
+            self._wakeups += 1
+            self._published.notify_all()
+
+    def attach_journal(self, journal):
+        """Passa a compartilhar as escritas com outros processos via journal"""
+        with self.write_lock:
+            self._journal = journal
+
+    def _interprocess_lock(self):
+        return self._journal.lock if self._journal else nullcontext()
+
+    def _apply_journal(self, locked=True):
+        """
+        Aplica registros de outros processos (chamar com write_lock adquirido;
+        locked indica se o lock do journal também está)
+        """
+        records = self._journal.read_new()
+        if not records:
+            return
+        if any(r.get('op') == 'checkpoint' and r['version'] > self._snapshot.version for r in records):
+            if locked:
+                self._reload()
+            else:
+                with self._journal.lock:
+                    self._reload()
+            return
+        txn = CatalogTransaction(self._snapshot, self.garage_id, self.cold)
+        version = self._snapshot.version
+        changes = []
+        for record in records:
+            # Commits já aplicados (inclusive os deste processo) só atualizam as reservas
+            if record.get('op') == 'commit' and record.get('version', version + 1) > version:
+                txn.delete_many(record.get('delete', []))
+                for vehicle in record.get('put', []):
+                    txn.put(vehicle, stored=True)
+                version = record.get('version', version + 1)
+                changes.append((version, _commit_ids(record)))
+            self._track_reservations(record)
+        if txn.changed:
+            self._publish(txn.snapshot(version, changes))
+
+    def _track_reservations(self, record):
+        op = record.get('op')
+        if op == 'commit':
+            self._reserved_ids.difference_update(v['id'] for v in record.get('put', []))
+        elif op == 'reserve':
+            self._reserved_ids.update(record['ids'])
+        elif op == 'release':
+            self._reserved_ids.difference_update(record['ids'])
+        elif op == 'checkpoint':
+            self._reserved_ids = set(record['reserved'])
+
+    def resume(self):
+        """
+        Lê o journal até o fim sem reaplicar as escritas, para um catálogo
+        carregado de um vehicles.json que já as contém (chamar com o lock do
+        journal adquirido): recupera as reservas de ids pendentes e o
+        histórico de versões do feed de alterações.
+        """
+        self._resume(self._snapshot)
+
+    def _resume(self, snapshot):
+        changes = []
+        for record in self._journal.read_new():
+            if record.get('op') == 'commit' and 'version' in record:
+                changes.append((record['version'], _commit_ids(record)))
+            self._track_reservations(record)
+        if changes:
+            # snapshot ainda não publicado para nenhum leitor
+            snapshot.changes = ChangeLog(floor=changes[0][0] - 1).appended(changes)
+
+    def _reload(self):
+        """
+        Recarrega o catálogo do disco: outro processo compactou o journal
+        antes de este ler commits que foram descartados (chamar com os dois
+        locks adquiridos). O feed de alterações recomeça da versão lida.
+        """
+        logger.warning("Journal da garagem %s compactado antes da leitura: recarregando do disco", self.garage_id)
+        vehicles, version = self._reload_source()
+        vehicles = tuple(pack(v, self.cold) for v in vehicles)
+        snapshot = CatalogSnapshot(vehicles, _build_index(vehicles), version, FeatureIndex.build(vehicles))
+        self._journal.rewind()
+        self._reserved_ids = set()
+        self._resume(snapshot)
+        self._publish(snapshot)
+
+    def sync(self):
+        """Incorpora as escritas feitas por outros processos desde a última leitura"""
+        if self._journal is None:
+            return
+        with self.write_lock:
+            self._apply_journal(locked=False)
+
+    @contextmanager
+    def write(self):
+        """
+        Abre uma transação de escrita. Ao sair sem exceção, a nova versão é
+        persistida e publicada; se o bloco falhar, nada muda.
+        """
+        with self.write_lock, self._interprocess_lock():
+            if self._journal:
+                self._apply_journal()
+            txn = CatalogTransaction(self._snapshot, self.garage_id, self.cold)
+            yield txn
+            if txn.changed:
+                new_snapshot = txn.snapshot(self._snapshot.version + 1)
+                self._persist(list(new_snapshot.vehicles), new_snapshot.version)
+                if self._journal:
+                    self._journal.append({
+                        "op": "commit",
+                        "version": new_snapshot.version,
+                        "at": time.time(),
+                        "put": list(txn.upserts.values()),
+                        "delete": sorted(txn.deletes),
+                    })
+                self._publish(new_snapshot)
+                self._reserved_ids.difference_update(txn.upserts)
+                if self._journal and self._journal.should_compact():
+                    # vehicles.json já tem esta versão e todas as anteriores
+                    self._journal.compact(self._reserved_ids)
+
+    def reserve_ids(self, count):
+        """
+        Reserva os menores IDs livres (mesma regra de create_vehicle), para que
+        uploads possam usar o ID antes do veículo ser publicado.
+        """
+        with self.write_lock, self._interprocess_lock():
+            if self._journal:
+                self._apply_journal()
+            used = self._snapshot.index
+            reserved = []
+            candidate = 1
+            while len(reserved) < count:
+                if candidate not in used and candidate not in self._reserved_ids:
+                    reserved.append(candidate)
+                    self._reserved_ids.add(candidate)
+                candidate += 1
+            if self._journal:
+                self._journal.append({"op": "reserve", "ids": reserved})
+            return reserved
+
+    def reserve_id(self):
+        return self.reserve_ids(1)[0]
+
+    def release_ids(self, vehicle_ids):
+        vehicle_ids = [i for i in vehicle_ids if i in self._reserved_ids]
+        if not vehicle_ids:
+            return
+        with self.write_lock, self._interprocess_lock():
+            if self._journal:
+                self._apply_journal()
+            self._reserved_ids.difference_update(vehicle_ids)
+            if self._journal:
+                self._journal.append({"op": "release", "ids": vehicle_ids})
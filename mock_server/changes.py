@@ -0,0 +1,160 @@
+"""
+Feed de alterações do catálogo (GET /api/vehicles/changes?since=<versão>) e
+o mesmo feed empurrado por Server-Sent Events.
+
+Cada transação publicada ganha uma versão nova (monotônica, persistida por
+garagem em version.json e gravada no journal, então todos os workers usam
+os mesmos números). ChangeLog guarda, junto com o snapshot, as últimas
+versões e os ids que cada uma alterou; um cliente com uma cópia local na
+versão v recebe só os veículos alterados depois de v (no estado atual) e os
+ids excluídos. Se v já saiu do ring (ou não é uma versão deste catálogo), a
+resposta pede uma recarga completa.
+
+Cada stream SSE aberto ocupa uma thread (do pool no --asyncio, da conexão
+nos demais modos) enquanto o cliente estiver conectado: MOCK_SSE_MAX_STREAMS
+(padrão 16, por processo) limita quantos ficam abertos ao mesmo tempo, e
+close_streams() encerra todos no desligamento do servidor ou do worker.
+"""
+
+import json
+import os
+import threading
+
+from . import metrics
+from .records import json_default
+
+RING_SIZE = 1000          # versões guardadas
+RING_IDS = 50_000         # ids somados em todas as versões guardadas
+KEEPALIVE_SECONDS = 15.0
+RETRY_MILLISECONDS = 3000
+DEFAULT_MAX_STREAMS = 16
+
+_slots = threading.BoundedSemaphore(int(os.environ.get('MOCK_SSE_MAX_STREAMS') or DEFAULT_MAX_STREAMS))
+_closing = threading.Event()
+_waiting = {}             # catálogo -> streams esperando nele (para acordá-los em close_streams)
+_waiting_lock = threading.Lock()
+
+
+class ChangeLog:
+    """Últimas versões de um catálogo e os ids alterados em cada uma (imutável, como o snapshot)"""
+
+    __slots__ = ('entries', 'floor', 'size')
+
+    def __init__(self, entries=(), floor=0, size=0):
+        self.entries = entries      # ((versão, ids), ...) em ordem crescente de versão
+        self.floor = floor          # menor `since` que o ring ainda responde
+        self.size = size
+
+    def appended(self, changes):
+        """Novo ChangeLog com [(versão, ids)] acrescentados, descartando as versões mais antigas"""
+        entries = self.entries + tuple((version, tuple(ids)) for version, ids in changes)
+        size = self.size + sum(len(ids) for _, ids in changes)
+        start = 0
+        floor = self.floor
+        while len(entries) - start > 1 and (len(entries) - start > RING_SIZE or size > RING_IDS):
+            floor, ids = entries[start]
+            size -= len(ids)
+            start += 1
+        return ChangeLog(entries[start:], floor, size)
+
+    def ids_since(self, since):
+        """Ids alterados depois de `since`, do menos ao mais recente (None se since saiu do ring)"""
+        if since < self.floor:
+            return None
+        seen = set()
+        ordered = []
+        for version, ids in reversed(self.entries):
+            if version <= since:
+                break
+            for vehicle_id in reversed(ids):
+                if vehicle_id not in seen:
+                    seen.add(vehicle_id)
+                    ordered.append(vehicle_id)
+        ordered.reverse()
+        return ordered
+
+
+def parse_version(value):
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        return None
+    return version if version >= 0 else None
+
+
+def changes_since(snapshot, since):
+    """
+    Delta entre a versão `since` e o snapshot: veículos alterados (estado
+    atual) e ids excluídos. None quando o cliente precisa recarregar tudo.
+    """
+    if since > snapshot.version:
+        return None
+    ids = snapshot.changes.ids_since(since)
+    if ids is None:
+        return None
+    vehicles, deleted = [], []
+    for vehicle_id in ids:
+        vehicle = snapshot.get(vehicle_id)
+        if vehicle is None:
+            deleted.append(vehicle_id)
+        else:
+            vehicles.append(vehicle)
+    return {"since": since, "version": snapshot.version, "vehicles": vehicles, "deleted": deleted}
+
+
+def reset_payload(snapshot):
+    return {"reset": True, "version": snapshot.version}
+
+
+def _event(name, data, version):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    return f"event: {name}\nid: {version}\ndata: {payload}\n\n"
+
+
+def acquire_slot():
+    """Reserva um dos MOCK_SSE_MAX_STREAMS streams; False se estão todos ocupados (ou encerrando)"""
+    return not _closing.is_set() and _slots.acquire(blocking=False)
+
+
+def release_slot():
+    _slots.release()
+
+
+def close_streams():
+    """Encerra os streams abertos (e recusa novos): sem isso, o desligamento esperaria os clientes"""
+    _closing.set()
+    with _waiting_lock:
+        catalogs = list(_waiting)
+    for catalog in catalogs:
+        catalog.wake_waiters()
+
+
+def stream(catalog, since, keepalive=KEEPALIVE_SECONDS):
+    """
+    Eventos SSE: 'changes' com o mesmo corpo de /changes a cada nova versão,
+    'reset' quando o delta não está mais disponível e comentários de
+    keepalive (que também detectam clientes desconectados). Termina em
+    close_streams(); o cliente reconecta (retry) em outro worker.
+    """
+    metrics.SSE_STREAMS.inc()
+    with _waiting_lock:
+        _waiting[catalog] = _waiting.get(catalog, 0) + 1
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        while not _closing.is_set():
+            snapshot = catalog.snapshot
+            if snapshot.version != since:
+                delta = changes_since(snapshot, since)
+                if delta is None:
+                    yield _event('reset', reset_payload(snapshot), snapshot.version)
+                else:
+                    yield _event('changes', delta, snapshot.version)
+                since = snapshot.version
+            elif not catalog.wait_for_version(since, keepalive):
+                yield ": keepalive\n\n"
+    finally:
+        with _waiting_lock:
+            _waiting[catalog] -= 1
+            if not _waiting[catalog]:
+                del _waiting[catalog]
+        metrics.SSE_STREAMS.dec()
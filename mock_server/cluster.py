@@ -0,0 +1,308 @@
+"""
+Modo de produção multi-processo (pre-fork).
+
+O processo mestre carrega o catálogo uma única vez, abre o socket e faz fork
+de N workers, que herdam o catálogo já carregado (copy-on-write do SO).
+Cada escrita é persistida e registrada no journal (mutations.log) sob um
+lock entre processos; os workers aplicam as escritas dos outros lendo o
+journal a cada MOCK_SYNC_INTERVAL segundos (staleness máxima).
+O journal é compactado por quem escreve quando cresce demais (Journal.compact).
+
+Com o catálogo particionado (mock_server.garages), cada garagem tem o seu
+journal; partições que ninguém havia usado antes do fork são carregadas
+do disco pelo próprio worker, na primeira requisição da garagem.
+
+Sinais no mestre:
+    SIGHUP          reload gracioso: novos workers são criados a partir do
+                    estado atual do mestre (sem reler vehicles.json) e os
+                    antigos terminam as requisições em andamento e saem
+    SIGTERM/SIGINT  encerra os workers e o mestre
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o lock entre threads
+    fcntl = None
+
+from .changes import close_streams
+from .records import storage_default
+
+DEFAULT_SYNC_INTERVAL = 0.25
+# Tamanho a partir do qual o journal é compactado, e por quanto tempo os
+# commits ficam nele para os workers que ainda não os leram
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+JOURNAL_RETAIN_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+class InterProcessLock:
+    """Lock entre threads e processos (flock em um arquivo .lock, reaberto após fork)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        if self._pid != os.getpid():
+            # fd herdado do pai compartilharia o mesmo lock: abrir um próprio
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file(), fcntl.LOCK_EX)
+            except Exception:
+                self._thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+class Journal:
+    """
+    Log append-only (JSON por linha) das mutações do catálogo entre processos.
+
+    Quando passa de JOURNAL_MAX_BYTES, quem está escrevendo o compacta (ver
+    compact): os commits antigos já estão no vehicles.json e são trocados
+    por um checkpoint. Leitores percebem a troca pelo inode do arquivo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = InterProcessLock(path + '.lock')
+        self.offset = 0
+        # Arquivo a que o offset se refere (compact troca o arquivo inteiro)
+        self.inode = None
+        self.size = 0
+        self._compact_at = JOURNAL_MAX_BYTES
+
+    def reset(self):
+        """Trunca o journal (chamado pelo mestre, com vehicles.json já consistente)"""
+        with self.lock:
+            with open(self.path, 'wb'):
+                pass
+        self.rewind()
+
+    def rewind(self):
+        """Faz o próximo read_new ler o journal desde o início"""
+        self.offset = 0
+        self.inode = None
+
+    def append(self, record):
+        """
+        Acrescenta um registro; deve ser chamado com self.lock adquirido. O
+        offset de leitura não anda: registros de outros processos gravados
+        antes deste ainda serão lidos, e o próprio registro volta no próximo
+        read_new (quem lê ignora o que já aplicou).
+        """
+        line = (json.dumps(record, ensure_ascii=False, default=storage_default) + '\n').encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(line)
+            self.size = f.tell()
+
+    def read_new(self):
+        """Registros completos gravados desde a última leitura"""
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_ino != self.inode or stat.st_size < self.offset:
+                    # Compactado (ou truncado) por outro processo: reler do início
+                    self.inode = stat.st_ino
+                    self.offset = 0
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        end = data.rfind(b'\n')
+        if end < 0:
+            return []
+        self.offset += end + 1
+        return [json.loads(line) for line in data[:end].split(b'\n') if line]
+
+    def should_compact(self):
+        return self.size > self._compact_at
+
+    def compact(self, reserved_ids, retain=JOURNAL_RETAIN_SECONDS):
+        """
+        Descarta os commits gravados há mais de `retain` segundos (chamar com
+        self.lock adquirido, depois de o vehicles.json conter todos eles).
+
+        O novo arquivo tem os commits recentes e, no fim, um checkpoint com a
+        maior versão descartada e as reservas de ids pendentes, que substitui
+        os registros reserve/release. Um processo que ainda não tinha lido
+        commits descartados vê a versão do checkpoint à frente da sua e
+        recarrega o vehicles.json (Catalog._reload).
+        """
+        with open(self.path, 'rb') as f:
+            records = [json.loads(line) for line in f.read().split(b'\n') if line.strip()]
+        cutoff = time.time() - retain
+        version = 0
+        kept = []
+        for record in records:
+            op = record.get('op')
+            if op == 'checkpoint':
+                version = max(version, record['version'])
+            elif op == 'commit':
+                if not kept and record.get('at', 0) < cutoff:
+                    version = record.get('version', version)
+                else:
+                    kept.append(record)
+        kept.append({"op": "checkpoint", "version": version, "reserved": sorted(reserved_ids)})
+        content = b''.join(
+            (json.dumps(record, ensure_ascii=False, default=storage_default) + '\n').encode('utf-8')
+            for record in kept)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(content)
+        os.replace(temporary, self.path)
+        self.size = len(content)
+        # Só compactar de novo depois de o journal dobrar (commits recentes não saem)
+        self._compact_at = max(JOURNAL_MAX_BYTES, 2 * self.size)
+        logger.info("Journal %s compactado: %d -> %d registros", self.path, len(records), len(kept))
+
+
+def start_sync_thread(catalog, interval):
+    """Aplica periodicamente as escritas de outros processos"""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                catalog.sync()
+            except Exception as e:
+                logger.exception("Erro ao sincronizar journal: %s", e)
+
+    thread = threading.Thread(target=loop, name='journal-sync', daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_worker(app, listen_socket, catalog, sync_interval):
+    from werkzeug.serving import make_server
+
+    host, port = listen_socket.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=listen_socket.fileno())
+    # Ao encerrar, aguardar as requisições em andamento
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def shutdown():
+        # Streams SSE nunca terminam sozinhos: sem isso o worker aposentado
+        # (SIGHUP no mestre) esperaria os clientes para sempre
+        close_streams()
+        server.shutdown()
+
+    def stop(signum, frame):
+        threading.Thread(target=shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    start_sync_thread(catalog, sync_interval)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def serve(app, catalog, host, port, workers, sync_interval=DEFAULT_SYNC_INTERVAL):
+    """Processo mestre: abre o socket, faz fork dos workers e os supervisiona"""
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(socket.SOMAXCONN)
+    listen_socket.set_inheritable(True)
+
+    children = set()
+    state = {"running": True, "reload": False}
+
+    def spawn():
+        # Fork com o lock de escrita do catálogo: o filho herda snapshot e
+        # offset do journal consistentes entre si
+        with catalog.write_lock:
+            pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, listen_socket, catalog, sync_interval)
+            finally:
+                # os._exit não roda atexit: esvaziar a fila de logs antes
+                from .log import shutdown_logging
+                shutdown_logging()
+                os._exit(0)
+        children.add(pid)
+        return pid
+
+    def on_reload(signum, frame):
+        state['reload'] = True
+
+    def on_stop(signum, frame):
+        state['running'] = False
+
+    signal.signal(signal.SIGHUP, on_reload)
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+
+    # O mestre também acompanha o journal, para que reloads partam do estado atual
+    start_sync_thread(catalog, sync_interval)
+
+    for _ in range(workers):
+        spawn()
+    logger.info("%s workers servindo em http://%s:%s (mestre pid %s)", workers, host, port, os.getpid())
+
+    retiring = set()
+    while state['running']:
+        if state['reload']:
+            state['reload'] = False
+            catalog.sync()
+            old = set(children)
+            for _ in range(workers):
+                spawn()
+            for pid in old:
+                children.discard(pid)
+                retiring.add(pid)
+                os.kill(pid, signal.SIGTERM)
+            logger.info("Reload: %s workers antigos finalizando", len(old))
+
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid:
+            if pid in retiring:
+                retiring.discard(pid)
+            elif pid in children and state['running']:
+                children.discard(pid)
+                logger.warning("Worker %s saiu inesperadamente, criando outro", pid)
+                spawn()
+            continue
+        time.sleep(0.2)
+
+    for pid in children | retiring:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in children | retiring:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    listen_socket.close()
@@ -0,0 +1,370 @@
+"""
+Campos frios do catálogo (descrição e, opcionalmente, media) fora do heap.
+
+Descrições são o maior campo de um veículo e quase nunca são lidas em
+listagens, filtros ou analytics. Com um ColdStore, cada valor é comprimido
+(deflate) e acrescentado a um arquivo por garagem; o VehicleRecord guarda só
+um ColdRef (offset, tamanho) e o valor é descomprimido sob demanda, com os
+mais recentes em um LRU:
+
+    cold.blob     valores comprimidos, só acrescentados (append-only)
+    cold.zdict    dicionário de compressão da garagem
+
+Como as descrições repetem o mesmo texto padrão (o gerador do VehicleForm,
+chamadas de financiamento, listas de revisões), todas são comprimidas com um
+dicionário compartilhado: o texto fixo do formulário mais os trechos mais
+frequentes de uma amostra do catálogo, treinado uma vez na primeira carga e
+fixo a partir daí (os valores já gravados dependem dele).
+
+É opcional (MOCK_COLD_FIELDS): sem configuração nada vai para o store e o
+vehicles.json continua autocontido. Com campos configurados, vehicles.json e
+o journal guardam {"$cold": [offset, tamanho]} no lugar do valor
+(records.storage_default) e passam a depender de cold.blob/cold.zdict (fora
+do git). Tirar um campo da configuração traz os valores de volta para o
+vehicles.json na próxima carga.
+
+Um valor igual ao anterior do mesmo veículo (ex.: PUT que não mexe na
+descrição) reaproveita a referência. Valores substituídos ficam como lixo
+no cold.blob até a próxima carga da garagem em um processo único (sem
+--workers), que compacta o arquivo quando o lixo passa de metade dele.
+
+Configuração (ambiente):
+    MOCK_COLD_FIELDS   campos gravados no store: "" (padrão, nenhum),
+                       "description" ou "description,media"
+    MOCK_COLD_CACHE    tamanho do LRU de valores descomprimidos (padrão 512)
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+from . import metrics
+from .cluster import InterProcessLock
+from .records import COLD_FIELDS, COLD_MARKER, ColdRef
+
+DEFAULT_FIELDS = ()
+DEFAULT_CACHE_SIZE = 512
+DICTIONARY_SIZE = 32 * 1024      # janela do deflate: bytes além disso nunca são referenciados
+MIN_SIZE = 128                   # valores menores ficam no record (um ColdRef custa ~110 bytes)
+MIN_FRAGMENT = 8
+COMPRESSION_LEVEL = 6
+WBITS = -15                      # deflate puro, sem cabeçalho/checksum do zlib
+COMPACT_MIN_GARBAGE = 1024 * 1024
+
+# Texto fixo das descrições geradas pelo VehicleForm (generateDescriptionFromData)
+BASE_PHRASES = (
+    "💰 **Financiamento facilitado** | 🔄 **Aceita troca** | 📞 **Entre em contato agora!**",
+    "Agende já sua visita e sinta a diferença de dirigir um veículo de qualidade!",
+    "🔥 **Não perca esta oportunidade!** Este ",
+    " está esperando por você.",
+    "\n💫 **Estilo de Vida:** ",
+    "\n🛡️ **Segurança Blindada** - Proteção máxima para você e sua família!\n",
+    "\n🎯 **Opcionais que fazem a diferença:**\n• ",
+    "\n🏆 **Qualidades ",
+    "\n\n✨ **Por que escolher este veículo?**\n1. ",
+    "** - Uma excelente escolha para ",
+    " na elegante cor ",
+    " combina motor ",
+    " eficiente com câmbio ",
+    " suave. Com apenas ",
+    " km, está praticamente novo!",
+    " km bem conservados, ainda tem muito a oferecer!",
+    " km de experiência comprovada na estrada!",
+    "Perfeito para viagens em família, passeios de fim de semana e o dia a dia urbano com conforto e praticidade.",
+    "Ideal para quem busca sofisticação no dia a dia, viagens confortáveis e economia sem abrir mão do estilo.",
+    "Perfeito para a vida urbana, primeiro carro ou para quem valoriza praticidade e economia no dia a dia.",
+    "Ideal para trabalho, aventuras off-road e para quem precisa de um veículo que une utilidade e estilo.",
+    "Espaço interno generoso\n2. Porta-malas amplo\n3. Posição de dirigir elevada\n4. Segurança para toda família\n",
+    "Conforto refinado\n2. Porta-malas espaçoso\n3. Economia de combustível\n4. Design elegante\n",
+    "Agilidade no trânsito\n2. Facilidade para estacionar\n3. Economia de combustível\n4. Design moderno\n",
+    "Capacidade de carga\n2. Robustez\n3. Versatilidade\n4. Design imponente\n",
+    "famílias com filhos", "executivos e famílias", "jovens e casais urbanos", "empreendedores e aventureiros",
+    "• Qualidade reconhecida\n• Boa procedência\n• Excelente opção\n",
+    "Veículo em excelente estado de conservação",
+)
+BASE_DICTIONARY = '\n'.join(BASE_PHRASES).encode('utf-8')
+
+_DIGITS = re.compile(r'\d+')
+
+
+def configured_fields():
+    value = os.environ.get('MOCK_COLD_FIELDS')
+    if value is None:
+        return DEFAULT_FIELDS
+    return tuple(field for field in (f.strip() for f in value.split(',')) if field in COLD_FIELDS)
+
+
+def _text(value):
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """
+    Dicionário deflate para os valores de samples: o texto fixo do formulário
+    seguido dos trechos (linhas cortadas nos números) que se repetem em mais de
+    um valor, os mais frequentes no fim (mais perto do dado, referências mais curtas)
+    """
+    counts = Counter()
+    for sample in samples:
+        fragments = set()
+        for line in _text(sample).splitlines():
+            fragments.update(f for f in _DIGITS.split(line) if len(f) >= MIN_FRAGMENT)
+        counts.update(fragments)
+    budget = size - len(BASE_DICTIONARY) - 1
+    chosen = []
+    for fragment, count in sorted(counts.items(), key=lambda item: (-item[1], -len(item[0]))):
+        if count < 2:
+            break
+        data = fragment.encode('utf-8')
+        if len(data) + 1 > budget:
+            continue
+        chosen.append(data)
+        budget -= len(data) + 1
+    chosen.reverse()
+    return b'\n'.join([BASE_DICTIONARY, *chosen])
+
+
+def _is_marker(value):
+    return value.__class__ is dict and len(value) == 1 and COLD_MARKER in value
+
+
+def _payload(value, force=False):
+    """Bytes gravados para um valor (prefixo s = texto, j = JSON); None se não vale a pena"""
+    if value.__class__ is str:
+        if len(value) < MIN_SIZE:
+            return None
+        return b's' + value.encode('utf-8')
+    if value.__class__ is dict or value.__class__ is list:
+        payload = b'j' + json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return payload if force or len(payload) > MIN_SIZE else None
+    return None
+
+
+def _decode(payload):
+    if payload[:1] == b's':
+        return payload[1:].decode('utf-8')
+    return json.loads(payload[1:])
+
+
+class ColdStore:
+    """Valores comprimidos de uma garagem (threads e workers compartilham o mesmo arquivo)"""
+
+    TRAINING_SAMPLES = 500
+
+    def __init__(self, directory, name='cold', fields=None, cache_size=None):
+        self.directory = directory
+        self.path = os.path.join(directory, name + '.blob')
+        self.dictionary_path = os.path.join(directory, name + '.zdict')
+        self.fields = frozenset(configured_fields() if fields is None else fields)
+        if cache_size is None:
+            cache_size = int(os.environ.get('MOCK_COLD_CACHE') or DEFAULT_CACHE_SIZE)
+        self.cache_size = max(cache_size, 0)
+        # valores acrescentados / trazidos de volta para o record por este processo
+        # (a carga usa para saber se precisa regravar o vehicles.json)
+        self.appended = 0
+        self.inlined = 0
+        self._dictionary = None
+        self._compressor = None
+        self._lock = threading.Lock()
+        self._file_lock = None
+        self._fd = None
+        self._pid = None
+        self._cache = OrderedDict()   # offset -> payload
+        self._refs = {}               # payload -> ColdRef, dos valores que estão no cache
+
+    def _interprocess_lock(self):
+        if self._file_lock is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file_lock = InterProcessLock(self.path + '.lock')
+        return self._file_lock
+
+    def _file(self):
+        if self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    # Dicionário
+
+    def needs_dictionary(self):
+        """True se a próxima gravação precisaria criar o dicionário (dá para treinar antes)"""
+        return bool(self.fields) and self._dictionary is None and not os.path.exists(self.dictionary_path)
+
+    def train(self, samples):
+        """Cria o dicionário a partir de valores de exemplo (se outro processo não criou antes)"""
+        self._load_dictionary(samples)
+
+    def _load_dictionary(self, samples=()):
+        with self._interprocess_lock():
+            if os.path.exists(self.dictionary_path):
+                with open(self.dictionary_path, 'rb') as f:
+                    dictionary = f.read()
+            else:
+                dictionary = train_dictionary(samples)
+                temporary = self.dictionary_path + '.tmp'
+                with open(temporary, 'wb') as f:
+                    f.write(dictionary)
+                os.replace(temporary, self.dictionary_path)
+        self._compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, WBITS, zdict=dictionary)
+        self._dictionary = dictionary
+        return dictionary
+
+    def dictionary(self):
+        return self._dictionary if self._dictionary is not None else self._load_dictionary()
+
+    # Gravação e leitura
+
+    def put(self, key, value, stored=False, previous=None):
+        """
+        ColdRef para o valor do campo `key` (o próprio valor se o campo não está
+        configurado ou o valor é pequeno). Com stored, um {"$cold": [...]} lido do
+        disco vira a referência correspondente (ou o valor, se o campo saiu da
+        configuração). previous: valor anterior do campo no mesmo veículo.
+        """
+        marker = _is_marker(value)
+        if marker and stored:
+            offset, size = value[COLD_MARKER]
+            ref = ColdRef(self, offset, size)
+            if key in self.fields:
+                return ref
+            loaded = self.load(ref)
+            if _is_marker(loaded):
+                return ref
+            self.inlined += 1
+            return loaded
+        # Um valor vindo da API com a forma de referência nunca fica inline no
+        # disco, senão a próxima carga o leria como referência
+        if key not in self.fields and not marker:
+            return value
+        if previous.__class__ is ColdRef and previous.store is self and self.load(previous) == value:
+            return previous
+        payload = _payload(value, force=marker)
+        if payload is None:
+            return value
+        with self._lock:
+            ref = self._refs.get(payload)
+            if ref is not None:
+                self._cache.move_to_end(ref.offset)
+                return ref
+        self.dictionary()
+        compressor = self._compressor.copy()
+        data = compressor.compress(payload) + compressor.flush()
+        with self._interprocess_lock():
+            fd = self._file()
+            offset = os.lseek(fd, 0, os.SEEK_END)
+            os.write(fd, data)
+        ref = ColdRef(self, offset, len(data))
+        with self._lock:
+            self.appended += 1
+            self._remember(ref, payload)
+        metrics.COLD_BYTES.inc(len(data))
+        return ref
+
+    def load(self, ref):
+        """Valor de uma referência (texto ou o JSON original, sempre um objeto novo)"""
+        with self._lock:
+            payload = self._cache.get(ref.offset)
+            if payload is not None:
+                self._cache.move_to_end(ref.offset)
+        if payload is None:
+            metrics.COLD_READS.inc(labels=('miss',))
+            data = os.pread(self._file(), ref.size, ref.offset)
+            decompressor = zlib.decompressobj(WBITS, zdict=self.dictionary())
+            payload = decompressor.decompress(data) + decompressor.flush()
+            with self._lock:
+                self._remember(ref, payload)
+        else:
+            metrics.COLD_READS.inc(labels=('hit',))
+        return _decode(payload)
+
+    def compact(self, refs):
+        """
+        Reescreve o cold.blob só com os valores de refs (atualizadas no lugar),
+        se o lixo compensar; True se compactou. Só para refs ainda não
+        publicadas e sem outros processos usando o arquivo. O novo arquivo fica
+        em cold.blob.new até o vehicles.json com os novos offsets ser gravado
+        (chamar commit_compaction() em seguida).
+        """
+        live = {}
+        for ref in refs:
+            live.setdefault(ref.offset, []).append(ref)
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        garbage = size - sum(group[0].size for group in live.values())
+        if garbage < COMPACT_MIN_GARBAGE or garbage * 2 < size:
+            return False
+        fd = self._file()
+        position = 0
+        with open(self.path + '.new', 'wb') as f:
+            for offset in sorted(live):
+                group = live[offset]
+                f.write(os.pread(fd, group[0].size, offset))
+                for ref in group:
+                    ref.offset = position
+                position += group[0].size
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            self._cache.clear()
+            self._refs.clear()
+        return True
+
+    def commit_compaction(self):
+        """Troca o cold.blob pelo compactado (o vehicles.json com os novos offsets já foi gravado)"""
+        with self._interprocess_lock():
+            os.replace(self.path + '.new', self.path)
+            if self._pid == os.getpid():
+                os.close(self._fd)
+            self._pid = None
+
+    def recover(self, vehicles_file):
+        """
+        Conclui ou descarta uma compactação interrompida: o cold.blob.new só
+        vale se o vehicles.json foi gravado depois dele
+        """
+        new = self.path + '.new'
+        try:
+            new_mtime = os.stat(new).st_mtime_ns
+        except OSError:
+            return
+        try:
+            committed = os.stat(vehicles_file).st_mtime_ns >= new_mtime
+        except OSError:
+            committed = False
+        if committed:
+            self.commit_compaction()
+        else:
+            os.remove(new)
+
+    def remove_files(self):
+        """Apaga cold.blob/cold.zdict (quando nenhum veículo os referencia mais)"""
+        with self._interprocess_lock():
+            if self._pid == os.getpid():
+                os.close(self._fd)
+            self._pid = None
+            for path in (self.path, self.dictionary_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self._dictionary = self._compressor = None
+        with self._lock:
+            self._cache.clear()
+            self._refs.clear()
+
+    def _remember(self, ref, payload):
+        """Põe no LRU (chamar com _lock adquirido)"""
+        if not self.cache_size:
+            return
+        self._cache[ref.offset] = payload
+        self._cache.move_to_end(ref.offset)
+        self._refs[payload] = ref
+        while len(self._cache) > self.cache_size:
+            _, evicted = self._cache.popitem(last=False)
+            self._refs.pop(evicted, None)
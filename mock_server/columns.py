@@ -0,0 +1,222 @@
+"""
+Column store do catálogo em arrays NumPy, para agregações vetorizadas
+(mock_server.analytics) sem laços Python sobre os veículos.
+
+Cada veículo ocupa uma linha: campos numéricos em float64 (NaN = ausente),
+createdAt em segundos desde a época, campos categóricos com o código do
+vocabulário de mock_server.records (-1 = ausente ou não codificado) e os
+opcionais como bitmask em palavras de 64 bits (features tem uma coluna por
+palavra; o store ganha palavras quando mock_server.features passa de 64,
+128... opcionais). As linhas são endereçadas pelo id (rows: id -> linha);
+linhas de veículos excluídos ficam com live=False e são reaproveitadas.
+
+O store é criado sob demanda para um snapshot (build) e, a partir daí,
+cada transação do catálogo gera o do snapshot seguinte aplicando só os
+veículos alterados (updated). As colunas são guardadas em blocos de
+CHUNK_ROWS linhas compartilhados entre versões: uma escrita copia só os
+blocos das linhas que alterou, e array() junta os blocos de uma coluna na
+primeira leitura de cada versão.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .features import dictionary
+
+NUMERIC_FIELDS = ('price', 'mileage', 'year', 'modelYear', 'doors')
+CODED_FIELDS = ('brand', 'model', 'category', 'status', 'fuel', 'transmission', 'bodyType', 'color')
+CHUNK_ROWS = 4096
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+# nome -> (dtype, valor de linha vazia)
+COLUMNS = {
+    'id': (np.int64, -1),
+    'live': (np.bool_, False),
+    'createdAt': (np.float64, np.nan),
+    **{field: (np.float64, np.nan) for field in NUMERIC_FIELDS},
+    **{field: (np.int32, -1) for field in CODED_FIELDS},
+    'features': (np.uint64, 0),
+}
+
+
+def to_number(value):
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def to_timestamp(value):
+    """createdAt ISO 8601 -> segundos (UTC quando não há fuso)"""
+    if not isinstance(value, str):
+        return np.nan
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return np.nan
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _code(vehicle, field):
+    code = vehicle.raw(field, -1)
+    return code if code.__class__ is int else -1
+
+
+def _words(mask):
+    return max(1, -(-mask.bit_length() // WORD_BITS))
+
+
+def _split(mask, words):
+    """Bitmask (int) -> `words` palavras de 64 bits, da menos significativa à mais"""
+    return [(mask >> (WORD_BITS * word)) & WORD_MASK for word in range(words)]
+
+
+def _empty(name, rows, words):
+    dtype, fill = COLUMNS[name]
+    return np.full((rows, words) if name == 'features' else rows, fill, dtype)
+
+
+def _row(vehicle):
+    """Valores de uma linha, na ordem de COLUMNS (features ainda como int)"""
+    vehicle_id = vehicle['id']
+    return (
+        vehicle_id if vehicle_id.__class__ is int else -1,
+        True,
+        to_timestamp(vehicle.get('createdAt')),
+        *(to_number(vehicle.get(field)) for field in NUMERIC_FIELDS),
+        *(_code(vehicle, field) for field in CODED_FIELDS),
+        dictionary.vehicle_mask(vehicle),
+    )
+
+
+class ColumnStore:
+    """Colunas de um snapshot; nunca alteradas depois de publicadas"""
+
+    __slots__ = ('rows', 'free', 'size', 'words', 'chunks', '_arrays', '_owned')
+
+    def __init__(self, rows, free, size, words, chunks, arrays=None):
+        self.rows = rows
+        self.free = free
+        self.size = size
+        self.words = words
+        # nome -> lista de blocos de CHUNK_ROWS linhas
+        self.chunks = chunks
+        # nome -> coluna contígua (array()), montada na primeira leitura
+        self._arrays = arrays or {}
+        # blocos já copiados por este store durante updated()
+        self._owned = None
+
+    @classmethod
+    def build(cls, vehicles):
+        rows = {}
+        values = []
+        for vehicle in vehicles:
+            vehicle_id = vehicle['id']
+            if vehicle_id in rows:
+                values[rows[vehicle_id]] = _row(vehicle)
+            else:
+                rows[vehicle_id] = len(values)
+                values.append(_row(vehicle))
+        size = len(values)
+        columns = list(zip(*values)) if values else [()] * len(COLUMNS)
+        words = _words(max(columns[-1], default=0))
+        columns[-1] = [_split(mask, words) for mask in columns[-1]]
+        capacity = max(-(-size // CHUNK_ROWS), 1) * CHUNK_ROWS
+        chunks, arrays = {}, {}
+        for name, column in zip(COLUMNS, columns):
+            array = _empty(name, capacity, words)
+            if size:
+                array[:size] = column
+            # blocos como views do array único: já contíguo para array()
+            chunks[name] = [array[start:start + CHUNK_ROWS] for start in range(0, capacity, CHUNK_ROWS)]
+            arrays[name] = array[:size]
+        return cls(rows, [], size, words, chunks, arrays)
+
+    def _writable(self, row):
+        """Bloco da linha copiado para este store (ou criado, se a linha é nova)"""
+        index = row // CHUNK_ROWS
+        if index >= len(self.chunks['id']):
+            for name, chunks in self.chunks.items():
+                chunks.append(_empty(name, CHUNK_ROWS, self.words))
+            self._owned.add(index)
+        elif index not in self._owned:
+            for chunks in self.chunks.values():
+                chunks[index] = chunks[index].copy()
+            self._owned.add(index)
+        return index, row - index * CHUNK_ROWS
+
+    def _widen(self, words):
+        """Mais palavras de opcionais (copia a coluna inteira; só quando o dicionário cresce)"""
+        widened = []
+        for chunk in self.chunks['features']:
+            wider = _empty('features', CHUNK_ROWS, words)
+            wider[:, :self.words] = chunk
+            widened.append(wider)
+        self.chunks['features'] = widened
+        self.words = words
+
+    def _put(self, vehicle):
+        vehicle_id = vehicle['id']
+        row = self.rows.get(vehicle_id)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = self.size
+                self.size += 1
+            self.rows[vehicle_id] = row
+        values = _row(vehicle)
+        if _words(values[-1]) > self.words:
+            self._widen(_words(values[-1]))
+        index, offset = self._writable(row)
+        for chunks, value in zip(self.chunks.values(), values[:-1]):
+            chunks[index][offset] = value
+        self.chunks['features'][index][offset] = _split(values[-1], self.words)
+
+    def _delete(self, vehicle_id):
+        row = self.rows.pop(vehicle_id, None)
+        if row is not None:
+            index, offset = self._writable(row)
+            self.chunks['live'][index][offset] = False
+            self.free.append(row)
+
+    def updated(self, upserts, deletes):
+        """Store do próximo snapshot: {id: veículo} gravados e ids excluídos"""
+        if not upserts and not deletes:
+            return self
+        store = ColumnStore(dict(self.rows), list(self.free), self.size, self.words,
+                            {name: list(chunks) for name, chunks in self.chunks.items()})
+        store._owned = set()
+        for vehicle_id in deletes:
+            store._delete(vehicle_id)
+        for vehicle in upserts.values():
+            store._put(vehicle)
+        store._owned = None
+        return store
+
+    def __len__(self):
+        return len(self.rows)
+
+    def array(self, name):
+        """Coluna inteira (linhas 0..size-1, inclusive as excluídas), contígua"""
+        array = self._arrays.get(name)
+        if array is None:
+            chunks = self.chunks[name][:max(-(-self.size // CHUNK_ROWS), 1)]
+            array = self._arrays[name] = np.concatenate(chunks)[:self.size]
+        return array
+
+    def take(self, name, rows):
+        """Valores de algumas linhas, sem montar a coluna inteira"""
+        chunks = self.chunks[name]
+        return np.array([chunks[row // CHUNK_ROWS][row % CHUNK_ROWS] for row in rows],
+                        dtype=COLUMNS[name][0]).reshape((len(rows), self.words) if name == 'features' else len(rows))
+
+    def column(self, name):
+        """Valores das linhas vivas (campo numérico, código ou 'createdAt')"""
+        return self.array(name)[self.array('live')]
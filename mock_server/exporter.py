@@ -0,0 +1,177 @@
+"""
+Exportação do catálogo em NDJSON, CSV ou XLSX (mesmos cabeçalhos do modelo
+de importação, para que um export possa ser reimportado), opcionalmente
+empacotada em ZIP com as mídias no layout Mídia/<ID>/Fotos, Vídeos e Laudo.
+
+Tudo é gerado sob demanda: cada veículo é serializado e enviado antes do
+próximo, e o ZIP é escrito em um stream não-seekable drenado a cada bloco.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+
+from .features import dictionary
+from .records import json_default
+from .vehicle_schema import (
+    VEHICLE_COLUMNS,
+    VEHICLE_IMPORT_HEADERS,
+    format_bool,
+    format_mileage,
+    format_price,
+)
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+CHUNK_SIZE = 64 * 1024
+MEDIA_FOLDER_NAMES = {"photos": "Fotos", "videos": "Vídeos", "inspection": "Laudo"}
+
+
+def export_id(vehicle):
+    """ID usado na coluna "ID" e nas pastas Mídia/<ID>/ ("#00012" -> "00012")"""
+    code = str(vehicle.get('vehicleId') or '').lstrip('#')
+    return code or str(vehicle.get('id', ''))
+
+
+def vehicle_to_row(vehicle):
+    """Converte o veículo em uma linha da planilha, na ordem de VEHICLE_IMPORT_HEADERS"""
+    # Opcionais comparados pelo dicionário canônico ("Direção elétrica" marca a coluna da direção)
+    features = dictionary.vehicle_mask(vehicle)
+    row = []
+    for column in VEHICLE_COLUMNS:
+        if column.field == 'importId':
+            row.append(export_id(vehicle))
+        elif column.kind == 'feature':
+            row.append(format_bool(bool(features >> dictionary.lookup(column.field) & 1)))
+        elif column.kind == 'bool':
+            row.append(format_bool(vehicle.get(column.field, False)))
+        elif column.kind == 'price':
+            row.append(format_price(vehicle.get('price')))
+        elif column.kind == 'km':
+            row.append(format_mileage(vehicle.get('mileage')))
+        else:
+            value = vehicle.get(column.field)
+            row.append('' if value is None else str(value))
+    return row
+
+
+def iter_ndjson(vehicles):
+    for vehicle in vehicles:
+        yield (json.dumps(vehicle, ensure_ascii=False, default=json_default) + '\n').encode('utf-8')
+
+
+def iter_csv(vehicles):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(VEHICLE_IMPORT_HEADERS)
+    for vehicle in vehicles:
+        writer.writerow(vehicle_to_row(vehicle))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_xlsx(vehicles):
+    """
+    Workbook write-only: as linhas vão para um arquivo temporário conforme são
+    adicionadas (memória constante); o arquivo final é enviado em blocos.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Veículos")
+    worksheet.append(VEHICLE_IMPORT_HEADERS)
+    for vehicle in vehicles:
+        worksheet.append(vehicle_to_row(vehicle))
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_export(vehicles, fmt):
+    if fmt == 'ndjson':
+        return iter_ndjson(vehicles)
+    if fmt == 'csv':
+        return iter_csv(vehicles)
+    return iter_xlsx(vehicles)
+
+
+class _StreamSink:
+    """Destino não-seekable para o ZipFile; os bytes escritos são drenados pelo gerador"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _drain(sink):
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _media_entries(vehicle, uploads_dir):
+    """(caminho local, nome no ZIP) das mídias do veículo que existem em uploads/"""
+    media = vehicle.get('media') or {}
+    folder = f"Mídia/{export_id(vehicle)}"
+    for kind in ('photos', 'videos', 'inspection'):
+        urls = media.get(kind) or []
+        if isinstance(urls, str):
+            urls = [urls]
+        for url in urls:
+            filename = os.path.basename(str(url))
+            path = os.path.join(uploads_dir, filename)
+            if filename and os.path.isfile(path):
+                yield path, f"{folder}/{MEDIA_FOLDER_NAMES[kind]}/{filename}"
+
+
+def iter_zip(vehicles, fmt, uploads_dir, data_name):
+    """ZIP em streaming: arquivo de dados + mídias em Mídia/<ID>/... (vehicles é percorrido duas vezes)"""
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        info = zipfile.ZipInfo(data_name, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, 'w', force_zip64=True) as dest:
+            for chunk in iter_export(vehicles, fmt):
+                dest.write(chunk)
+                yield from _drain(sink)
+
+        for vehicle in vehicles:
+            for path, arcname in _media_entries(vehicle, uploads_dir):
+                # Fotos/vídeos já são comprimidos: ZIP_STORED
+                info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with open(path, 'rb') as src, archive.open(info, 'w', force_zip64=True) as dest:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        yield from _drain(sink)
+    yield from _drain(sink)
@@ -0,0 +1,222 @@
+"""
+Dicionário canônico dos opcionais (optionalFeatures) e índice em bitsets.
+
+Os rótulos variam entre os dados, o seed e o modelo Excel ("Direção
+hidráulica (ou elétrica)", "Direção elétrica", "Direção Hidráulica/Elétrica").
+normalize() reduz cada variante a uma chave (sem acentos, caixa, plurais e
+preposições) e ALIASES cobre o que a normalização não resolve; cada opcional
+canônico ocupa um bit. Rótulos fora do dicionário ganham bits novos na
+primeira vez que aparecem, até MAX_BITS: o dicionário é global e só cresce,
+e cada bit custa um bitmap e uma coluna no column store. Rótulos que chegam
+com o dicionário cheio são guardados no veículo, mas não são indexados (a
+busca por eles não encontra nada).
+
+FeatureIndex guarda, por bit, um bitmap (int) com os ids dos veículos que
+têm o opcional: "tem A e B e C" é o AND de três ints. O índice acompanha os
+snapshots do catálogo e é atualizado só com os veículos alterados.
+"""
+
+import logging
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from . import records
+from .vehicle_schema import VEHICLE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Bits do dicionário (4 palavras de 64 no column store); os do modelo Excel vêm primeiro
+MAX_BITS = 256
+
+FEATURE_COLUMNS = [column for column in VEHICLE_COLUMNS if column.kind == 'feature']
+
+# Rótulos canônicos: os gravados pelo VehicleForm (= campo das colunas do modelo)
+CANONICAL_FEATURES = [column.field for column in FEATURE_COLUMNS]
+
+# Variantes que a normalização não aproxima do rótulo canônico
+ALIASES = {
+    "Direção elétrica": "Direção hidráulica (ou elétrica)",
+    "Direção hidráulica": "Direção hidráulica (ou elétrica)",
+    "Freios ABS": "ABS",
+    "Retrovisores retráteis": "Retrovisor retrátil",
+}
+
+_STOPWORDS = {'a', 'o', 'e', 'de', 'da', 'do', 'das', 'dos', 'no', 'na', 'nos', 'nas', 'ou', 'com'}
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith(('res', 'zes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def normalize(label):
+    """Chave de comparação: "Câmera de Ré" e "câmera de ré" -> "camera re" """
+    text = unicodedata.normalize('NFKD', str(label)).encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(_singular(word) for word in re.findall(r'[a-z0-9]+', text) if word not in _STOPWORDS)
+
+
+class FeatureDictionary:
+    """Rótulo (qualquer variante) -> bit; bit -> rótulo canônico"""
+
+    def __init__(self, limit=MAX_BITS):
+        self.limit = limit
+        self.full = False
+        self.labels = []
+        self._bits = {}
+        self._code_bits = []
+        self._lock = threading.Lock()
+        self._code_lock = threading.Lock()
+        for label in CANONICAL_FEATURES:
+            self.bit(label)
+        for column in FEATURE_COLUMNS:
+            self._bits.setdefault(normalize(column.header), self._bits[normalize(column.field)])
+        for alias, label in ALIASES.items():
+            self._bits[normalize(alias)] = self._bits[normalize(label)]
+
+    def lookup(self, label):
+        """Bit de um rótulo conhecido (None se nunca apareceu)"""
+        return self._bits.get(normalize(label))
+
+    def bit(self, label):
+        """Bit do rótulo, criando um novo para opcionais fora do dicionário (None se ele está cheio)"""
+        key = normalize(label)
+        bit = self._bits.get(key)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.get(key)
+                if bit is None:
+                    if len(self.labels) >= self.limit:
+                        if not self.full:
+                            self.full = True
+                            logger.warning("Dicionário de opcionais cheio (%d): rótulos novos não são indexados",
+                                           self.limit)
+                        return None
+                    bit = len(self.labels)
+                    self.labels.append(str(label).strip())
+                    self._bits[key] = bit
+        return bit
+
+    def canonical(self, label):
+        bit = self.bit(label)
+        return str(label).strip() if bit is None else self.labels[bit]
+
+    def _bit_for_code(self, code):
+        # cache código do vocabulário de records -> bit (normalize() só uma vez por rótulo)
+        bits = self._code_bits
+        if code >= len(bits):
+            with self._code_lock:
+                while len(bits) <= code:
+                    bits.append(self.bit(records.features.values[len(bits)]))
+        return bits[code]
+
+    def vehicle_bits(self, vehicle):
+        """Bits dos opcionais de um veículo (record ou dict)"""
+        raw = vehicle.raw('optionalFeatures') if isinstance(vehicle, records.VehicleRecord) else None
+        if raw.__class__ is tuple:
+            bits = self._code_bits
+            found = [bits[code] if code < len(bits) else self._bit_for_code(code) for code in raw]
+        else:
+            labels = vehicle.get('optionalFeatures') or []
+            if isinstance(labels, str):
+                labels = [labels]
+            found = [self.bit(label) for label in labels if isinstance(label, str)]
+        # rótulos que chegaram com o dicionário cheio não têm bit
+        return found if None not in found else [bit for bit in found if bit is not None]
+
+    def vehicle_mask(self, vehicle):
+        """Bitmask dos opcionais de um veículo"""
+        mask = 0
+        for bit in self.vehicle_bits(vehicle):
+            mask |= 1 << bit
+        return mask
+
+    def query_mask(self, labels):
+        """Bitmask de uma busca; None se algum opcional pedido não está no dicionário"""
+        mask = 0
+        for label in labels:
+            bit = self.lookup(label)
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+
+dictionary = FeatureDictionary()
+
+
+def iter_bits(value):
+    """Posições dos bits ligados, em ordem crescente"""
+    bits = bin(value)[:1:-1]
+    position = bits.find('1')
+    while position >= 0:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+def _bitmap(positions):
+    data = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, 'little')
+
+
+def _indexable(vehicle_id):
+    # bitmaps são indexados pelo id; ids fora do padrão (não inteiros) ficam de fora
+    return vehicle_id.__class__ is int and vehicle_id >= 0
+
+
+class FeatureIndex:
+    """Bitmaps por opcional sobre os ids dos veículos de um snapshot (imutável)"""
+
+    __slots__ = ('bitmaps',)
+
+    def __init__(self, bitmaps):
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def build(cls, vehicles):
+        ids_by_bit = defaultdict(list)
+        for vehicle in vehicles:
+            vehicle_id = vehicle['id']
+            if _indexable(vehicle_id):
+                for bit in dictionary.vehicle_bits(vehicle):
+                    ids_by_bit[bit].append(vehicle_id)
+        return cls({bit: _bitmap(ids) for bit, ids in ids_by_bit.items()})
+
+    def updated(self, changes):
+        """Novo índice aplicando {id: (máscara antiga, máscara nova)}"""
+        added, removed = defaultdict(list), defaultdict(list)
+        for vehicle_id, (old, new) in changes.items():
+            if not _indexable(vehicle_id):
+                continue
+            for bit in iter_bits(new & ~old):
+                added[bit].append(vehicle_id)
+            for bit in iter_bits(old & ~new):
+                removed[bit].append(vehicle_id)
+        if not added and not removed:
+            return self
+        bitmaps = dict(self.bitmaps)
+        for bit, ids in removed.items():
+            bitmaps[bit] &= ~_bitmap(ids)
+        for bit, ids in added.items():
+            bitmaps[bit] = bitmaps.get(bit, 0) | _bitmap(ids)
+        return FeatureIndex(bitmaps)
+
+    def match(self, mask):
+        """Bitmap dos ids que têm todos os opcionais da máscara (não vazia)"""
+        bits = iter_bits(mask)
+        result = self.bitmaps.get(next(bits), 0)
+        for bit in bits:
+            if not result:
+                break
+            result &= self.bitmaps.get(bit, 0)
+        return result
+
+    def counts(self):
+        """Quantos veículos têm cada opcional (rótulo canônico -> total)"""
+        return {dictionary.labels[bit]: bin(bitmap).count('1') for bit, bitmap in sorted(self.bitmaps.items()) if bitmap}
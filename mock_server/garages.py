@@ -0,0 +1,284 @@
+"""
+Catálogo particionado por garagem (multi-tenant).
+
+Cada veículo pertence a uma garagem (garageId) e cada garagem tem a própria
+partição: um Catalog (mock_server.catalog) com seus snapshots, bitmaps de
+opcionais, column store e caches, além do contador de vehicleId e dos
+arquivos em disco:
+
+    mock_data/vehicles.json, version.json, counter.json, mutations.log
+        garagem padrão (DEFAULT_GARAGE_ID), no layout anterior às partições
+    mock_data/garages/<id>/vehicles.json, version.json, counter.json, mutations.log
+        demais garagens
+
+version.json guarda a versão do catálogo da garagem (mock_server.changes),
+para que ela continue crescendo depois de um restart. Com MOCK_COLD_FIELDS,
+descrições (e media) ficam em cold.blob/cold.zdict no mesmo diretório
+(mock_server.coldstore) e vehicles.json só guarda a referência.
+
+vehicles.json é gravado com um veículo por linha. A partição lembra onde
+cada record está no último arquivo que gravou: uma escrita reserializa só
+os veículos alterados e copia as linhas dos demais.
+
+Uma partição só é lida do disco na primeira requisição que a usa, e
+listagens, filtros, analytics e gravações tocam apenas o inventário da
+garagem (o vehicles.json reescrito a cada escrita é só o dela).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from . import metrics
+from .catalog import Catalog
+from .cluster import InterProcessLock, Journal
+from .coldstore import ColdStore
+from .records import VehicleRecord, cold_refs, load_vehicles, pack, storage_default
+
+DEFAULT_GARAGE_ID = 1
+GARAGES_DIR = 'garages'
+
+
+def parse_garage_id(value):
+    """garageId de token, header ou JSON -> int positivo (None se inválido)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        garage_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return garage_id if garage_id > 0 else None
+
+
+class Partition:
+    """Catálogo de uma garagem e seus arquivos"""
+
+    def __init__(self, garage_id, directory):
+        self.garage_id = garage_id
+        self.directory = directory
+        self.vehicles_file = os.path.join(directory, 'vehicles.json')
+        self.counter_file = os.path.join(directory, 'counter.json')
+        self.version_file = os.path.join(directory, 'version.json')
+        self.journal_file = os.path.join(directory, 'mutations.log')
+        # Sempre aberto, mesmo sem campos configurados: referências já gravadas continuam legíveis
+        self.cold = ColdStore(directory)
+        self.catalog = None
+        # Linhas do último vehicles.json gravado: id -> (record, início, tamanho), e o arquivo (inode, tamanho)
+        self._lines = {}
+        self._written = None
+        # Protege o read-modify-write do counter.json entre threads e workers (--workers)
+        self._counter_lock = None
+
+    def load(self, seed=None, journal=None):
+        """Lê o vehicles.json da garagem (seed grava um catálogo inicial se ele não existe)"""
+        self.cold.recover(self.vehicles_file)
+        appended, inlined = self.cold.appended, self.cold.inlined
+        if os.path.exists(self.vehicles_file):
+            vehicles = self._read_vehicles()
+        else:
+            vehicles = [pack(dict(vehicle, garageId=self.garage_id), self.cold) for vehicle in seed or []]
+        # Valores que foram para o cold.blob (ou voltaram dele): gravar agora, senão a
+        # próxima carga os migraria de novo
+        rewrite = self.cold.appended != appended or self.cold.inlined != inlined
+        compacted = False
+        if journal is None:
+            # Outros processos (--workers) podem ter referências para os offsets atuais
+            refs = list(cold_refs(vehicles))
+            if refs:
+                compacted = self.cold.compact(refs)
+            elif os.path.exists(self.cold.path) and not self.cold.fields:
+                self.cold.remove_files()
+        if vehicles and (rewrite or compacted):
+            self.save(vehicles)
+        if compacted:
+            self.cold.commit_compaction()
+        self.catalog = Catalog(vehicles, self.save, journal, self.garage_id, self._load_version(), self.cold,
+                               reload=self._reload)
+        if journal is not None:
+            self.catalog.resume()
+        return self
+
+    def _read_vehicles(self):
+        with open(self.vehicles_file, 'r', encoding='utf-8') as f:
+            # Representação compacta já na carga: cada veículo é convertido assim que lido
+            return load_vehicles(f, self.garage_id, self.cold)
+
+    def _reload(self):
+        """Veículos e versão gravados no disco (Catalog._reload, sob o lock do journal)"""
+        return self._read_vehicles(), self._load_version()
+
+    def _load_version(self):
+        try:
+            with open(self.version_file, 'r', encoding='utf-8') as f:
+                return int(json.load(f)["version"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+
+    def save(self, vehicles, version=None):
+        os.makedirs(self.directory, exist_ok=True)
+        if version is not None:
+            # Antes do vehicles.json: se a gravação for interrompida, a versão
+            # no disco nunca fica atrás de uma que algum cliente já recebeu
+            with open(self.version_file, 'w', encoding='utf-8') as f:
+                json.dump({"version": version}, f)
+        with metrics.PERSIST_SECONDS.time(('serialize',)):
+            content, lines = self._serialize(vehicles)
+        with metrics.PERSIST_SECONDS.time(('write',)):
+            temporary = self.vehicles_file + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(content)
+            os.replace(temporary, self.vehicles_file)
+            stat = os.stat(self.vehicles_file)
+        self._lines = lines
+        self._written = (stat.st_ino, stat.st_size)
+        metrics.PERSIST_BYTES.inc(len(content))
+
+    def _previous_content(self):
+        """Conteúdo do último vehicles.json gravado por este processo (None se outro o regravou)"""
+        if not self._lines:
+            return None
+        try:
+            with open(self.vehicles_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if (stat.st_ino, stat.st_size) != self._written:
+                    return None
+                return f.read()
+        except OSError:
+            return None
+
+    def _serialize(self, vehicles):
+        """Array JSON com um veículo por linha; records iguais aos da última gravação copiam a linha dela"""
+        previous = self._previous_content()
+        parts = [b'[\n']
+        lines = {}
+        position = 2
+        for vehicle in vehicles:
+            if len(parts) > 1:
+                parts.append(b',\n')
+                position += 2
+            entry = self._lines.get(vehicle['id']) if previous is not None else None
+            if entry is not None and entry[0] is vehicle:
+                line = previous[entry[1]:entry[1] + entry[2]]
+            else:
+                line = json.dumps(vehicle, ensure_ascii=False, default=storage_default).encode('utf-8')
+            if vehicle.__class__ is VehicleRecord:
+                lines[vehicle['id']] = (vehicle, position, len(line))
+            parts.append(line)
+            position += len(line)
+        parts.append(b'\n]\n')
+        return b''.join(parts), lines
+
+    def reserve_codes(self, count):
+        """Reserva `count` vehicleId sequenciais (#00001...) com uma única leitura/escrita do contador"""
+        if self._counter_lock is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._counter_lock = InterProcessLock(self.counter_file + '.lock')
+        with self._counter_lock:
+            if os.path.exists(self.counter_file):
+                with open(self.counter_file, 'r', encoding='utf-8') as f:
+                    counter_data = json.load(f)
+            else:
+                counter_data = {"vehicle_counter": 0}
+
+            first = counter_data["vehicle_counter"] + 1
+            counter_data["vehicle_counter"] += count
+
+            with open(self.counter_file, 'w', encoding='utf-8') as f:
+                json.dump(counter_data, f, ensure_ascii=False, indent=2)
+
+        return [f"#{n:05d}" for n in range(first, first + count)]
+
+
+class GarageCatalogs:
+    """
+    Partições por garagem, carregadas sob demanda. Para o modo --workers
+    (mock_server.cluster) o conjunto se comporta como um catálogo: sync()
+    e write_lock cobrem todas as partições carregadas.
+    """
+
+    def __init__(self, data_dir, seed=None):
+        self.data_dir = data_dir
+        # catálogo inicial da garagem padrão quando não há vehicles.json
+        self.seed = seed
+        self._partitions = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._journals = False
+
+    def directory(self, garage_id):
+        if garage_id == DEFAULT_GARAGE_ID:
+            return self.data_dir
+        return os.path.join(self.data_dir, GARAGES_DIR, str(garage_id))
+
+    def get(self, garage_id):
+        """Partição da garagem, lida do disco no primeiro acesso (garagens novas começam vazias)"""
+        partition = self._partitions.get(garage_id)
+        if partition is not None:
+            return partition
+        with self._lock:
+            loading = self._loading.setdefault(garage_id, threading.Lock())
+        # Um lock por garagem: a carga de uma partição grande não atrasa as outras
+        with loading:
+            partition = self._partitions.get(garage_id)
+            if partition is None:
+                partition = self._load(garage_id)
+                with self._lock:
+                    self._partitions[garage_id] = partition
+                    self._loading.pop(garage_id, None)
+        return partition
+
+    def _load(self, garage_id):
+        start = time.perf_counter()
+        partition = Partition(garage_id, self.directory(garage_id))
+        seed = self.seed if garage_id == DEFAULT_GARAGE_ID else None
+        if self._journals:
+            # Sob o lock do journal: o vehicles.json lido já contém tudo o que está no journal
+            os.makedirs(partition.directory, exist_ok=True)
+            journal = Journal(partition.journal_file)
+            with journal.lock:
+                partition.load(seed, journal)
+        else:
+            partition.load(seed)
+        metrics.PARTITION_LOAD_SECONDS.observe(time.perf_counter() - start)
+        return partition
+
+    def loaded(self):
+        """Partições já carregadas neste processo"""
+        return list(self._partitions.values())
+
+    def enable_journals(self):
+        """
+        Passa a compartilhar as escritas entre processos (--workers): trunca
+        os journals de todas as garagens em disco (chamar no mestre, antes do fork)
+        """
+        with self._lock:
+            self._journals = True
+            directories = {DEFAULT_GARAGE_ID: self.data_dir}
+            garages_dir = os.path.join(self.data_dir, GARAGES_DIR)
+            if os.path.isdir(garages_dir):
+                for name in os.listdir(garages_dir):
+                    garage_id = parse_garage_id(name)
+                    if garage_id is not None and str(garage_id) == name:
+                        directories[garage_id] = os.path.join(garages_dir, name)
+            for garage_id, directory in directories.items():
+                journal = Journal(os.path.join(directory, 'mutations.log'))
+                journal.reset()
+                partition = self._partitions.get(garage_id)
+                if partition is not None:
+                    partition.catalog.attach_journal(journal)
+
+    def sync(self):
+        for partition in self.loaded():
+            partition.catalog.sync()
+
+    @property
+    @contextmanager
+    def write_lock(self):
+        """Nenhuma partição carregada ou gravada enquanto o bloco roda (fork consistente)"""
+        with ExitStack() as stack:
+            stack.enter_context(self._lock)
+            for garage_id in sorted(self._partitions):
+                stack.enter_context(self._partitions[garage_id].catalog.write_lock)
+            yield
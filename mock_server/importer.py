@@ -0,0 +1,339 @@
+"""
+Importação em massa de veículos: planilha "Veículos" do modelo Excel
+(create_excel_model.py) + ZIP opcional com Mídia/<ID>/Fotos, Vídeos e Laudo.
+
+A planilha é lida em modo read-only, linha a linha, sem carregar o workbook
+inteiro. O ZIP é apenas indexado pelo diretório central; cada mídia é copiada
+em streaming para uploads/ quando o lote do veículo dela é gravado. Cada lote
+é publicado em uma versão própria do catálogo: a memória não cresce com o
+tamanho da planilha e uma importação interrompida mantém os lotes já
+gravados (o progresso informa quantos).
+"""
+
+import io
+import os
+import shutil
+import unicodedata
+import uuid
+import zipfile
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from .vehicle_schema import (
+    PARSERS,
+    VEHICLE_COLUMNS,
+    is_blank,
+    parse_text,
+)
+
+SHEET_NAME = "Veículos"
+DEFAULT_BATCH_SIZE = 500
+COPY_CHUNK_SIZE = 1024 * 1024
+
+MEDIA_ROOTS = {"midia", "midias"}
+MEDIA_FOLDERS = {"fotos": "photos", "videos": "videos", "laudo": "inspection", "laudos": "inspection"}
+MEDIA_PREFIXES = {"photos": "photo", "videos": "video", "inspection": "inspection"}
+MEDIA_DEFAULT_EXT = {"photos": "jpg", "videos": "mp4", "inspection": "pdf"}
+
+
+class ImportFileError(Exception):
+    """Planilha ou ZIP ilegível / fora do modelo de importação"""
+
+
+def _strip_accents(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def detach_upload(stream):
+    """
+    Arquivo recebido que continua legível depois do fim da requisição (o
+    Flask fecha os arquivos dela antes de uma resposta em streaming terminar
+    de lê-los): descritor duplicado do arquivo temporário ou cópia em memória.
+    """
+    try:
+        fd = os.dup(stream.fileno())
+    except (OSError, ValueError):
+        stream.seek(0)
+        return io.BytesIO(stream.read())
+    detached = os.fdopen(fd, 'rb')
+    detached.seek(0)
+    return detached
+
+
+def media_key(import_id):
+    """Chave usada para casar o ID da planilha com a pasta do ZIP ("001" == "1")"""
+    text = parse_text(import_id)
+    return text.lstrip('0') or text
+
+
+class WorkbookReader:
+    """Leitura streaming da sheet "Veículos" (openpyxl read-only)"""
+
+    def __init__(self, fileobj, schema=VEHICLE_COLUMNS):
+        self.schema = schema
+        try:
+            self.workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as e:
+            raise ImportFileError(f"Planilha inválida: {e}")
+
+        if SHEET_NAME in self.workbook.sheetnames:
+            worksheet = self.workbook[SHEET_NAME]
+        else:
+            worksheet = self.workbook.worksheets[0]
+
+        self._rows = worksheet.iter_rows(values_only=True)
+        header_row = next(self._rows, None)
+        if header_row is None:
+            self.close()
+            raise ImportFileError("Planilha vazia")
+
+        headers = [parse_text(h) for h in header_row]
+        missing = [c.header for c in schema if c.required and c.header not in headers]
+        if missing:
+            self.close()
+            raise ImportFileError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+
+        known_headers = {column.header for column in schema}
+        self.positions = [(i, h) for i, h in enumerate(headers) if h in known_headers]
+
+    def rows(self):
+        """Itera (número da linha, {cabeçalho: valor}) ignorando linhas vazias"""
+        for row_number, values in enumerate(self._rows, 2):
+            if not values or all(is_blank(v) for v in values):
+                continue
+            yield row_number, {
+                header: values[i] if i < len(values) else None
+                for i, header in self.positions
+            }
+
+    def close(self):
+        self.workbook.close()
+
+
+class MediaArchive:
+    """Índice das mídias do ZIP por ID da planilha, com extração sob demanda"""
+
+    def __init__(self, fileobj):
+        try:
+            self.zip = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile:
+            raise ImportFileError("ZIP de mídias inválido")
+
+        self.entries = {}
+        self.matched = set()
+        for info in self.zip.infolist():
+            if info.is_dir():
+                continue
+            located = self._locate(info)
+            if located:
+                key, kind = located
+                self.entries.setdefault(key, {}).setdefault(kind, []).append(info)
+
+        for kinds in self.entries.values():
+            for infos in kinds.values():
+                infos.sort(key=lambda info: info.filename)
+
+    @staticmethod
+    def _locate(info):
+        """Retorna (chave do ID, tipo de mídia) para entradas Mídia/<ID>/<Pasta>/<arquivo>"""
+        name = info.filename
+        if not info.flag_bits & 0x800:
+            # Nome sem flag UTF-8: o zipfile decodificou como cp437
+            try:
+                name = name.encode('cp437').decode('utf-8')
+            except (UnicodeEncodeError, UnicodeDecodeError):
+                pass
+
+        parts = [unicodedata.normalize('NFC', p) for p in name.replace('\\', '/').split('/') if p]
+        if '__MACOSX' in parts or parts[-1].startswith('.'):
+            return None
+
+        for i, part in enumerate(parts[:-3]):
+            if _strip_accents(part) in MEDIA_ROOTS:
+                kind = MEDIA_FOLDERS.get(_strip_accents(parts[i + 2]))
+                if kind:
+                    return media_key(parts[i + 1]), kind
+        return None
+
+    def extract(self, import_id, vehicle_id, uploads_dir):
+        """Copia as mídias do veículo para uploads/ e retorna o dict "media" """
+        media = {"photos": [], "videos": [], "inspection": None}
+        key = media_key(import_id)
+        kinds = self.entries.get(key)
+        if not kinds:
+            return media
+        self.matched.add(key)
+
+        written = []
+        try:
+            for kind, infos in kinds.items():
+                if kind == 'inspection':
+                    infos = infos[:1]
+                for i, info in enumerate(infos):
+                    basename = info.filename.rsplit('/', 1)[-1]
+                    file_ext = basename.split('.')[-1].lower() if '.' in basename else MEDIA_DEFAULT_EXT[kind]
+                    if kind == 'inspection':
+                        filename = f"inspection_{vehicle_id}_{uuid.uuid4().hex[:8]}.{file_ext}"
+                    else:
+                        filename = f"{MEDIA_PREFIXES[kind]}_{vehicle_id}_{i}_{uuid.uuid4().hex[:8]}.{file_ext}"
+
+                    written.append(f"/uploads/{filename}")
+                    with self.zip.open(info) as src, open(os.path.join(uploads_dir, filename), 'wb') as dst:
+                        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+                    if kind == 'inspection':
+                        media['inspection'] = f"/uploads/{filename}"
+                    else:
+                        media[kind].append(f"/uploads/{filename}")
+        except BaseException:
+            # ZIP corrompido, disco cheio...: não deixar arquivos parciais em uploads/
+            remove_files(written, uploads_dir)
+            raise
+        return media
+
+    def unmatched_ids(self):
+        return sorted(set(self.entries) - self.matched)
+
+    def close(self):
+        self.zip.close()
+
+
+def remove_files(urls, uploads_dir):
+    """Apaga de uploads/ os arquivos /uploads/<nome> (os que não existem são ignorados)"""
+    for url in urls:
+        try:
+            os.remove(os.path.join(uploads_dir, url.rsplit('/', 1)[-1]))
+        except OSError:
+            pass
+
+
+def media_files(media):
+    """URLs /uploads/... de um dict "media" """
+    files = list(media.get('photos') or []) + list(media.get('videos') or [])
+    if media.get('inspection'):
+        files.append(media['inspection'])
+    return files
+
+
+def parse_row(values, schema=VEHICLE_COLUMNS):
+    """Converte uma linha da planilha nos campos do veículo; retorna (campos, erros)"""
+    fields = {"optionalFeatures": []}
+    errors = []
+
+    for column in schema:
+        if column.header not in values:
+            continue
+        raw = values[column.header]
+        if is_blank(raw):
+            if column.required:
+                errors.append(f"{column.header}: campo obrigatório")
+            continue
+        try:
+            value = PARSERS[column.kind](raw)
+        except (TypeError, ValueError):
+            errors.append(f"{column.header}: valor inválido '{raw}'")
+            continue
+        if column.strict and value not in column.options:
+            errors.append(f"{column.header}: use {', '.join(column.options)}")
+            continue
+
+        if column.kind == 'feature':
+            if value:
+                fields['optionalFeatures'].append(column.field)
+        else:
+            fields[column.field] = value
+
+    return fields, errors
+
+
+def build_vehicle(fields, vehicle_id, vehicle_code, media):
+    """Monta o veículo no mesmo formato gerado por create_vehicle"""
+    vehicle = {
+        "id": vehicle_id,
+        "vehicleId": vehicle_code,
+        "category": fields.get('category', 'Carro'),
+        "brand": fields.get('brand', ''),
+        "model": fields.get('model', ''),
+        "licensePlate": fields.get('licensePlate', ''),
+        "modelYear": fields.get('modelYear', fields.get('year', 2024)),
+        "year": fields.get('year', 2024),
+        "price": fields.get('price', 0),
+        "mileage": fields.get('mileage', 0),
+        "color": fields.get('color', ''),
+        "bodyType": fields.get('bodyType', ''),
+        "doors": fields.get('doors', 4),
+        "transmission": fields.get('transmission', ''),
+        "steering": fields.get('steering', ''),
+        "fuel": fields.get('fuel', ''),
+        "optionalFeatures": fields.get('optionalFeatures', []),
+        "armored": fields.get('armored', False),
+        "auction": fields.get('auction', False),
+        "ipvaPaid": fields.get('ipvaPaid', False),
+        "licensingUpToDate": fields.get('licensingUpToDate', False),
+        "status": fields.get('status', 'Disponível'),
+        "description": fields.get('description', ''),
+        "media": media,
+        "createdAt": datetime.now().isoformat()
+    }
+    if fields.get('engine'):
+        vehicle['engine'] = fields['engine']
+    return vehicle
+
+
+def import_vehicles(reader, existing_plates, commit, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Valida as linhas em lotes e entrega cada lote válido a commit(lista de
+    (número da linha, campos)), que grava o lote e retorna os erros das
+    linhas que não puderam ser gravadas (ex.: placa cadastrada nesse meio tempo).
+
+    Gera eventos de progresso ({"event": "progress", ...}) a cada lote e um
+    evento final {"event": "done", ...} com os erros por linha; "imported"
+    conta só veículos já gravados.
+    """
+    plates = {p.strip().upper() for p in existing_plates if p}
+    import_ids = set()
+    errors = []
+    batch = []
+    processed = imported = 0
+
+    def flush():
+        nonlocal imported, batch
+        if batch:
+            rejected = commit(batch) or []
+            errors.extend(rejected)
+            imported += len(batch) - len(rejected)
+            batch = []
+        return {"event": "progress", "processed": processed, "imported": imported, "errors": len(errors)}
+
+    for row_number, values in reader.rows():
+        processed += 1
+        fields, row_errors = parse_row(values, reader.schema)
+
+        import_id = fields.get('importId', '')
+        if import_id:
+            if media_key(import_id) in import_ids:
+                row_errors.append(f"ID: '{import_id}' repetido na planilha")
+            import_ids.add(media_key(import_id))
+
+        plate = fields.get('licensePlate', '').upper()
+        if plate:
+            if plate in plates:
+                row_errors.append(f"Placa: já existe um veículo com a placa {fields['licensePlate']}")
+            plates.add(plate)
+
+        if row_errors:
+            errors.append({"row": row_number, "id": import_id, "errors": row_errors})
+        else:
+            batch.append((row_number, fields))
+
+        if processed % batch_size == 0:
+            yield flush()
+
+    if processed % batch_size or not processed:
+        yield flush()
+
+    # Erros de gravação de um lote chegam depois dos de validação das linhas seguintes
+    errors.sort(key=lambda error: error['row'])
+    yield {"event": "done", "processed": processed, "imported": imported, "errors": errors}
@@ -0,0 +1,167 @@
+"""
+Logging do mock server: níveis, saída texto ou JSON e escrita assíncrona.
+
+Os handlers só enfileiram o LogRecord (QueueHandler); formatação, redação
+e escrita acontecem na thread do QueueListener. Payloads devem ser
+passados embrulhados em Payload(...) como argumento do log, nunca
+interpolados na mensagem: assim a thread da requisição só aloca o
+wrapper e o resumo (limitado em tamanho) é montado depois.
+
+Configuração por variáveis de ambiente:
+    MOCK_LOG_LEVEL   DEBUG, INFO (padrão), WARNING, ERROR
+    MOCK_LOG_FORMAT  text (padrão) ou json
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+MAX_MESSAGE_LENGTH = 2000
+MAX_STRING_LENGTH = 200
+MAX_ITEMS = 20
+MAX_DEPTH = 4
+QUEUE_SIZE = 10000
+
+REDACTED_KEYS = {'password', 'senha', 'token', 'sharetoken', 'authorization', 'secret', 'jwt'}
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+
+
+def summarize(value, depth=0):
+    """Cópia resumida de um payload: segredos ocultos, base64 e textos longos encurtados"""
+    if isinstance(value, dict):
+        if depth >= MAX_DEPTH:
+            return f"<{len(value)} chaves>"
+        result = {}
+        for i, (key, item) in enumerate(value.items()):
+            if i >= MAX_ITEMS:
+                result['…'] = f"+{len(value) - MAX_ITEMS} chaves"
+                break
+            result[key] = '***' if str(key).lower() in REDACTED_KEYS else summarize(item, depth + 1)
+        return result
+    if isinstance(value, (list, tuple)):
+        if depth >= MAX_DEPTH:
+            return f"<{len(value)} itens>"
+        result = [summarize(item, depth + 1) for item in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            result.append(f"… +{len(value) - MAX_ITEMS} itens")
+        return result
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str):
+        if value.startswith('data:') and ';base64,' in value[:100]:
+            return f"<base64 {len(value)} caracteres>"
+        if len(value) > MAX_STRING_LENGTH:
+            return f"{value[:MAX_STRING_LENGTH]}… (+{len(value) - MAX_STRING_LENGTH})"
+    return value
+
+
+class Payload:
+    """Argumento de log preguiçoso: o resumo só é montado na thread do listener"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(summarize(self.value), ensure_ascii=False, default=str)
+
+
+def _truncate(message):
+    if len(message) > MAX_MESSAGE_LENGTH:
+        return f"{message[:MAX_MESSAGE_LENGTH]}… (+{len(message) - MAX_MESSAGE_LENGTH} caracteres)"
+    return message
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def formatMessage(self, record):
+        record.message = _truncate(record.message)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro; campos passados em extra={...} entram no objeto"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _truncate(record.getMessage()),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = summarize(value)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _AsyncHandler(QueueHandler):
+    """Enfileira o registro sem formatar; descarta (e conta) se a fila estiver cheia"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _start_listener():
+    global _listener
+    output = logging.StreamHandler(sys.stdout)
+    json_format = os.environ.get('MOCK_LOG_FORMAT', 'text').lower() == 'json'
+    output.setFormatter(JsonFormatter() if json_format else TextFormatter())
+    _queue_handler.queue = queue.Queue(QUEUE_SIZE)
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def configure_logging(level=None):
+    """Instala o handler assíncrono no logger raiz (idempotente)"""
+    global _queue_handler
+    level = (level or os.environ.get('MOCK_LOG_LEVEL') or 'INFO').upper()
+    root = logging.getLogger()
+    root.setLevel(level)
+    # o werkzeug fixa INFO no próprio logger (logs de acesso) se não houver nível definido
+    logging.getLogger('werkzeug').setLevel(level)
+    if _queue_handler is None:
+        _queue_handler = _AsyncHandler(queue.Queue(QUEUE_SIZE))
+        root.addHandler(_queue_handler)
+        _start_listener()
+        atexit.register(shutdown_logging)
+        # A thread do listener não sobrevive ao fork dos workers (--workers)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_start_listener)
+    return logging.getLogger('mock_server')
+
+
+def dropped_records():
+    """Registros descartados por fila cheia desde o início do processo"""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+def shutdown_logging():
+    """Esvazia a fila e para o listener (chamar no encerramento)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,353 @@
+"""
+Métricas em formato texto do Prometheus (GET /metrics), sem dependências.
+
+Cada observação é um bisect na lista de limites e dois incrementos no
+shard da thread atual, sem lock (< 1 µs), então a instrumentação pode
+ficar sempre ligada. Séries são criadas na primeira observação de cada combinação de
+labels; rotas são registradas pelo template (/api/vehicles/<int:vehicle_id>)
+para manter a cardinalidade fixa.
+
+Com --workers cada processo tem as próprias métricas: o scrape mostra os
+valores do worker que atendeu.
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from flask.json.provider import DefaultJSONProvider
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Base das métricas: cada thread grava no próprio shard (sem lock no
+    caminho quente); a leitura soma os shards e consolida os de threads
+    já encerradas.
+    """
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._merged = {}
+
+    def _new_shard(self):
+        shard = self._local.series = {}
+        with self._lock:
+            # Servidores com uma thread por requisição: sem consolidar aqui, os
+            # shards cresceriam até alguém ler /metrics
+            self._compact()
+            self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _add(self, target, labels, value):
+        target[labels] = target.get(labels, 0) + value
+
+    def _compact(self):
+        """Soma os shards de threads encerradas em _merged (chamar com _lock adquirido)"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for labels, value in shard.items():
+                    self._add(self._merged, labels, value)
+        self._shards = alive
+
+    def _items(self):
+        with self._lock:
+            self._compact()
+            totals = {}
+            for labels, value in self._merged.items():
+                self._add(totals, labels, value)
+            for _, shard in self._shards:
+                for labels, value in list(shard.items()):
+                    self._add(totals, labels, value)
+        return sorted(totals.items())
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        lines = self._header()
+        for labels, value in self._items():
+            lines.append(f'{self.name}{_label_text(self.labels, labels)} {_number(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, labels=()):
+        try:
+            shard = self._local.series
+        except AttributeError:
+            shard = self._new_shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    """
+    Gauge com inc/dec ou calculado na leitura (function); com labels, a
+    function devolve {tupla de valores dos labels: valor}.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), function=None):
+        super().__init__(name, help_text, labels)
+        self.function = function
+
+    def dec(self, amount=1, labels=()):
+        self.inc(-amount, labels)
+
+    def _items(self):
+        if not self.function:
+            return super()._items()
+        return sorted(self.function().items()) if self.labels else [((), self.function())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.bounds = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        # série: [contagem por bucket..., contagem acima do último, soma]
+        try:
+            series = self._local.series[labels]
+        except (AttributeError, KeyError):
+            series = self._new_series(labels)
+        series[bisect_left(self.bounds, value)] += 1
+        series[-1] += value
+
+    def _new_series(self, labels):
+        try:
+            shard = self._local.series
+        except AttributeError:
+            shard = self._new_shard()
+        return shard.setdefault(labels, [0] * (len(self.bounds) + 2))
+
+    def _add(self, target, labels, value):
+        current = target.get(labels)
+        if current is None:
+            target[labels] = list(value)
+        else:
+            for i, count in enumerate(value):
+                current[i] += count
+
+    def time(self, labels=()):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = self._header()
+        for labels, series in self._items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{_number(float(bound)) if bound != float("inf") else "+Inf"}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}')
+            label_text = _label_text(self.labels, labels)
+            lines.append(f'{self.name}_sum{label_text} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.start, self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'mock_http_request_duration_seconds', 'Tempo total da requisição, incluindo o envio da resposta',
+    ('method', 'route', 'status'))
+REQUEST_BYTES = registry.counter(
+    'mock_http_request_bytes_total', 'Bytes recebidos no corpo das requisições', ('method', 'route'))
+RESPONSE_BYTES = registry.counter(
+    'mock_http_response_bytes_total', 'Bytes enviados no corpo das respostas', ('method', 'route'))
+RESPONSE_SIZE = registry.histogram(
+    'mock_http_response_size_bytes', 'Tamanho do corpo das respostas', ('route',), SIZE_BUCKETS)
+IN_FLIGHT = registry.gauge('mock_http_requests_in_flight', 'Requisições em andamento')
+JSON_SECONDS = registry.histogram(
+    'mock_json_duration_seconds', 'Parse (request.get_json) e serialização (jsonify) de JSON', ('op',))
+PERSIST_SECONDS = registry.histogram(
+    'mock_persist_duration_seconds', 'Gravação do vehicles.json por fase', ('phase',))
+PERSIST_BYTES = registry.counter('mock_persist_bytes_total', 'Bytes gravados no vehicles.json')
+MEDIA_WRITE_SECONDS = registry.histogram(
+    'mock_media_write_duration_seconds', 'Gravação de arquivos de mídia em uploads/', ('kind',))
+MEDIA_WRITE_BYTES = registry.counter(
+    'mock_media_write_bytes_total', 'Bytes de mídia gravados em uploads/', ('kind',))
+SSE_STREAMS = registry.gauge('mock_sse_streams', 'Clientes conectados ao feed de alterações (SSE)')
+PARTITION_LOAD_SECONDS = registry.histogram(
+    'mock_partition_load_duration_seconds', 'Carga sob demanda da partição de uma garagem')
+SCAN_SECONDS = registry.histogram(
+    'mock_catalog_scan_duration_seconds', 'Filtros lineares sobre o catálogo', ('route',))
+COLD_READS = registry.counter(
+    'mock_cold_reads_total', 'Leituras de campos frios (descrição, media) no LRU ou no arquivo', ('result',))
+COLD_BYTES = registry.counter('mock_cold_bytes_total', 'Bytes comprimidos acrescentados aos arquivos de campos frios')
+ADMISSION_REJECTED = registry.counter(
+    'mock_admission_rejected_total', 'Requisições recusadas pelo controle de admissão', ('route', 'class', 'reason'))
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    'mock_admission_wait_seconds', 'Espera na fila de admissão das requisições admitidas', ('class',))
+
+UNMATCHED_ROUTE = '<unmatched>'
+ROUTE_KEY = 'mock_server.route'
+
+
+def observe_route(environ, rule):
+    """Registra o template da rota atendida (chamado em before_request)"""
+    environ[ROUTE_KEY] = rule.rule if rule is not None else UNMATCHED_ROUTE
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask que mede parse e serialização"""
+
+    def loads(self, s, **kwargs):
+        start = perf_counter()
+        try:
+            return super().loads(s, **kwargs)
+        finally:
+            JSON_SECONDS.observe(perf_counter() - start, ('parse',))
+
+    def dumps(self, obj, **kwargs):
+        start = perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            JSON_SECONDS.observe(perf_counter() - start, ('serialize',))
+
+
+class MetricsMiddleware:
+    """
+    Middleware WSGI: latência até o fim do envio (streaming incluso), bytes
+    de entrada/saída e requisições em andamento.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        start = perf_counter()
+        IN_FLIGHT.inc()
+        status = []
+
+        def observed_start_response(status_line, headers, exc_info=None):
+            status[:] = [status_line[:3]]
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            result = self.app(environ, observed_start_response)
+        except BaseException:
+            IN_FLIGHT.dec()
+            raise
+        return _ObservedResponse(result, environ, status, start)
+
+
+class _ObservedResponse:
+    __slots__ = ('result', 'environ', 'status', 'start', 'sent', 'closed')
+
+    def __init__(self, result, environ, status, start):
+        self.result = result
+        self.environ = environ
+        self.status = status
+        self.start = start
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.result:
+            self.sent += len(chunk)
+            yield chunk
+        # nem todo cliente WSGI chama close() (ex.: test client do Flask)
+        self._record()
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            self._record()
+
+    def _record(self):
+        if self.closed:
+            return
+        self.closed = True
+        environ = self.environ
+        method = environ.get('REQUEST_METHOD', '')
+        route = environ.get(ROUTE_KEY, UNMATCHED_ROUTE)
+        status = self.status[0] if self.status else '500'
+        REQUEST_SECONDS.observe(perf_counter() - self.start, (method, route, status))
+        try:
+            received = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            received = 0
+        if received:
+            REQUEST_BYTES.inc(received, (method, route))
+        RESPONSE_BYTES.inc(self.sent, (method, route))
+        RESPONSE_SIZE.observe(self.sent, (route,))
+        IN_FLIGHT.dec()
@@ -0,0 +1,268 @@
+"""
+Profiling sob demanda das requisições (cProfile).
+
+Desligado por padrão, e nesse caso o middleware nem é instalado (custo
+zero). Liga com variáveis de ambiente:
+    MOCK_PROFILE_HEADER=1      perfila requisições com o cabeçalho X-Mock-Profile: 1
+    MOCK_PROFILE_SAMPLE=0.01   perfila essa fração das requisições
+    MOCK_PROFILE_PATHS=regex   restringe a caminhos que casem (ex.: ^/api/vehicles/\\d+$)
+    MOCK_PROFILE_DIR           destino (padrão mock_data/profiles)
+    MOCK_PROFILE_KEEP          quantos perfis manter (padrão 200)
+
+Cada requisição perfilada (handler + envio da resposta, na thread que a
+atende) gera dois arquivos com rota, duração e tamanho do catálogo no nome:
+    <ts>_<METODO>_<rota>_<ms>ms_<n>veh.pstats     abrir com pstats/snakeviz
+    <ts>_<METODO>_<rota>_<ms>ms_<n>veh.collapsed  pilhas para flamegraph.pl/speedscope
+
+A conversão e a gravação ficam com uma thread própria (fila de até
+SAVE_QUEUE_SIZE perfis; com ela cheia o perfil é descartado), fora da
+thread que atendeu a requisição.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from .metrics import ROUTE_KEY, UNMATCHED_ROUTE
+
+HEADER = 'HTTP_X_MOCK_PROFILE'
+DEFAULT_KEEP = 200
+SAVE_QUEUE_SIZE = 16
+MAX_STACK_DEPTH = 40
+MIN_STACK_WEIGHT = 1  # µs; caminhos com peso menor são descartados
+
+logger = logging.getLogger(__name__)
+
+_NAME_RE = re.compile(
+    r'^(?P<ts>\d{8}T\d{6}\d*)_(?P<method>[A-Z]+)_(?P<route>.+)_(?P<ms>\d+)ms_(?P<vehicles>\d+)veh\.(?P<ext>pstats|collapsed)$')
+
+
+class ProfilerConfig:
+    def __init__(self, directory, header=False, sample_rate=0.0, paths=None, keep=DEFAULT_KEEP):
+        self.directory = directory
+        self.header = header
+        self.sample_rate = sample_rate
+        self.paths = re.compile(paths) if paths else None
+        self.keep = keep
+
+    @property
+    def enabled(self):
+        return self.header or self.sample_rate > 0
+
+    @classmethod
+    def from_env(cls, default_directory):
+        return cls(
+            directory=os.environ.get('MOCK_PROFILE_DIR', default_directory),
+            header=os.environ.get('MOCK_PROFILE_HEADER', '') in ('1', 'true'),
+            sample_rate=float(os.environ.get('MOCK_PROFILE_SAMPLE') or 0),
+            paths=os.environ.get('MOCK_PROFILE_PATHS') or None,
+            keep=int(os.environ.get('MOCK_PROFILE_KEEP') or DEFAULT_KEEP),
+        )
+
+    def should_profile(self, environ):
+        if self.paths and not self.paths.search(environ.get('PATH_INFO', '')):
+            return False
+        if self.header and environ.get(HEADER) == '1':
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+def _slug(route):
+    slug = re.sub(r'<(?:[^:>]+:)?([^>]+)>', r'\1', route).strip('/')
+    return re.sub(r'[^A-Za-z0-9]+', '-', slug).strip('-') or 'root'
+
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # builtins: "<built-in method ...>"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats):
+    """
+    Converte o grafo chamador→chamado do cProfile em pilhas "a;b;c peso(µs)".
+    O cProfile não guarda pilhas completas: o tempo próprio de cada função
+    é distribuído entre os caminhos até a raiz na proporção das chamadas.
+    """
+    entries = stats.stats
+    weights = {}
+
+    def walk(func, path, weight, depth):
+        callers = entries[func][4] if func in entries else {}
+        if not callers or depth >= MAX_STACK_DEPTH:
+            key = ';'.join(_frame_name(f) for f in reversed(path))
+            weights[key] = weights.get(key, 0) + weight
+            return
+        total = sum(edge[0] for edge in callers.values()) or 1
+        for caller, edge in callers.items():
+            share = weight * edge[0] / total
+            if share < MIN_STACK_WEIGHT or caller in path:
+                continue
+            walk(caller, path + (caller,), share, depth + 1)
+
+    for func, (_, _, own_time, _, _) in entries.items():
+        weight = own_time * 1e6
+        if weight >= MIN_STACK_WEIGHT:
+            walk(func, (func,), weight, 0)
+    return [f"{stack} {int(weight)}" for stack, weight in sorted(weights.items()) if int(weight) > 0]
+
+
+class ProfilingMiddleware:
+    """Executa as requisições escolhidas sob cProfile e grava os resultados"""
+
+    def __init__(self, app, config, catalog_size):
+        self.app = app
+        self.config = config
+        self.catalog_size = catalog_size
+        self._prune_lock = threading.Lock()
+        self._queue = None
+        self._queue_lock = threading.Lock()
+        self._pid = None
+        self.dropped = 0
+        os.makedirs(config.directory, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        if not self.config.should_profile(environ):
+            return self.app(environ, start_response)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = self.app(environ, start_response)
+        finally:
+            profiler.disable()
+        return _ProfiledResponse(self, result, environ, profiler, start)
+
+    def submit(self, environ, profiler, duration):
+        """Na thread da requisição: só monta o nome e enfileira o perfil para a thread de gravação"""
+        route = environ.get(ROUTE_KEY, UNMATCHED_ROUTE)
+        base = (f"{datetime.now():%Y%m%dT%H%M%S%f}_{environ.get('REQUEST_METHOD', 'GET')}_"
+                f"{_slug(route)}_{int(duration * 1000)}ms_{self.catalog_size()}veh")
+        try:
+            self._writer().put_nowait((base, environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'), profiler))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Fila de perfis cheia: perfil %s descartado", base)
+
+    def _writer(self):
+        # A thread não sobrevive ao fork dos workers (--workers): uma por processo
+        if self._pid != os.getpid():
+            with self._queue_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(SAVE_QUEUE_SIZE)
+                    threading.Thread(target=self._write_loop, args=(self._queue,),
+                                     name='profile-writer', daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _write_loop(self, profiles):
+        while True:
+            base, method, path_info, profiler = profiles.get()
+            try:
+                self.save(base, method, path_info, profiler)
+            except Exception as e:
+                logger.exception("Erro ao gravar perfil: %s", e)
+
+    def save(self, base, method, path_info, profiler):
+        path = os.path.join(self.config.directory, base)
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(path + '.pstats')
+        with open(path + '.collapsed', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(collapsed_stacks(stats)) + '\n')
+        logger.info("Perfil gravado: %s (%s %s)", base, method, path_info)
+        self._prune()
+
+    def _prune(self):
+        with self._prune_lock:
+            names = sorted(n for n in os.listdir(self.config.directory) if n.endswith('.pstats'))
+            for name in names[:max(len(names) - self.config.keep, 0)]:
+                for ext in ('.pstats', '.collapsed'):
+                    try:
+                        os.remove(os.path.join(self.config.directory, name[:-len('.pstats')] + ext))
+                    except FileNotFoundError:
+                        pass
+
+
+class _ProfiledResponse:
+    """Mantém o profiler ativo enquanto a resposta (streaming inclusive) é gerada"""
+
+    def __init__(self, middleware, result, environ, profiler, start):
+        self.middleware = middleware
+        self.result = result
+        self.environ = environ
+        self.profiler = profiler
+        self.start = start
+        self.saved = False
+
+    def __iter__(self):
+        iterator = iter(self.result)
+        while True:
+            self.profiler.enable()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                self.profiler.disable()
+            yield chunk
+        self._save()
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            self._save()
+
+    def _save(self):
+        if self.saved:
+            return
+        self.saved = True
+        try:
+            self.middleware.submit(self.environ, self.profiler, time.perf_counter() - self.start)
+        except Exception as e:
+            logger.exception("Erro ao enfileirar perfil: %s", e)
+
+
+def install(app, config, catalog_size):
+    """Envolve app.wsgi_app só quando o profiling está habilitado"""
+    if config.enabled:
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app, config, catalog_size)
+        logger.info("Profiling habilitado em %s (header=%s, amostragem=%s)",
+                    config.directory, config.header, config.sample_rate)
+    return config
+
+
+def list_profiles(directory, limit=50):
+    """Perfis mais recentes primeiro, com os metadados extraídos do nome"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted((n for n in names if n.endswith('.pstats')), reverse=True)[:limit]:
+        match = _NAME_RE.match(name)
+        if not match:
+            continue
+        base = name[:-len('.pstats')]
+        profiles.append({
+            "name": base,
+            "createdAt": datetime.strptime(match['ts'], '%Y%m%dT%H%M%S%f').isoformat(),
+            "method": match['method'],
+            "route": match['route'],
+            "durationMs": int(match['ms']),
+            "catalogSize": int(match['vehicles']),
+            "files": {
+                "pstats": f"{base}.pstats",
+                "collapsed": f"{base}.collapsed",
+            },
+        })
+    return profiles
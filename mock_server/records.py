@@ -0,0 +1,376 @@
+"""
+Representação compacta dos veículos em memória.
+
+Um dict por veículo custa a tabela de hash, as ~25 chaves e uma cópia de
+cada string categórica ("Disponível", "Carro", "Flex"...) para cada veículo
+lido do JSON. VehicleRecord guarda só dois ponteiros: o formato (tupla de
+chaves compartilhada entre todos os veículos com as mesmas chaves na mesma
+ordem) e uma tupla com os valores codificados:
+
+    campos categóricos   código inteiro no vocabulário do campo (interning);
+                         com o vocabulário cheio (MAX_VALUES), valores novos
+                         ficam sem código, como (valor,)
+    optionalFeatures     tupla de códigos no vocabulário de opcionais
+    media                tupla (fotos, vídeos, laudo), sem dicts nem listas
+    demais               o próprio valor
+
+Com um ColdStore (mock_server.coldstore), os campos frios (COLD_FIELDS:
+descrição e, se configurado, media) ficam comprimidos fora do heap e o
+record guarda só um ColdRef; no disco (vehicles.json e journal) eles são
+gravados como {"$cold": [offset, tamanho]} (storage_default).
+
+Records são imutáveis e se comportam como Mapping de leitura (get, [],
+items...), devolvendo sempre listas/dicts novos. Na fronteira da API
+to_dict() reconstrói o JSON original (mesmas chaves, mesma ordem) e
+json_default() deixa json.dumps/jsonify serializá-los diretamente.
+"""
+
+import copy
+import itertools
+import json
+import logging
+import re
+import threading
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+CATEGORICAL_FIELDS = (
+    'category', 'brand', 'model', 'modelYear', 'year', 'color', 'bodyType', 'doors',
+    'transmission', 'steering', 'fuel', 'engine', 'status',
+)
+
+_SCALARS = (str, int, float, bool, type(None))
+# Valores distintos por vocabulário: PATCH com valores arbitrários não faz os
+# vocabulários (globais, só crescem) ocuparem memória sem limite
+MAX_VALUES = 10_000
+_EMPTY = ()
+_MEDIA_KEYS = ('photos', 'videos', 'inspection')
+
+# Campos que podem ficar em um ColdStore (quais ficam de fato é configuração do store)
+COLD_FIELDS = ('description', 'media')
+COLD_MARKER = '$cold'
+
+
+class ColdRef:
+    """Posição de um valor comprimido em um ColdStore"""
+
+    __slots__ = ('store', 'offset', 'size')
+
+    def __init__(self, store, offset, size):
+        self.store = store
+        self.offset = offset
+        self.size = size
+
+    def load(self):
+        return self.store.load(self)
+
+    def to_storage(self):
+        return {COLD_MARKER: [self.offset, self.size]}
+
+
+class Vocabulary:
+    """Dicionário de valores de um campo: valor <-> código inteiro estável (até `limit` valores)"""
+
+    def __init__(self, name, limit=MAX_VALUES):
+        self.name = name
+        self.limit = limit
+        self.full = False
+        self.values = []
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def encode(self, value):
+        """Código do valor; None se ele é novo e o vocabulário está cheio"""
+        # o tipo faz parte da chave: 4, 4.0, True e "4" são valores diferentes
+        key = (value.__class__, value)
+        code = self._codes.get(key)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(key)
+                if code is None:
+                    if len(self.values) >= self.limit:
+                        if not self.full:
+                            self.full = True
+                            logger.warning("Vocabulário %s cheio (%d valores): valores novos ficam sem código",
+                                           self.name, self.limit)
+                        return None
+                    code = len(self.values)
+                    self.values.append(value)
+                    self._codes[key] = code
+        return code
+
+    def code(self, value):
+        """Código de um valor já conhecido (None se nunca apareceu)"""
+        try:
+            return self._codes.get((value.__class__, value))
+        except TypeError:
+            return None
+
+    def stored(self, value):
+        """Valor como fica no record (raw): o código, ou (valor,) se ele não tem código"""
+        code = self.code(value)
+        return (value,) if code is None else code
+
+    def __len__(self):
+        return len(self.values)
+
+
+vocabularies = {name: Vocabulary(name) for name in CATEGORICAL_FIELDS}
+features = Vocabulary('optionalFeatures')
+
+
+def _copy(value):
+    return value if value.__class__ in _SCALARS else copy.deepcopy(value)
+
+
+# Cada codec é um par (encode, decode). Valores fora do formato esperado
+# (listas em campos categóricos, media incompleta...) são guardados como
+# cópia sem codificar: o código é sempre int ou tuple, e o fallback nunca é
+# tuple, então o decode distingue os dois casos. Nos categóricos o código é
+# int, e a tupla (valor,) guarda um escalar que não coube no vocabulário.
+
+def _fallback(value):
+    value = copy.deepcopy(value)
+    return list(value) if value.__class__ is tuple else value
+
+
+def _categorical(vocabulary):
+    values = vocabulary.values
+
+    def encode(value):
+        if value.__class__ in _SCALARS:
+            code = vocabulary.encode(value)
+            return (value,) if code is None else code
+        return _fallback(value)
+
+    def decode(value):
+        if value.__class__ is int:
+            return values[value]
+        return value[0] if value.__class__ is tuple else copy.deepcopy(value)
+
+    return encode, decode
+
+
+def _encode_features(value):
+    if value.__class__ is list and all(item.__class__ is str for item in value):
+        codes = tuple(features.encode(item) for item in value) if value else _EMPTY
+        if None not in codes:
+            return codes
+    return _fallback(value)
+
+
+def _decode_features(value):
+    if value.__class__ is tuple:
+        names = features.values
+        return [names[code] for code in value]
+    return copy.deepcopy(value)
+
+
+def _encode_media(value):
+    if value.__class__ is dict and tuple(value) == _MEDIA_KEYS:
+        photos, videos, inspection = value['photos'], value['videos'], value['inspection']
+        if (photos.__class__ is list and videos.__class__ is list and inspection.__class__ in _SCALARS
+                and all(p.__class__ is str for p in photos) and all(v.__class__ is str for v in videos)):
+            return (tuple(photos) if photos else _EMPTY, tuple(videos) if videos else _EMPTY, inspection)
+    return _fallback(value)
+
+
+def _decode_media(value):
+    if value.__class__ is ColdRef:
+        return value.load()
+    if value.__class__ is tuple:
+        return {"photos": list(value[0]), "videos": list(value[1]), "inspection": value[2]}
+    return copy.deepcopy(value)
+
+
+CODECS = {name: _categorical(vocabulary) for name, vocabulary in vocabularies.items()}
+CODECS['optionalFeatures'] = (_encode_features, _decode_features)
+CODECS['media'] = (_encode_media, _decode_media)
+
+
+def _decode_description(value):
+    return value.load() if value.__class__ is ColdRef else _copy(value)
+
+
+CODECS['description'] = (_copy, _decode_description)
+
+
+class Shape:
+    """
+    Chaves de um veículo, na ordem original, com o codec de cada uma.
+    mutable: algum campo sem codec guarda lista/dict (copiado nas leituras).
+    """
+
+    __slots__ = ('keys', 'mutable', 'positions', 'decoders', 'encoded', 'plain', 'decoded', 'cold')
+
+    def __init__(self, keys, mutable):
+        self.keys = keys
+        self.mutable = mutable
+        self.positions = {key: i for i, key in enumerate(keys)}
+        self.decoders = tuple(CODECS[key][1] if key in CODECS else _copy for key in keys)
+        self.encoded = tuple((i, CODECS[key][0]) for i, key in enumerate(keys) if key in CODECS)
+        self.plain = tuple(i for i, key in enumerate(keys) if key not in CODECS)
+        # posições que to_dict precisa decodificar (as demais saem como estão)
+        self.decoded = tuple((i, key, self.decoders[i]) for i, key in enumerate(keys)
+                             if key in CODECS or mutable)
+        self.cold = tuple((i, key) for i, key in enumerate(keys) if key in COLD_FIELDS)
+
+
+_shapes = {}
+_shapes_lock = threading.Lock()
+
+
+def _shape_for(keys, mutable=False):
+    shape = _shapes.get((keys, mutable))
+    if shape is None:
+        with _shapes_lock:
+            shape = _shapes.setdefault((keys, mutable), Shape(keys, mutable))
+    return shape
+
+
+class VehicleRecord(Mapping):
+    """Veículo publicado, imutável; leituras devolvem cópias editáveis"""
+
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, key):
+        position = self._shape.positions[key]
+        return self._shape.decoders[position](self._values[position])
+
+    def __contains__(self, key):
+        return key in self._shape.positions
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._shape.keys)
+
+    def raw(self, key, default=None):
+        """Valor codificado (código inteiro nos campos categóricos), sem cópia"""
+        position = self._shape.positions.get(key)
+        return default if position is None else self._values[position]
+
+    def to_dict(self):
+        """Veículo no formato JSON original (dict novo, listas e media inclusas)"""
+        values = self._values
+        vehicle = dict(zip(self._shape.keys, values))
+        for position, key, decode in self._shape.decoded:
+            vehicle[key] = decode(values[position])
+        return vehicle
+
+    def to_storage(self):
+        """Como to_dict, mas campos frios saem como referência ao ColdStore (sem descomprimir)"""
+        values = self._values
+        vehicle = dict(zip(self._shape.keys, values))
+        for position, key, decode in self._shape.decoded:
+            value = values[position]
+            vehicle[key] = value.to_storage() if value.__class__ is ColdRef else decode(value)
+        return vehicle
+
+    def __repr__(self):
+        return f"VehicleRecord({self.to_dict()!r})"
+
+
+def pack(vehicle, cold=None, stored=False, previous=None):
+    """
+    Converte um dict de veículo em VehicleRecord (records passam direto).
+    cold: ColdStore para os campos frios; stored: o dict veio do disco (vehicles.json
+    ou journal) e pode trazer referências {"$cold": ...} em vez dos valores;
+    previous: record anterior do mesmo veículo (campos frios iguais reaproveitam a referência).
+    """
+    if vehicle.__class__ is VehicleRecord:
+        return vehicle
+    shape = _shape_for(tuple(vehicle))
+    values = list(vehicle.values())
+    if cold is not None:
+        for position, key in shape.cold:
+            old = previous.raw(key) if previous is not None else None
+            values[position] = cold.put(key, values[position], stored, old)
+    for position, encode in shape.encoded:
+        if values[position].__class__ is not ColdRef:
+            values[position] = encode(values[position])
+    for position in shape.plain:
+        if values[position].__class__ not in _SCALARS:
+            shape = _shape_for(shape.keys, True)
+            for position in shape.plain:
+                values[position] = _copy(values[position])
+            break
+    return VehicleRecord(shape, tuple(values))
+
+
+_WHITESPACE = re.compile(r'\s*')
+
+
+def _iter_array(text):
+    """Elementos de um array JSON, decodificados um a um"""
+    decoder = json.JSONDecoder()
+    skip = _WHITESPACE.match
+    position = skip(text, 0).end()
+    if text[position:position + 1] != '[':
+        raise ValueError("vehicles.json deve conter um array JSON")
+    position = skip(text, position + 1).end()
+    if text[position:position + 1] == ']':
+        return
+    while True:
+        item, position = decoder.raw_decode(text, position)
+        yield item
+        position = skip(text, position).end()
+        separator = text[position:position + 1]
+        position = skip(text, position + 1).end()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"JSON inválido em vehicles.json (posição {position})")
+
+
+def load_vehicles(f, garage_id=None, cold=None):
+    """
+    Lê um array JSON de veículos convertendo cada elemento assim que é
+    decodificado: a lista inteira de dicts nunca existe em memória.
+    Com garage_id, veículos gravados sem garageId (arquivos anteriores às
+    partições por garagem) passam a pertencer a ela. Com cold, os campos
+    frios vão para o ColdStore; se ele ainda não tem dicionário, o
+    dicionário é treinado com os primeiros veículos do arquivo.
+    """
+    text = f.read()
+    if cold is not None and cold.needs_dictionary():
+        samples = []
+        for vehicle in itertools.islice(_iter_array(text), cold.TRAINING_SAMPLES):
+            samples.extend(vehicle[key] for key in COLD_FIELDS if key in vehicle)
+        cold.train(samples)
+    vehicles = []
+    for vehicle in _iter_array(text):
+        if garage_id is not None and 'garageId' not in vehicle:
+            vehicle['garageId'] = garage_id
+        vehicles.append(pack(vehicle, cold, stored=True))
+    return vehicles
+
+
+def cold_refs(vehicles):
+    """ColdRef guardadas nos records (para compactar o ColdStore)"""
+    for vehicle in vehicles:
+        if vehicle.__class__ is VehicleRecord:
+            values = vehicle._values
+            for position, _ in vehicle._shape.cold:
+                if values[position].__class__ is ColdRef:
+                    yield values[position]
+
+
+def json_default(value):
+    """default= para json.dumps: serializa records no formato original"""
+    if value.__class__ is VehicleRecord:
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def storage_default(value):
+    """default= para o que é gravado em disco (vehicles.json, journal): campos frios como referência"""
+    if value.__class__ is VehicleRecord:
+        return value.to_storage()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,195 @@
+"""
+Veículos semelhantes (GET /api/vehicles/<id>/similar) por distância
+ponderada, calculada de uma vez para o catálogo inteiro com NumPy.
+
+A matriz de atributos sai do column store (mock_server.columns) na
+primeira consulta e fica no cache do snapshot; a partir daí cada transação
+do catálogo gera a do snapshot seguinte (FeatureMatrix.updated) copiando os
+arrays e recalculando só as linhas alteradas. Os numéricos (log do preço,
+ano e log da quilometragem) são guardados sem normalizar, com somas que
+dão o desvio-padrão de cada versão: |z_alvo - z| = |x_alvo - x| / desvio.
+Cada consulta é então só aritmética vetorizada sobre N linhas +
+argpartition para o top-k.
+
+Distância entre o veículo alvo e cada candidato:
+    numéricos    peso * min(|z_alvo - z|, MAX_GAP); ausente = 1
+    categóricos  peso * (valores diferentes); ausente = 0,5
+    opcionais    peso * (1 - Jaccard dos bitmasks)
+"""
+
+import numpy as np
+
+from .analytics import columns_for
+from .records import vocabularies
+
+WEIGHTS = {
+    'price': 3.0,
+    'year': 1.5,
+    'mileage': 1.0,
+    'category': 4.0,
+    'bodyType': 1.5,
+    'fuel': 0.5,
+    'features': 1.0,
+}
+MAX_GAP = 3.0
+DEFAULT_LIMIT = 6
+MAX_LIMIT = 50
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:  # NumPy < 2.0
+    _BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        values = np.ascontiguousarray(values)
+        return _BYTE_BITS[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+CODED_FIELDS = ('category', 'bodyType', 'fuel', 'status')
+SOURCE_COLUMNS = ('id', 'live', 'price', 'year', 'modelYear', 'mileage', *CODED_FIELDS, 'features')
+
+
+def _numeric(values):
+    """Colunas do store (arrays das mesmas linhas) -> numéricos da matriz (NaN = ausente)"""
+    live = values['live']
+    price, mileage = values['price'], values['mileage']
+    year = np.where(np.isnan(values['modelYear']), values['year'], values['modelYear'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'price': np.where(live & (price >= 0), np.log1p(price), np.nan).astype(np.float32),
+            'year': np.where(live, year, np.nan).astype(np.float32),
+            'mileage': np.where(live & (mileage >= 0), np.log1p(mileage), np.nan).astype(np.float32),
+        }
+
+
+def _sums(values):
+    valid = values[~np.isnan(values)].astype(np.float64)
+    return np.array([len(valid), valid.sum(), np.square(valid).sum()])
+
+
+def _scale(sums):
+    count, total, squares = sums
+    if count <= 0:
+        return 1.0
+    variance = max(squares / count - (total / count) ** 2, 0.0)
+    return float(np.sqrt(variance)) or 1.0
+
+
+def _grown(array, size):
+    """Cópia de array com `size` linhas (linhas novas zeradas; são preenchidas em seguida)"""
+    copy = np.zeros((size,) + array.shape[1:], array.dtype)
+    copy[:len(array)] = array
+    return copy
+
+
+class FeatureMatrix:
+    """Atributos de todas as linhas do column store de um snapshot (nunca alterados depois de publicados)"""
+
+    def __init__(self, columns, numeric, sums, codes, features, live, ids):
+        self.columns = columns
+        self.numeric = numeric
+        # por campo numérico: [quantidade, soma, soma dos quadrados] dos valores presentes
+        self.sums = sums
+        self.scales = {field: _scale(sums[field]) for field in numeric}
+        self.codes = codes
+        self.features = features
+        self.feature_counts = _popcount(features).sum(axis=1).astype(np.float32)
+        self.live = live
+        self.ids = ids
+
+    @classmethod
+    def build(cls, columns):
+        values = {name: columns.array(name) for name in SOURCE_COLUMNS}
+        numeric = _numeric(values)
+        return cls(columns, numeric, {field: _sums(array) for field, array in numeric.items()},
+                   {field: values[field].copy() for field in CODED_FIELDS},
+                   values['features'].copy(), values['live'].copy(), values['id'].copy())
+
+    def updated(self, base_columns, columns, upserts, deletes):
+        """Matriz do snapshot seguinte: cópia desta com as linhas dos veículos alterados recalculadas"""
+        if columns is base_columns:
+            return self
+        if columns.words != self.features.shape[1]:
+            # o dicionário de opcionais ganhou uma palavra: recomeçar do store
+            return FeatureMatrix.build(columns)
+        rows = {base_columns.rows[i] for i in deletes if i in base_columns.rows}
+        rows.update(columns.rows[i] for i in upserts if i in columns.rows)
+        rows = np.array(sorted(rows), dtype=np.int64)
+        size = columns.size
+        values = {name: columns.take(name, rows) for name in SOURCE_COLUMNS}
+        numeric, sums = {}, {}
+        fresh = _numeric(values)
+        for field, array in self.numeric.items():
+            old = array[rows[rows < len(array)]]
+            numeric[field] = _grown(array, size)
+            numeric[field][rows] = fresh[field]
+            sums[field] = self.sums[field] - _sums(old) + _sums(fresh[field])
+        codes = {}
+        for field, array in self.codes.items():
+            codes[field] = _grown(array, size)
+            codes[field][rows] = values[field]
+        features = _grown(self.features, size)
+        features[rows] = values['features']
+        live = _grown(self.live, size)
+        live[rows] = values['live']
+        ids = _grown(self.ids, size)
+        ids[rows] = values['id']
+        return FeatureMatrix(columns, numeric, sums, codes, features, live, ids)
+
+    def distances(self, row):
+        distance = np.zeros(len(self.ids), dtype=np.float32)
+        for field, values in self.numeric.items():
+            gap = np.minimum(np.abs(values - values[row]) / np.float32(self.scales[field]), MAX_GAP)
+            distance += WEIGHTS[field] * np.nan_to_num(gap, nan=1.0)
+        for field in ('category', 'bodyType', 'fuel'):
+            codes = self.codes[field]
+            target = codes[row]
+            if target < 0:
+                distance += WEIGHTS[field] * 0.5
+            else:
+                distance += WEIGHTS[field] * np.where(codes < 0, 0.5, codes != target).astype(np.float32)
+        shared = _popcount(self.features & self.features[row]).sum(axis=1).astype(np.float32)
+        union = self.feature_counts + self.feature_counts[row] - shared
+        with np.errstate(invalid='ignore', divide='ignore'):
+            overlap = np.where(union > 0, shared / union, 1.0)
+        distance += WEIGHTS['features'] * (1.0 - overlap)
+        return distance
+
+    def nearest(self, vehicle_id, limit, status=None):
+        """(ids, distâncias) dos `limit` veículos mais próximos, do mais parecido ao menos"""
+        row = self.columns.rows.get(vehicle_id)
+        if row is None:
+            return [], []
+        distance = self.distances(row)
+        excluded = ~self.live
+        excluded[row] = True
+        if status is not None:
+            code = vocabularies['status'].code(status)
+            if code is None:
+                return [], []
+            excluded |= self.codes['status'] != code
+        distance[excluded] = np.inf
+        candidates = int((~excluded).sum())
+        limit = min(limit, candidates)
+        if limit <= 0:
+            return [], []
+        top = np.argpartition(distance, limit - 1)[:limit]
+        top = top[np.argsort(distance[top], kind='stable')]
+        return self.ids[top].tolist(), [round(float(d), 4) for d in distance[top]]
+
+
+def matrix_for(snapshot):
+    """Matriz do snapshot (montada na primeira consulta, depois mantida pelas transações)"""
+    matrix = snapshot.cache.get('similar')
+    if matrix is None:
+        matrix = snapshot.cache['similar'] = FeatureMatrix.build(columns_for(snapshot))
+    return matrix
+
+
+def similar(snapshot, vehicle_id, limit=DEFAULT_LIMIT, status=None):
+    """Veículos mais parecidos com vehicle_id (None se ele não existe no snapshot)"""
+    if snapshot.get(vehicle_id) is None:
+        return None
+    limit = min(max(int(limit), 1), MAX_LIMIT)
+    ids, distances = matrix_for(snapshot).nearest(vehicle_id, limit, status)
+    return [(snapshot.get(i), d) for i, d in zip(ids, distances)]
@@ -0,0 +1,170 @@
+"""
+Geração do modelo Excel de importação a partir do schema (vehicle_schema).
+
+O workbook é montado em modo write-only, com um estilo compartilhado para os
+cabeçalhos e uma única DataValidation por lista de opções (as listas ficam
+na sheet oculta "Listas"). Os bytes gerados ficam em cache pelo hash do
+schema, então o arquivo só é reconstruído quando o schema muda.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from .vehicle_schema import schema_hash
+
+FILENAME = "modelo-importacao-veiculos.xlsx"
+MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+VALIDATION_LAST_ROW = 1000
+CACHE_SIZE = 16
+
+INSTRUCTIONS = [
+    "INSTRUÇÕES PARA PREENCHIMENTO DO MODELO DE IMPORTAÇÃO DE VEÍCULOS",
+    "",
+    "CAMPOS OBRIGATÓRIOS:",
+    "• ID: Identificador único do veículo (ex: 001, 002, 003...)",
+    "• Categoria: Selecione 'Carro' ou 'Moto'",
+    "• Marca: Nome da marca do veículo",
+    "• Modelo: Descrição completa do modelo (ex: C3 GLX 1.4, Civic EXL 2.0)",
+    "• Placa: Placa do veículo no formato ABC-1234",
+    "• Ano Fabricação: Ano de fabricação do veículo",
+    "• Ano Modelo: Ano do modelo do veículo",
+    "• KM: Quilometragem separada por ponto (ex: 10.000, 25.500)",
+    "• Preço: Valor com R$ e separado por ponto (ex: R$ 25.000,00)",
+    "• Cor: Selecione uma cor da lista disponível",
+    "• Status: Selecione o status atual do veículo",
+    "",
+    "ESPECIFICAÇÕES TÉCNICAS:",
+    "• Tipo Carroceria: Selecione o tipo de carroceria",
+    "• Transmissão: Tipo de câmbio do veículo",
+    "• Combustível: Tipo de combustível",
+    "• Motor: Cilindrada do motor",
+    "• Portas: Número de portas (ex: 2, 4, 5)",
+    "• Direção: Tipo de direção do veículo",
+    "",
+    "CARACTERÍSTICAS ESPECIAIS:",
+    "• Marque 'Sim' ou 'Não' para cada característica",
+    "• Blindado: Se o veículo possui blindagem",
+    "• IPVA Pago: Se o IPVA está em dia",
+    "• Leilão: Se o veículo é proveniente de leilão",
+    "• Licenciamento em Dia: Se o licenciamento está regular",
+    "",
+    "OPCIONAIS:",
+    "• Marque 'Sim' ou 'Não' para cada opcional disponível",
+    "• Lista completa de opcionais disponíveis na planilha",
+    "",
+    "OBSERVAÇÕES IMPORTANTES:",
+    "• Preencha todos os campos obrigatórios",
+    "• Use as listas de seleção quando disponíveis",
+    "• Mantenha a formatação dos campos de KM e Preço",
+    "• A descrição pode conter informações adicionais sobre o veículo",
+    "",
+    "ESTRUTURA DE PASTAS PARA MÍDIAS:",
+    "• Crie uma pasta 'Mídia' no ZIP",
+    "• Dentro de 'Mídia', crie uma pasta para cada ID de veículo",
+    "• Dentro da pasta do ID, organize em: Fotos/, Vídeos/, Laudo/",
+    "• Exemplo: Mídia/001/Fotos/, Mídia/001/Vídeos/, Mídia/001/Laudo/"
+]
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def build_template(schema):
+    """Monta o modelo Excel para o schema informado e retorna os bytes do .xlsx"""
+    workbook = Workbook(write_only=True)
+    ws_vehicles = workbook.create_sheet("Veículos")
+    ws_instructions = workbook.create_sheet("Instruções")
+    ws_lists = workbook.create_sheet("Listas")
+    ws_lists.sheet_state = 'hidden'
+
+    # Estilos compartilhados por todas as células de cabeçalho
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center_alignment = Alignment(horizontal='center', vertical='center')
+
+    # Larguras precisam ser definidas antes da primeira linha no modo write-only
+    for col, column in enumerate(schema, 1):
+        ws_vehicles.column_dimensions[get_column_letter(col)].width = column.width
+
+    header_cells = []
+    for column in schema:
+        cell = WriteOnlyCell(ws_vehicles, value=column.header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_alignment
+        cell.border = border
+        header_cells.append(cell)
+    ws_vehicles.append(header_cells)
+    ws_vehicles.append([column.example for column in schema])
+    ws_vehicles.freeze_panes = 'A2'
+
+    # Uma validação por lista distinta, aplicada a todas as colunas que a usam
+    ranges_by_options = OrderedDict()
+    for col, column in enumerate(schema, 1):
+        if column.options:
+            letter = get_column_letter(col)
+            ranges_by_options.setdefault(tuple(column.options), []).append(
+                f"{letter}2:{letter}{VALIDATION_LAST_ROW}"
+            )
+
+    list_columns = []
+    for index, (options, ranges) in enumerate(ranges_by_options.items(), 1):
+        letter = get_column_letter(index)
+        list_columns.append(options)
+        validation = DataValidation(
+            type="list",
+            formula1=f"Listas!${letter}$1:${letter}${len(options)}",
+            allow_blank=True,
+        )
+        validation.sqref = ' '.join(ranges)
+        ws_vehicles.data_validations.append(validation)
+
+    # Sheet "Listas": uma coluna por lista de opções
+    longest = max((len(options) for options in list_columns), default=0)
+    for row in range(longest):
+        ws_lists.append([options[row] if row < len(options) else None for options in list_columns])
+
+    ws_instructions.column_dimensions['A'].width = 80
+    title_font = Font(bold=True, size=14)
+    item_font = Font(size=10)
+    section_font = Font(bold=True, size=11)
+    for row, instruction in enumerate(INSTRUCTIONS, 1):
+        cell = WriteOnlyCell(ws_instructions, value=instruction)
+        if row == 1:
+            cell.font = title_font
+        elif instruction.startswith("•"):
+            cell.font = item_font
+        else:
+            cell.font = section_font
+        ws_instructions.append([cell])
+
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def get_template(schema):
+    """Retorna (etag, bytes) do modelo, reconstruindo apenas se o schema mudou"""
+    etag = schema_hash(schema)
+    with _cache_lock:
+        content = _cache.get(etag)
+        if content is not None:
+            _cache.move_to_end(etag)
+            return etag, content
+
+    content = build_template(schema)
+
+    with _cache_lock:
+        _cache[etag] = content
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return etag, content
@@ -0,0 +1,216 @@
+"""
+Contrato da planilha de importação de veículos ("Veículos").
+
+Mapeia cada coluna do modelo Excel para o campo correspondente no JSON
+dos veículos e concentra a conversão dos formatos brasileiros usados na
+planilha ("R$ 45.000,00", "25.000", "Sim"/"Não").
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+CATEGORIES = ["Carro", "Moto"]
+COLORS = ["Branco", "Preto", "Prata", "Cinza", "Azul", "Vermelho", "Verde", "Amarelo",
+          "Marrom", "Bege", "Dourado", "Laranja", "Rosa", "Roxo", "Outro"]
+STATUSES = ["Disponível", "Vendido", "Reservado", "Em Manutenção", "Indisponível"]
+BODY_TYPES = ["Sedan", "Hatch", "SUV", "Pickup", "Conversível", "Coupé", "Perua", "Van",
+              "Minivan", "Crossover", "Outro"]
+TRANSMISSIONS = ["Manual", "Automática", "CVT", "Automatizada", "Semi-automática"]
+FUELS = ["Flex", "Gasolina", "Etanol", "Diesel", "Elétrico", "Híbrido", "GNV"]
+ENGINES = ["1.0", "1.2", "1.3", "1.4", "1.5", "1.6", "1.7", "1.8", "1.9",
+           "2.0 - 2.9", "3.0 - 3.9", "4.0 ou mais"]
+STEERINGS = ["Mecânica", "Hidráulica", "Elétrica", "Eletro-hidráulica"]
+YES_NO = ["Sim", "Não"]
+
+# kind: text | int | km | price | bool | feature
+# options: lista de seleção do modelo; strict: a importação rejeita valores fora dela
+Column = namedtuple(
+    'Column',
+    ['header', 'field', 'kind', 'required', 'options', 'strict', 'width', 'example'],
+    defaults=(False, None, False, 12, ''),
+)
+
+
+def _feature(header, label, example):
+    return Column(header, label, "feature", options=YES_NO, example=example)
+
+
+# Definição única da planilha: usada pelo modelo Excel, pela importação e pela exportação
+VEHICLE_COLUMNS = [
+    # Informações Básicas
+    Column("ID", "importId", "text", required=True, example="001"),
+    Column("Categoria", "category", "text", required=True, options=CATEGORIES, strict=True, example="Carro"),
+    Column("Marca", "brand", "text", required=True, width=15, example="Citroën"),
+    Column("Modelo", "model", "text", required=True, width=20, example="C3 GLX 1.4"),
+    Column("Placa", "licensePlate", "text", required=True, width=20, example="ABC-1234"),
+    Column("Ano Fabricação", "year", "int", required=True, example="2020"),
+    Column("Ano Modelo", "modelYear", "int", required=True, example="2021"),
+    Column("KM", "mileage", "km", required=True, example="25.000"),
+    Column("Preço", "price", "price", required=True, example="R$ 45.000,00"),
+    Column("Cor", "color", "text", required=True, options=COLORS, width=15, example="Branco"),
+    Column("Status", "status", "text", required=True, options=STATUSES, strict=True, example="Disponível"),
+    Column("Descrição", "description", "text", width=40,
+           example="Veículo em excelente estado, único dono, todas as revisões em dia"),
+
+    # Especificações Técnicas
+    Column("Tipo Carroceria", "bodyType", "text", options=BODY_TYPES, example="Hatch"),
+    Column("Transmissão", "transmission", "text", options=TRANSMISSIONS, width=15, example="Manual"),
+    Column("Combustível", "fuel", "text", options=FUELS, width=15, example="Flex"),
+    Column("Motor", "engine", "text", options=ENGINES, example="1.4"),
+    Column("Portas", "doors", "int", example="4"),
+    Column("Direção", "steering", "text", options=STEERINGS, example="Hidráulica"),
+
+    # Características Especiais
+    Column("Blindado", "armored", "bool", options=YES_NO, example="Não"),
+    Column("IPVA Pago", "ipvaPaid", "bool", options=YES_NO, example="Sim"),
+    Column("Leilão", "auction", "bool", options=YES_NO, example="Não"),
+    Column("Licenciamento em Dia", "licensingUpToDate", "bool", options=YES_NO, example="Sim"),
+
+    # Opcionais (field = rótulo gravado em optionalFeatures, igual ao VehicleForm)
+    _feature("Ar Condicionado", "Ar condicionado", "Sim"),
+    _feature("Direção Hidráulica/Elétrica", "Direção hidráulica (ou elétrica)", "Sim"),
+    _feature("Vidros Elétricos", "Vidros elétricos", "Sim"),
+    _feature("Travas Elétricas", "Travas elétricas", "Sim"),
+    _feature("Alarme", "Alarme", "Sim"),
+    _feature("Som", "Som", "Sim"),
+    _feature("GPS", "GPS", "Não"),
+    _feature("Câmera de Ré", "Câmera de ré", "Não"),
+    _feature("Sensor Estacionamento", "Sensor de estacionamento", "Não"),
+    _feature("Airbags", "Airbags", "Sim"),
+    _feature("ABS", "ABS", "Sim"),
+    _feature("Controle Estabilidade", "Controle de estabilidade", "Não"),
+    _feature("Controle Tração", "Controle de tração", "Não"),
+    _feature("Piloto Automático", "Piloto automático", "Não"),
+    _feature("Banco Couro", "Banco de couro", "Não"),
+    _feature("Rodas Liga Leve", "Rodas de liga leve", "Não"),
+    _feature("Teto Solar", "Teto solar", "Não"),
+    _feature("Faróis Neblina", "Faróis de neblina", "Sim"),
+    _feature("Bluetooth", "Bluetooth", "Não"),
+    _feature("USB", "USB", "Não"),
+    _feature("Entrada Auxiliar", "Entrada auxiliar", "Sim"),
+    _feature("Controle Volante", "Controle no volante", "Não"),
+    _feature("Retrovisor Elétrico", "Retrovisor elétrico", "Sim"),
+    _feature("Retrovisor Retrátil", "Retrovisor retrátil", "Não"),
+]
+
+VEHICLE_IMPORT_HEADERS = [column.header for column in VEHICLE_COLUMNS]
+
+# Campos obrigatórios (ver sheet "Instruções" do modelo)
+REQUIRED_HEADERS = [column.header for column in VEHICLE_COLUMNS if column.required]
+
+
+def build_schema(option_overrides=None):
+    """
+    Schema da planilha com listas de seleção personalizadas (ex.: cores da
+    garagem). option_overrides: {campo: [opções]}, ex. {"color": ["Preto", ...]}.
+    """
+    if not option_overrides:
+        return VEHICLE_COLUMNS
+    schema = []
+    for column in VEHICLE_COLUMNS:
+        options = option_overrides.get(column.field)
+        if column.options is not None and isinstance(options, list) and options:
+            column = column._replace(options=[str(o) for o in options])
+        schema.append(column)
+    return schema
+
+
+def schema_hash(schema):
+    """Hash estável do schema (ETag do modelo e chave do cache)"""
+    payload = json.dumps([column._asdict() for column in schema], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+YES_VALUES = {"sim", "s", "yes", "true", "1", "x"}
+NO_VALUES = {"não", "nao", "n", "no", "false", "0", ""}
+
+
+def is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def parse_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_int(value):
+    """Converte ano/portas ("2021", 2021.0) para int"""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(str(value).strip())
+
+
+def parse_mileage(value):
+    """Converte quilometragem no formato "25.000" para int"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    cleaned = str(value).lower().replace('km', '').replace('.', '').replace(',', '').strip()
+    return int(cleaned)
+
+
+def parse_price(value):
+    """Converte preço no formato "R$ 45.000,00" para float"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    cleaned = str(value).replace('R$', '').replace(' ', '').strip()
+    if ',' in cleaned:
+        cleaned = cleaned.replace('.', '').replace(',', '.')
+    elif cleaned.count('.') > 1 or (cleaned.count('.') == 1 and len(cleaned.split('.')[1]) == 3):
+        # "45.000" sem centavos: ponto como separador de milhar
+        cleaned = cleaned.replace('.', '')
+    return float(cleaned)
+
+
+def parse_bool(value):
+    """Converte "Sim"/"Não" para bool"""
+    if isinstance(value, bool):
+        return value
+    normalized = parse_text(value).lower()
+    if normalized in YES_VALUES:
+        return True
+    if normalized in NO_VALUES:
+        return False
+    raise ValueError(value)
+
+
+PARSERS = {
+    "text": parse_text,
+    "int": parse_int,
+    "km": parse_mileage,
+    "price": parse_price,
+    "bool": parse_bool,
+    "feature": parse_bool,
+}
+
+
+
+def format_price(value):
+    """Formata preço no padrão da planilha: 45000 -> "R$ 45.000,00" """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return ''
+    formatted = f"{number:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return f"R$ {formatted}"
+
+
+def format_mileage(value):
+    """Formata quilometragem no padrão da planilha: 25000 -> "25.000" """
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return ''
+    return f"{number:,}".replace(',', '.')
+
+
+def format_bool(value):
+    if isinstance(value, str):
+        value = value.strip().lower() in YES_VALUES
+    return "Sim" if value else "Não"